@@ -0,0 +1,3 @@
+"""
+Morning Babyni benchmarks package
+"""
@@ -0,0 +1,167 @@
+"""
+Measure the import time and RSS of the city table.
+
+Compares the lazily loaded, array-backed `service.weather.cityinfo` with the former nested
+dict literal, which is regenerated from `cityinfo.tsv` into a temporary module. Each variant
+runs in a fresh interpreter, with a cold and a warm bytecode cache. Reported per variant:
+- import_ms / first_lookup_ms: time from the import statement to the import / first lookup
+- rss_kb: resident set size after the first lookup (Linux /proc, ru_maxrss elsewhere)
+- import_retained_kb / retained_kb: memory still allocated after the import / first lookup (tracemalloc)
+
+Usage: python -m benchmarks.cityinfo_import [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RSS = """
+def rss_kb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+PROBE = RSS + """
+import time
+started = time.perf_counter()
+import {module} as cityinfo
+imported = time.perf_counter()
+area_id = cityinfo.cityInfo["上海"]["上海"]["AREAID"]
+looked_up = time.perf_counter()
+print({{
+    "import_ms": (imported - started) * 1000,
+    "first_lookup_ms": (looked_up - started) * 1000,
+    "rss_kb": rss_kb(),
+}})
+"""
+
+RETAINED = """
+import tracemalloc
+tracemalloc.start()
+import {module} as cityinfo
+imported = tracemalloc.get_traced_memory()[0]
+area_id = cityinfo.cityInfo["上海"]["上海"]["AREAID"]
+print({{
+    "import_retained_kb": imported / 1024,
+    "retained_kb": tracemalloc.get_traced_memory()[0] / 1024,
+}})
+"""
+
+BASELINE = RSS + """
+print({"rss_kb": rss_kb()})
+"""
+
+
+def write_legacy_module(directory: str) -> None:
+    """
+    Regenerate the former nested dict literal module from cityinfo.tsv.
+
+    Parameters:
+    - directory (str): directory the `cityinfo_legacy.py` module is written to
+    """
+    sys.path.insert(0, ROOT)
+    from service.weather import cityinfo  # pylint: disable=import-outside-toplevel
+
+    table = {
+        province: {city: {"AREAID": cities[city]["AREAID"]} for city in cities}
+        for province, cities in cityinfo.cityInfo.items()
+    }
+    with open(
+        os.path.join(directory, "cityinfo_legacy.py"), "w", encoding="utf-8"
+    ) as file:
+        file.write("cityInfo = " + json.dumps(table, ensure_ascii=False, indent=2))
+
+
+def run_probe(source: str, path: str, pycache: str) -> dict:
+    """
+    Run a probe in a fresh interpreter.
+
+    Parameters:
+    - source (str): probe source code
+    - path (str): PYTHONPATH of the interpreter
+    - pycache (str): bytecode cache directory, a fresh one makes the run cold
+
+    Returns:
+    - dict: the measurements printed by the probe
+    """
+    env = dict(os.environ, PYTHONPATH=path, PYTHONPYCACHEPREFIX=pycache)
+    output = subprocess.run(
+        [sys.executable, "-c", source],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return eval(output)  # pylint: disable=eval-used
+
+
+def measure(module: str, path: str, repeat: int, cold: bool) -> dict:
+    """
+    Measure a city table module.
+
+    Parameters:
+    - module (str): module name
+    - path (str): PYTHONPATH of the interpreter
+    - repeat (int): number of runs, the median is reported
+    - cold (bool): whether every run starts with an empty bytecode cache
+
+    Returns:
+    - dict: median import time, first lookup time, RSS and retained memory
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as warm_cache:
+        run_probe(PROBE.format(module=module), path, warm_cache)  # warm the .pyc
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as cold_cache:
+                pycache = cold_cache if cold else warm_cache
+                run = run_probe(PROBE.format(module=module), path, pycache)
+            runs.append(run)
+        runs[0].update(run_probe(RETAINED.format(module=module), path, warm_cache))
+    return {
+        key: statistics.median(run[key] for run in runs if key in run)
+        for key in runs[0]
+    }
+
+
+def main():
+    """
+    Run the benchmark and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_legacy_module(directory)
+        path = os.pathsep.join([directory, ROOT])
+        baseline_rss = statistics.median(
+            run_probe(BASELINE, path, directory)["rss_kb"] for _ in range(args.repeat)
+        )
+        report = {"interpreter_rss_kb": baseline_rss}
+        for label, module in [
+            ("legacy_dict_literal", "cityinfo_legacy"),
+            ("lazy_array_table", "service.weather.cityinfo"),
+        ]:
+            for cache, cold in [("cold", True), ("warm", False)]:
+                result = measure(module, path, args.repeat, cold)
+                result["rss_over_interpreter_kb"] = result["rss_kb"] - baseline_rss
+                report[f"{label}/{cache}"] = result
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
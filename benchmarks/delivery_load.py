@@ -0,0 +1,233 @@
+"""
+Measure the delivery throughput of the channels against local stand-ins of every upstream.
+
+The stand-ins (`benchmarks.standins`) run in a separate process with the given latency. Each
+run starts a fresh interpreter that resolves the content snapshot from the stand-ins and
+sends one channel to N synthetic recipients read from a SQLite recipient store, on the sync
+or the async engine. Reported per channel, engine and number of recipients:
+- delivered: recipients marked sent in the outbox
+- requests: channel API requests (a PushDeer request carries up to PUSHDEER_BATCH_SIZE pushkeys)
+- messages_per_s: delivered recipients per second of sending, the snapshot excluded
+- p50_ms / p99_ms: latency of the channel API requests, retries and pacing included
+- snapshot_ms: time to resolve weather, quote and weibo
+- peak_rss_kb: peak resident set size of the run
+
+Usage: python -m benchmarks.delivery_load [--recipients 10 1000 100000] [--engine async]
+    [--channel wechat] [--latency 20,wechat=50] [--concurrency 50]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from benchmarks.hotsearch_load import percentile
+from benchmarks.standins import parse_latencies, standin_env
+from service.recipient_store import SqliteRecipientStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHANNELS = ("pushdeer", "pushplus", "wechat")
+
+# cities of the synthetic recipients, one weather request each
+CITIES = [("上海", "上海"), ("北京", "北京"), ("广东", "深圳"), ("浙江", "杭州")]
+
+RUN = """
+import json, resource, sys, time
+from service.resilience import resilience
+
+channel, engine, concurrency, result_path = sys.argv[1:]
+latencies = []
+call, call_async = resilience.call, resilience.call_async
+
+def timed_call(url, send):
+    started = time.perf_counter()
+    try:
+        return call(url, send)
+    finally:
+        latencies.append(time.perf_counter() - started)
+
+async def timed_call_async(url, send):
+    started = time.perf_counter()
+    try:
+        return await call_async(url, send)
+    finally:
+        latencies.append(time.perf_counter() - started)
+
+resilience.call, resilience.call_async = timed_call, timed_call_async
+
+import morning
+from service.outbox import outbox
+from service.recipient_store import recipient_store
+from service.snapshot import ContentSnapshot
+
+started = time.perf_counter()
+snapshot = ContentSnapshot.resolve(locations=recipient_store().locations([channel]))
+resolved = time.perf_counter()
+if engine == "async":
+    import asyncio
+    platform = morning.load_platform(morning.ASYNC_PLATFORMS[channel])(snapshot)
+    asyncio.run(platform.run_async(int(concurrency)))
+else:
+    morning.load_platform(morning.PLATFORMS[channel][1])(snapshot).run()
+finished = time.perf_counter()
+
+delivered = outbox.connection.execute(
+    "SELECT COUNT(*) FROM deliveries WHERE channel = ? AND state = 'sent'", (channel,)
+).fetchone()[0]
+with open(result_path, "w") as file:
+    json.dump({
+        "delivered": delivered,
+        "seconds": finished - resolved,
+        "snapshot_ms": (resolved - started) * 1000,
+        "latencies": latencies,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }, file)
+"""
+
+
+def synthetic_recipients(count: int):
+    """
+    Generate recipient rows for every channel.
+
+    Parameters:
+    - count (int): recipients per channel
+
+    Returns:
+    - Iterator[dict]: FIELDS -> value per recipient
+    """
+    for channel in CHANNELS:
+        for index in range(count):
+            province, city = CITIES[index % len(CITIES)]
+            yield {
+                "channel": channel,
+                "address": f"{channel}-{index:07d}",
+                "name": f"宝贝{index}",
+                "province": province,
+                "city": city,
+                "love_date": "2020-05-20" if index % 7 == 0 else "",
+            }
+
+
+def start_standins(latency: str) -> tuple:
+    """
+    Start the stand-ins in a separate process, so that they do not share the run's CPU time.
+
+    Parameters:
+    - latency (str): latency specification, see `benchmarks.standins.parse_latencies`
+
+    Returns:
+    - tuple: (process, base URL)
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.standins", "--latency", latency],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    port = int(process.stdout.readline())
+    return process, f"http://127.0.0.1:{port}"
+
+
+def run(
+    channel: str, engine: str, concurrency: int, recipients_path: str, url: str
+) -> dict:
+    """
+    Send one channel to every recipient of a store in a fresh interpreter.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+    - engine (str): "sync" or "async"
+    - concurrency (int): in-flight requests of the async engine
+    - recipients_path (str): SQLite recipient store
+    - url (str): base URL of the stand-ins
+
+    Returns:
+    - dict: the measurements
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        result_path = os.path.join(cache_dir, "result.json")
+        env = dict(
+            os.environ,
+            **standin_env(url),
+            PYTHONPATH=ROOT,
+            CACHE_DIR=cache_dir,
+            RECIPIENTS_PATH=recipients_path,
+            PROVINCE="上海",
+            CITY="上海",
+            LOVE_DATE="2021-10-17",
+            BIRTHDAY="2000-01-01",
+            APP_ID="app",
+            APP_SECRET="secret",
+            TEMPLATE_ID="template",
+        )
+        subprocess.run(
+            [sys.executable, "-c", RUN, channel, engine, str(concurrency), result_path],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        with open(result_path, encoding="utf-8") as file:
+            result = json.load(file)
+
+    latencies = sorted(latency * 1000 for latency in result.pop("latencies"))
+    seconds = result.pop("seconds")
+    return {
+        "delivered": result["delivered"],
+        "requests": len(latencies),
+        "messages_per_s": result["delivered"] / seconds if seconds else 0,
+        "p50_ms": percentile(latencies, 0.5) if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) if latencies else None,
+        "snapshot_ms": result["snapshot_ms"],
+        "peak_rss_kb": result["peak_rss_kb"],
+    }
+
+
+def main():
+    """
+    Run the benchmark and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recipients", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--channel", choices=CHANNELS, action="append")
+    parser.add_argument("--engine", choices=["sync", "async"], action="append")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--latency",
+        default="5",
+        help='stand-in latency in ms, "ms" for every upstream and/or "upstream=ms"',
+    )
+    args = parser.parse_args()
+
+    latencies = parse_latencies(args.latency)
+    process, url = start_standins(args.latency)
+    report = {
+        "latency_ms": {name: value * 1000 for name, value in latencies.items()},
+        "concurrency": args.concurrency,
+        "results": {},
+    }
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for count in args.recipients:
+                recipients_path = os.path.join(directory, f"recipients-{count}.sqlite3")
+                SqliteRecipientStore(recipients_path).add(synthetic_recipients(count))
+                for channel in args.channel or CHANNELS:
+                    for engine in args.engine or ["sync", "async"]:
+                        report["results"][f"{channel}/{engine}/{count}"] = run(
+                            channel, engine, args.concurrency, recipients_path, url
+                        )
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
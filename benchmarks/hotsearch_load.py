@@ -0,0 +1,165 @@
+"""
+Load test the Weibo hot search server.
+
+Starts `service.weibo.server` in a separate process, fed with a synthetic hot search list so
+weibo.com is never hit (or targets a running server with --url), then polls it from
+keep-alive clients spread over several processes. Reported:
+- requests / errors: completed requests and failed ones
+- requests_per_s: completed requests per second over the test duration
+- p50_ms / p99_ms / max_ms: request latency
+
+Usage: python -m benchmarks.hotsearch_load [--url URL] [--clients N] [--duration S] [--gzip]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+from service.weibo.server import HotSearchCache, HotSearchServer, WeiboHotSearchHandler
+
+def fetch(topn):
+    return [
+        {"word": f"话题{i}", "title": f"热搜话题第{i}条", "num": 1000000 - i, "rank": i,
+         "url": f"https://s.weibo.com/weibo?q=%23话题{i}%23"}
+        for i in range(topn)
+    ]
+
+WeiboHotSearchHandler.cache = HotSearchCache(interval=3600, fetch=fetch).start()
+server = HotSearchServer(("127.0.0.1", 0), WeiboHotSearchHandler)
+print(server.server_address[1], flush=True)
+server.serve_forever()
+"""
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def poll(url: str, threads: int, duration: float, headers: dict) -> tuple:
+    """
+    Poll a URL from keep-alive client threads.
+
+    Parameters:
+    - url (str): URL to poll
+    - threads (int): number of client threads, one connection each
+    - duration (float): seconds to poll for
+    - headers (dict): request headers
+
+    Returns:
+    - tuple: (latencies in ms, number of errors)
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        own = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(response.status)
+                own.append((time.perf_counter() - started) * 1000)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+        connection.close()
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors[0]
+
+
+def main():
+    """
+    Run the load test and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="running server to test (optional)")
+    parser.add_argument("--query", default="topn=20&format=json")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument(
+        "--gzip", action="store_true", help="send Accept-Encoding: gzip"
+    )
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = subprocess.Popen(
+            [sys.executable, "-c", SERVER],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        url = f"http://127.0.0.1:{server.stdout.readline().strip()}/"
+    url += ("&" if "?" in url else "?") + args.query
+    headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+
+    processes = max(1, min(args.processes, args.clients))
+    shares = [
+        args.clients // processes + (i < args.clients % processes)
+        for i in range(processes)
+    ]
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(
+                poll, [(url, share, args.duration, headers) for share in shares]
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    report = {
+        "url": url,
+        "clients": args.clients,
+        "processes": processes,
+        "gzip": args.gzip,
+        "requests": len(latencies),
+        "errors": sum(result[1] for result in results),
+        "requests_per_s": len(latencies) / args.duration,
+    }
+    if latencies:
+        report.update(
+            p50_ms=statistics.median(latencies),
+            p99_ms=percentile(latencies, 0.99),
+            max_ms=latencies[-1],
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
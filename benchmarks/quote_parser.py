@@ -0,0 +1,203 @@
+"""
+Compare the streaming daily quote parser with the former split-based parser.
+
+The page is served from a local HTTP server throttled to a link speed, either a saved copy
+of the wufazhuce.com homepage (--page) or a synthetic page with the same structure: the
+quote carousel near the top followed by the rest of the homepage. Reported per parser:
+- latency_ms: time to get the quote, median of the runs
+- bytes_received: response body bytes read from the socket
+- peak_kb: peak memory allocated while getting the quote (tracemalloc)
+
+Usage: python -m benchmarks.quote_parser [--page PATH] [--rate KIB_PER_S] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from service.parameters import ParameterResolver
+from service.transport import transport
+
+CHUNK_SIZE = 4096
+
+
+def synthetic_page(quotes: int = 10, items: int = 120) -> bytes:
+    """
+    Build a page shaped like the wufazhuce.com homepage.
+
+    Parameters:
+    - quotes (int): number of carousel entries, each with a quote
+    - items (int): number of article entries below the carousel
+
+    Returns:
+    - bytes: the UTF-8 page
+    """
+    head = (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+        "<title>「ONE · 一个」</title>"
+        + '<link rel="stylesheet" href="/css/style.css">' * 20
+        + "<script>var config = {%s};</script>"
+        % ",".join(f'"k{i}": "{"v" * 40}"' for i in range(60))
+        + "</head><body><div class='container'>"
+    )
+    carousel = "".join(
+        '<div class="item"><div class="fp-one-imagen-footer">VOL.{0} 摄影</div>'
+        '<div class="fp-one-cita-wrapper"><div class="fp-one-titulo-pubdate">'
+        '<p class="dom">{0}</p><p class="may">Oct 2026</p></div>'
+        '<div class="fp-one-cita"><a href="http://wufazhuce.com/one/{0}">'
+        "每日一句第{0}条：生活不止眼前的苟且，还有诗和远方。</a></div></div></div>".format(
+            index
+        )
+        for index in range(quotes)
+    )
+    articles = "".join(
+        '<div class="fp-one-articulo"><p class="one-articulo-titulo">'
+        f'<a href="http://wufazhuce.com/article/{index}">文章标题 {index}</a></p>'
+        f"<p class='one-articulo-autor'>作者 {index}</p>"
+        f"<p>{'这是一段文章摘要。' * 20}</p></div>"
+        for index in range(items)
+    )
+    return (
+        head
+        + f'<div id="carousel-one" class="carousel">{carousel}</div>'
+        + articles
+        + "<footer>ONE · 一个</footer></div></body></html>"
+    ).encode("utf-8")
+
+
+def split_quote(url: str) -> str:
+    """
+    The former parser: download the whole page and cut the quote out with split calls.
+
+    Parameters:
+    - url (str): URL of the page
+
+    Returns:
+    - str: the quote
+    """
+    response = transport.get(url)
+    response.encoding = "utf-8"
+    text = response.text
+    return (
+        text.split("fp-one-cita-wrapper")[1]
+        .split("fp-one-cita")[1]
+        .split(">")[2]
+        .split("<")[0]
+    )
+
+
+def serve(page: bytes, rate: float) -> ThreadingHTTPServer:
+    """
+    Serve a page on a local port, throttled to a link speed.
+
+    Parameters:
+    - page (bytes): the page
+    - rate (float): link speed in KiB/s, 0 for unthrottled
+
+    Returns:
+    - ThreadingHTTPServer: the running server
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the streaming parser closed the connection early
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            for start in range(0, len(page), CHUNK_SIZE):
+                self.wfile.write(page[start : start + CHUNK_SIZE])
+                if rate:
+                    time.sleep(CHUNK_SIZE / (rate * 1024))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(fetch, url: str, repeat: int) -> dict:
+    """
+    Measure a parser.
+
+    Parameters:
+    - fetch (Callable[[str], str]): the parser, takes the page URL and returns the quote
+    - url (str): URL of the page
+    - repeat (int): number of runs, the median latency is reported
+
+    Returns:
+    - dict: quote, latency, bytes received and peak memory
+    """
+    host = transport.host_of(url)
+    latencies = []
+    before = transport.host_stats(host).bytes_received
+    for _ in range(repeat):
+        started = time.perf_counter()
+        quote = fetch(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+    received = (transport.host_stats(host).bytes_received - before) / repeat
+
+    tracemalloc.start()
+    fetch(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "quote": quote,
+        "latency_ms": statistics.median(latencies),
+        "bytes_received": received,
+        "peak_kb": peak / 1024,
+    }
+
+
+def main():
+    """
+    Run the benchmark and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page", help="saved copy of the homepage (optional)")
+    parser.add_argument("--rate", type=float, default=256, help="KiB/s, 0 = no limit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.page:
+        with open(args.page, "rb") as file:
+            page = file.read()
+    else:
+        page = synthetic_page()
+
+    server = serve(page, args.rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    report = {"page_bytes": len(page), "rate_kib_s": args.rate}
+    try:
+        for label, fetch in [
+            ("split", split_quote),
+            ("streaming", ParameterResolver.get_daily_quote),
+        ]:
+            report[label] = measure(fetch, url, args.repeat)
+    finally:
+        server.shutdown()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Local stand-ins of every upstream API, each with a configurable latency.
+
+One HTTP server answers, under a prefix per upstream:
+- weather: /weather/dingzhi/{AREAID}.html, the weather.com.cn `dingzhi` script
+- quote: /one/, a page shaped like the wufazhuce.com homepage
+- weibo: /weibo/ajax/side/hotSearch, 50 hot search items
+- pushdeer: /pushdeer/message/push, a success per pushkey
+- pushplus: /pushplus/send, the real `{"code": 200, "msg": ..., "data": ...}` body
+- wechat: /wechat/cgi-bin/token and /wechat/cgi-bin/message/template/send
+GET /stats returns the number of requests per upstream. `standin_env` gives the environment
+that points the service at the stand-ins.
+
+Usage: python -m benchmarks.standins [--port 0] [--latency 20,wechat=50]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+UPSTREAMS = ("weather", "quote", "weibo", "pushdeer", "pushplus", "wechat")
+
+# path prefix -> upstream
+PREFIXES = {
+    "/weather/": "weather",
+    "/one/": "quote",
+    "/weibo/": "weibo",
+    "/pushdeer/": "pushdeer",
+    "/pushplus/": "pushplus",
+    "/wechat/": "wechat",
+}
+
+HOT_SEARCH = json.dumps(
+    {
+        "ok": 1,
+        "data": {
+            "realtime": [
+                {
+                    "word": f"话题{rank}",
+                    "note": f"热搜话题第{rank}条",
+                    "num": 10**6 - rank,
+                    "rank": rank,
+                }
+                for rank in range(50)
+            ]
+        },
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+
+SUCCESS = json.dumps({"success": "ok"})
+
+
+def parse_latencies(spec: str) -> Dict[str, float]:
+    """
+    Parse a latency specification.
+
+    Parameters:
+    - spec (str): comma-separated "upstream=ms" entries, a bare "ms" sets every upstream
+
+    Returns:
+    - dict: upstream -> latency in seconds
+    """
+    latencies = dict.fromkeys(UPSTREAMS, 0.0)
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        upstream, _, value = entry.rpartition("=")
+        if upstream and upstream not in latencies:
+            raise ValueError(f"Unknown upstream {upstream}, one of {UPSTREAMS}")
+        for name in [upstream] if upstream else UPSTREAMS:
+            latencies[name] = float(value) / 1000
+    return latencies
+
+
+def weather_script(area_id: str) -> bytes:
+    """
+    Build the `dingzhi` script of a city.
+
+    Parameters:
+    - area_id (str): AREAID of the city
+
+    Returns:
+    - bytes: the UTF-8 script
+    """
+    info = {
+        "city": area_id,
+        "cityname": "城市",
+        "temp": "25℃",
+        "tempn": "16℃",
+        "weather": "多云转晴",
+    }
+    return (
+        f"var cityDZ{area_id} ={json.dumps({'weatherinfo': info}, ensure_ascii=False)};"
+        f'var alarmDZ{area_id} ={{"w":[]}}'
+    ).encode("utf-8")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers every upstream after its latency, on keep-alive connections.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out without a delayed ACK
+    latencies: Dict[str, float] = dict.fromkeys(UPSTREAMS, 0.0)
+    counts: Dict[str, int] = dict.fromkeys(UPSTREAMS, 0)
+    first_request: Optional[float] = None
+    lock = threading.Lock()
+    quote_page = b""
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def reply(self, body: bytes, content_type: str = "application/json") -> None:
+        """
+        Send a response.
+
+        Parameters:
+        - body (bytes): response body
+        - content_type (str): Content-Type. Default is JSON
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def upstream(self) -> Optional[str]:
+        """
+        Count the request, wait for the latency of its upstream.
+
+        Returns:
+        - str: the upstream, None for an unknown path
+        """
+        for prefix, upstream in PREFIXES.items():
+            if self.path.startswith(prefix):
+                break
+        else:
+            return None
+        cls = type(self)
+        with cls.lock:
+            cls.counts[upstream] += 1
+            if cls.first_request is None:
+                cls.first_request = time.perf_counter()
+        if cls.latencies[upstream]:
+            time.sleep(cls.latencies[upstream])
+        return upstream
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        parts = urlsplit(self.path)
+        if parts.path == "/stats":
+            self.reply(json.dumps(type(self).counts).encode("utf-8"))
+            return
+        upstream = self.upstream()
+        if upstream == "weather":
+            area_id = parts.path.rsplit("/", 1)[-1].split(".")[0]
+            self.reply(weather_script(area_id), "application/javascript")
+        elif upstream == "quote":
+            self.reply(type(self).quote_page, "text/html")
+        elif upstream == "weibo":
+            self.reply(HOT_SEARCH)
+        elif upstream == "pushdeer":
+            pushkeys = parse_qs(parts.query).get("pushkey", [""])[0].split(",")
+            body = {"code": 0, "content": {"result": [SUCCESS] * len(pushkeys)}}
+            self.reply(json.dumps(body).encode("utf-8"))
+        elif upstream == "wechat" and parts.path.endswith("/token"):
+            self.reply(b'{"access_token": "stand-in-token", "expires_in": 7200}')
+        else:
+            self.send_error(404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        upstream = self.upstream()
+        if upstream == "pushplus":
+            with type(self).lock:
+                message_id = type(self).counts["pushplus"]
+            body = {"code": 200, "msg": "请求成功", "data": f"{message_id:032x}"}
+            self.reply(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+        elif upstream == "wechat":
+            self.reply(b'{"errcode": 0, "errmsg": "ok"}')
+        else:
+            self.send_error(404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Threaded server of the stand-ins, with a backlog for many concurrent clients.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients closing
+            super().handle_error(request, client_address)
+
+
+def start(latencies: Optional[Dict[str, float]] = None, port: int = 0) -> StandInServer:
+    """
+    Start the stand-ins on a background thread.
+
+    Parameters:
+    - latencies (dict): upstream -> latency in seconds, unset upstreams answer at once (optional)
+    - port (int): port to listen on, 0 for any free port. Default is 0
+
+    Returns:
+    - StandInServer: the running server, stop it with `shutdown`
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from benchmarks.quote_parser import synthetic_page
+
+    StandInHandler.latencies = {**dict.fromkeys(UPSTREAMS, 0.0), **(latencies or {})}
+    StandInHandler.counts = dict.fromkeys(UPSTREAMS, 0)
+    StandInHandler.first_request = None
+    StandInHandler.quote_page = synthetic_page()
+    server = StandInServer(("127.0.0.1", port), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def standin_env(url: str) -> Dict[str, str]:
+    """
+    Get the environment variables pointing every upstream of the service at the stand-ins.
+
+    Parameters:
+    - url (str): base URL of the stand-in server, e.g. http://127.0.0.1:8000
+
+    Returns:
+    - dict: variable -> value
+    """
+    return {
+        "WEATHER_SERVER_URL": f"{url}/weather",
+        "QUOTE_URL": f"{url}/one/",
+        "WEIBO_HOT_SEARCH_URL": f"{url}/weibo/ajax/side/hotSearch",
+        "PUSHDEER_SERVER_URL": f"{url}/pushdeer",
+        "PUSHPLUS_SERVER_URL": f"{url}/pushplus",
+        "WECHAT_TOKEN_URL": f"{url}/wechat/cgi-bin/token",
+        "WECHAT_MESSAGE_URL": f"{url}/wechat/cgi-bin/message/template/send",
+    }
+
+
+def main():
+    """
+    Serve the stand-ins until interrupted, the port is printed on the first line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument(
+        "--latency", default="", help='"ms" for every upstream and/or "upstream=ms"'
+    )
+    args = parser.parse_args()
+
+    server = start(parse_latencies(args.latency), args.port)
+    print(server.server_address[1], flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
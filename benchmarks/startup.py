@@ -0,0 +1,193 @@
+"""
+Measure the cold start of a morning run, per channel.
+
+Each run starts a fresh interpreter with `python -X importtime`, imports `morning` and runs
+one channel the way `morning.py --channel NAME` does, against the local stand-ins of
+`benchmarks.standins` (the content snapshot is fixed, weather, quote and weibo are not
+fetched). The `eager` variant also imports every channel module and asyncio up front, as `morning.py`
+used to. Reported per channel and variant (medians):
+- import_ms: total time spent importing modules during the run (-X importtime)
+- modules: number of modules imported
+- time_to_first_request_ms: from spawning the interpreter to the first request reaching the API
+- slowest_imports: the modules with the highest self time, in ms
+
+Usage: python -m benchmarks.startup [--repeat N] [--channel NAME]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from benchmarks.standins import StandInHandler, standin_env, start
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+{eager}
+import morning
+from types import MappingProxyType
+from service.snapshot import ContentSnapshot
+
+snapshot = ContentSnapshot(
+    date="2026-01-01 星期四", weather=MappingProxyType({{}}), love_day=1, birthday=1,
+    one="", weibo_top_list=(), weibo_topn_markdown="", weibo_topn_text="",
+    weibo_delta_markdown="", weibo_delta_text="",
+)
+morning.load_platform(morning.PLATFORMS["{channel}"][1])(snapshot).run()
+"""
+
+EAGER = """
+import asyncio
+import service.channel.pushdeer.pushdeer
+import service.channel.pushplus.pushplus
+import service.channel.wechat_public_tester.wechat_public_tester
+"""
+
+# channel -> environment of a run with a single recipient, the other channels are unset
+CHANNELS = {
+    "pushdeer": {"PUSHDEER_PUSHKEYS": "PDU0"},
+    "wechat": {
+        "USER_IDS": "openid0",
+        "APP_ID": "app",
+        "APP_SECRET": "secret",
+        "TEMPLATE_ID": "template",
+    },
+    "pushplus": {"PUSHPLUS_TOKENS": "token0"},
+}
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """
+    Parse the output of -X importtime.
+
+    Parameters:
+    - stderr (str): standard error of the interpreter
+
+    Returns:
+    - tuple: (total import time in ms, number of modules, module -> self time in ms)
+    """
+    total, self_times = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        self_times[name.strip()] = int(self_us) / 1000
+        if not name.startswith("  "):  # top-level import, includes its children
+            total += int(cumulative_us)
+    return total / 1000, len(self_times), self_times
+
+
+def run_once(channel: str, eager: bool, url: str) -> dict:
+    """
+    Run one channel in a fresh interpreter.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+    - eager (bool): whether every channel module is imported up front
+    - url (str): URL of the stand-in server
+
+    Returns:
+    - dict: import time, modules, time to first request and self time per module
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ("PUSHDEER_PUSHKEYS", "PUSHPLUS_TOKENS", "USER_IDS")
+        }
+        env.update(
+            CHANNELS[channel],
+            PYTHONPATH=ROOT,
+            NAMES="koni",
+            PROVINCE="上海",
+            CITY="上海",
+            CACHE_DIR=cache_dir,
+            RETRY_ATTEMPTS="1",
+            **standin_env(url),
+        )
+        source = PROBE.format(eager=EAGER if eager else "", channel=channel)
+        StandInHandler.first_request = None
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", source],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    if StandInHandler.first_request is None:
+        raise RuntimeError(f"{channel} sent no request:\n{process.stdout}")
+    import_ms, modules, self_times = parse_importtime(process.stderr)
+    return {
+        "import_ms": import_ms,
+        "modules": modules,
+        "time_to_first_request_ms": (StandInHandler.first_request - started) * 1000,
+        "self_times": self_times,
+    }
+
+
+def measure(channel: str, eager: bool, url: str, repeat: int) -> dict:
+    """
+    Run a channel `repeat` times.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+    - eager (bool): whether every channel module is imported up front
+    - url (str): URL of the stand-in server
+    - repeat (int): number of runs, the median is reported
+
+    Returns:
+    - dict: median measurements and the slowest imports
+    """
+    run_once(channel, eager, url)  # warm the .pyc
+    runs = [run_once(channel, eager, url) for _ in range(repeat)]
+    result = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("import_ms", "modules", "time_to_first_request_ms")
+    }
+    self_times = {
+        name: statistics.median(run["self_times"].get(name, 0) for run in runs)
+        for name in runs[0]["self_times"]
+    }
+    result["slowest_imports"] = dict(
+        sorted(self_times.items(), key=lambda item: -item[1])[:5]
+    )
+    return result
+
+
+def main():
+    """
+    Run the benchmark and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--channel", choices=list(CHANNELS), action="append")
+    args = parser.parse_args()
+
+    server = start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        report = {
+            f"{channel}/{variant}": measure(
+                channel, variant == "eager", url, args.repeat
+            )
+            for channel in args.channel or CHANNELS
+            for variant in ("lazy", "eager")
+        }
+    finally:
+        server.shutdown()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,205 @@
 import argparse
-from service.channel.pushdeer.pushdeer import PushDeerPlatform
-from service.channel.pushplus.pushplus import PushPlusPlatform
-from service.channel.wechat_public_tester.wechat_public_tester import (
-    WechatTesterPlatform,
-)
+import importlib
+import sys
+import time
+from contextlib import nullcontext
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+from service.config import Config
+from service.summary import RunSummary
+
+if TYPE_CHECKING:
+    from service.snapshot import ContentSnapshot
+
+# channel name -> (display name, platform "module:class"), imported only when the channel runs
+PLATFORMS = {
+    "pushdeer": ("PushDeer", "service.channel.pushdeer.pushdeer:PushDeerPlatform"),
+    "wechat": (
+        "WeChat",
+        "service.channel.wechat_public_tester.wechat_public_tester:WechatTesterPlatform",
+    ),
+    "pushplus": ("PushPlus", "service.channel.pushplus.pushplus:PushPlusPlatform"),
+}
+
+# channel name -> async platform "module:class", imported only by the async engine
+ASYNC_PLATFORMS = {
+    "pushdeer": "service.channel.pushdeer.pushdeer_async:AsyncPushDeerPlatform",
+    "wechat": "service.channel.wechat_public_tester.wechat_public_tester_async:AsyncWechatTesterPlatform",
+    "pushplus": "service.channel.pushplus.pushplus_async:AsyncPushPlusPlatform",
+}
+
+
+def load_platform(path: str) -> type:
+    """
+    Import a platform class, so that a run only loads the modules of its channels.
 
+    Parameters:
+    - path (str): "module:class"
 
-def morning(channel: str):
+    Returns:
+    - type: the platform class
     """
-    Send push notifications to the selected channel or all channels.
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def run_channel(channel: str, snapshot: "ContentSnapshot", summary: RunSummary) -> None:
+    """
+    Run a single channel and record its wall-clock time in the run summary.
 
     Parameters:
-    - channel (str): "pushdeer", "wechat", "pushplus or "all"
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+    - snapshot (ContentSnapshot): run-scoped content shared by all channels
+    - summary (RunSummary): summary of the current run
     """
-    if channel == "pushdeer":
-        print("Running PushDeer...")
-        PushDeerPlatform().run()
+    display_name, path = PLATFORMS[channel]
+    platform = load_platform(path)
+    print(f"Running {display_name}...")
+    with summary.channel(channel):
+        platform(snapshot).run()
 
-    elif channel == "wechat":
-        print("Running WeChat...")
 
-        WechatTesterPlatform().run()
+async def run_channel_async(
+    channel: str, snapshot: "ContentSnapshot", summary: RunSummary, concurrency: int
+) -> None:
+    """
+    Run a single channel on the asyncio engine and record its wall-clock time in the run summary.
 
-    elif channel == "pushplus":
-        print("Running PushPlus...")
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+    - snapshot (ContentSnapshot): run-scoped content shared by all channels
+    - summary (RunSummary): summary of the current run
+    - concurrency (int): maximum number of in-flight requests of the channel
+    """
+    display_name = PLATFORMS[channel][0]
+    platform = load_platform(ASYNC_PLATFORMS[channel])
+    print(f"Running {display_name} (async)...")
+    with summary.channel(channel):
+        await platform(snapshot).run_async(concurrency)
 
-        PushPlusPlatform().run()
 
-    elif channel == "all":
-        print("Running ALl...")
+async def morning_async(
+    channels: list, snapshot: "ContentSnapshot", summary: RunSummary, concurrency: int
+) -> None:
+    """
+    Run the selected channels at the same time on one event loop.
 
-        PushDeerPlatform().run()
-        WechatTesterPlatform().run()
-        PushPlusPlatform().run()
+    Parameters:
+    - channels (list): channel names
+    - snapshot (ContentSnapshot): run-scoped content shared by all channels
+    - summary (RunSummary): summary of the current run
+    - concurrency (int): maximum number of in-flight requests per channel
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    await asyncio.gather(
+        *(run_channel_async(name, snapshot, summary, concurrency) for name in channels)
+    )
+
+
+def morning(
+    channel: str,
+    engine: str = "sync",
+    concurrency: Optional[int] = None,
+    replay: bool = False,
+    profile: bool = False,
+):
+    """
+    Send push notifications to the selected channel or all channels.
 
+    With "all", the channels run at the same time on a bounded worker pool,
+    so the total run time is roughly the slowest channel. The "async" engine
+    sends to the recipients of every channel concurrently as well.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat", "pushplus or "all"
+    - engine (str): "sync" or "async". Default is "sync"
+    - concurrency (int): maximum number of in-flight requests per channel of the async engine (optional)
+    - replay (bool): render and send today's dead letters of the selected channels again. Default is False
+    - profile (bool): profile each stage of the run (the snapshot, then each channel, or all
+      channels at once on the async engine) into Config.PROFILE_DIR, the channels of the
+      sync engine run one at a time. Default is False
+
+    Returns:
+    - RunSummary: summary of the run, None for an invalid channel
+
+    Raises:
+    - Exception: an error of a channel raised outside its run, e.g. importing its platform
+    """
+    if channel == "all":
+        channels = list(PLATFORMS)
+    elif channel in PLATFORMS:
+        channels = [channel]
     else:
         print("Invalid channel. Choose 'pushdeer', 'wechat', 'pushplus' or 'all'.")
+        return
+
+    # pylint: disable=import-outside-toplevel
+    # loaded only by a run, importing this module (e.g. for a fixed snapshot) stays cheap
+    from service.metrics import LAST_RUN, RUN_SECONDS, metrics
+    from service.recipient_store import recipient_store
+    from service.snapshot import ContentSnapshot
+    from service.transport import transport
+
+    if replay:
+        from service.outbox import outbox  # pylint: disable=import-outside-toplevel
+
+        today = date.today().isoformat()
+        count = sum(outbox.requeue(today, name) for name in channels)
+        print(f"Replaying {count} dead letters.")
+
+    profiler = None
+    if profile:
+        from service.profiling import (  # pylint: disable=import-outside-toplevel
+            StageProfiler,
+        )
+
+        profiler = StageProfiler(Config.PROFILE_DIR)
+
+    summary = RunSummary()
+
+    # Resolve the shared content once, every platform and recipient reuses it.
+    # Weather is fetched once per distinct city of the selected channels' recipients.
+    with profiler.stage("snapshot") if profiler else nullcontext():
+        snapshot = ContentSnapshot.resolve(
+            locations=recipient_store().locations(channels)
+        )
+
+    if engine == "async":
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        concurrency = concurrency or Config.ASYNC_CONCURRENCY
+        with profiler.stage("channels") if profiler else nullcontext():
+            asyncio.run(morning_async(channels, snapshot, summary, concurrency))
+    elif profiler:
+        # one stage at a time, so that each profile holds a single channel
+        for name in channels:
+            with profiler.stage(name):
+                run_channel(name, snapshot, summary)
+    else:
+        workers = max(1, min(Config.CHANNEL_WORKERS, len(channels)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(run_channel, name, snapshot, summary) for name in channels
+            ]
+
+    summary.finish()
+    print(summary.report())
+    print(transport.report())
+    if profiler:
+        print(profiler.report())
+        print(f"Profile written to {profiler.write()}")
+
+    RUN_SECONDS.set(summary.elapsed)
+    LAST_RUN.set(time.time())
+    if Config.METRICS_PATH:
+        metrics.write_textfile(Config.METRICS_PATH)
+
+    if engine != "async" and not profiler:
+        for future in futures:
+            future.result()  # errors raised outside summary.channel
+    return summary
 
 
 def main():
@@ -53,8 +217,38 @@ def main():
         help="Select which channel to send notification: 'pushdeer', 'wechat', 'pushplus' or 'all'.",
     )
 
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default="sync",
+        help="Select the delivery engine: 'sync' sends one recipient at a time, 'async' sends concurrently.",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Maximum number of in-flight requests per channel of the async engine (default: ASYNC_CONCURRENCY).",
+    )
+
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Render and send today's dead-lettered deliveries of the selected channels again.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record a CPU profile and the memory peak and top allocations of each stage into PROFILE_DIR.",
+    )
+
     args = parser.parse_args()
-    morning(args.channel)
+    summary = morning(
+        args.channel, args.engine, args.concurrency, args.replay, args.profile
+    )
+    if summary is None or summary.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
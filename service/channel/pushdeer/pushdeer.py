@@ -1,9 +1,16 @@
 import json
-from typing import Optional, Union
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import urlencode
 from service.config import Config
-import requests
-from service.parameters import ParameterResolver
-from service.weibo.topn import formatted_top_list
+from service.metrics import RENDERED_MESSAGES, stage
+from service.outbox import outbox
+from service.ratelimit import rate_limiter
+from service.resilience import resilience
+from service.transport import transport
+from service.template import PartialTemplate, encode_query, load_template
+from service.recipient import Recipient
+from service.recipient_store import recipient_store
+from service.snapshot import ContentSnapshot
 
 
 class PushDeer:
@@ -13,92 +20,193 @@ class PushDeer:
     Paramters:
     - server (str): API Server address
     - pushkey (str): PushDeer pushkey (optional)
+    - batch_size (int): maximum number of pushkeys per request (optional)
     """
 
     endpoint = "/message/push"
 
-    def __init__(self, server: Optional[str] = None, pushkey: Optional[str] = None):
+    def __init__(
+        self,
+        server: Optional[str] = None,
+        pushkey: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
         """
         Initialize the PushDeer class.
 
         Parameters:
         - server (str): API Server address
         - pushkey (str): PushDeer pushkey (optional)
+        - batch_size (int): maximum number of pushkeys per request (optional)
         """
         self.server = server or Config.PUSHDEER_SERVER_URL
         self.pushkey = pushkey
+        self.batch_size = batch_size or Config.PUSHDEER_BATCH_SIZE
 
     def _push(
         self,
-        text: str,
+        text: Union[str, bytes],
         desp: Optional[str] = None,
         server: Optional[str] = None,
-        pushkey: Optional[str] = None,
+        pushkey: Union[str, list, None] = None,
         text_type: Optional[str] = None,
-        **kwargs
+        **kwargs,
     ) -> bool:
         """
         Internal method: send push request.
 
         Parameters:
-        - text (str): main content of the message
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
         - desp (str): additional description of the message (optional)
         - server (str): API base address (optional)
-        - pushkey (str): pushkey (optional)
+        - pushkey (Union[str, list, None]): pushkey, or pushkeys sent in batches (optional)
         - text_type (str): message type (text, markdown, image)
         - kwargs: other request parameters
 
         Returns:
-        - bool: True if successful, otherwise False
+        - bool: True if successful for every pushkey, otherwise False
         """
         # Check if pushkey is specified
         pushkey = pushkey or self.pushkey
         if not pushkey:
             raise ValueError("Pushkey must be specified")
 
-        # Send the push request and check the result
-        response = self._send_push_request(
-            desp, pushkey, server or self.server, text, text_type, **kwargs
-        )
+        # Send the push requests and check the results
+        pushkeys = pushkey if isinstance(pushkey, list) else [pushkey]
+        results = self._push_batch(text, desp, server, pushkeys, text_type, **kwargs)
+        return all(results.values())
+
+    def _push_batch(
+        self,
+        text: Union[str, bytes],
+        desp: Optional[str],
+        server: Optional[str],
+        pushkeys: list,
+        text_type: Optional[str],
+        **kwargs,
+    ) -> Dict[str, bool]:
+        """
+        Internal method: send one push request per batch of at most `batch_size` comma-joined pushkeys.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - desp (str): additional description of the message (optional)
+        - server (str): API base address (optional)
+        - pushkeys (list): pushkeys
+        - text_type (str): message type (text, markdown, image)
+        - kwargs: other request parameters
+
+        Returns:
+        - dict: pushkey -> True if successful, otherwise False
+        """
+        if isinstance(text, str):
+            text = encode_query(text)  # once for every batch
+        results = {}
+        for batch in self.batches(pushkeys, self.batch_size):
+            response = self._send_push_request(
+                desp, ",".join(batch), server or self.server, text, text_type, **kwargs
+            )
+            results.update(self._parse_results(response, batch))
+        return results
+
+    @staticmethod
+    def batches(pushkeys: list, size: int) -> List[list]:
+        """
+        Split pushkeys into batches.
+
+        Parameters:
+        - pushkeys (list): pushkeys
+        - size (int): maximum number of pushkeys per batch
+
+        Returns:
+        - list: the batches, in order
+        """
+        size = max(1, size)
+        return [
+            pushkeys[start : start + size] for start in range(0, len(pushkeys), size)
+        ]
+
+    @staticmethod
+    def _parse_results(response: dict, pushkeys: list) -> Dict[str, bool]:
+        """
+        Internal method: check whether the PushDeer API accepted the push for each pushkey.
+
+        Parameters:
+        - response (dict): API response, its result list holds one JSON document per pushkey, in request order
+        - pushkeys (list): pushkeys of the request
+
+        Returns:
+        - dict: pushkey -> True if successful, otherwise False
+        """
+        results = []
         if "content" in response and response["content"].get("result"):
-            result = json.loads(response["content"]["result"][0])
-            return result.get("success") == "ok"
-        return False
+            results = response["content"]["result"]
+        return {
+            pushkey: index < len(results)
+            and json.loads(results[index]).get("success") == "ok"
+            for index, pushkey in enumerate(pushkeys)
+        }
+
+    @staticmethod
+    def encode_params(
+        key: Union[str, list],
+        text: bytes,
+        text_type: Optional[str],
+        desp: Optional[str] = None,
+    ) -> str:
+        """
+        Build the query string of a push request.
+
+        Parameters:
+        - key (Union[str, list]): pushkey
+        - text (bytes): main content of the message, already encoded with encode_query
+        - text_type (str): message type (text, markdown, image)
+        - desp (str): additional description of the message (optional)
+
+        Returns:
+        - str: the query string, None values are left out as `requests` does
+        """
+        params = {"pushkey": key, "type": text_type, "desp": desp}
+        query = urlencode(
+            {name: value for name, value in params.items() if value is not None},
+            doseq=True,
+        )
+        return "text=" + text.decode("ascii") + "&" + query
 
     def _send_push_request(
         self,
         desp: Optional[str],
         key: str,
         server: str,
-        text: str,
+        text: Union[str, bytes],
         text_type: Optional[str],
-        **kwargs
+        **kwargs,
     ) -> dict:
         """
-        Internal method: send HTTP GET request to PushDeer API.
+        Internal method: send HTTP GET request to PushDeer API, paced and with retries.
 
         Parameters:
         - desp (str): additional description of the message (optional)
         - key (str): pushkey
         - server (str): API Server address
-        - text (str): main content of the message
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
         - text_type (str): message type (text, markdown, image)
         - kwargs: other request parameters
 
         Returns:
         - dict: API response
         """
-        params = {
-            "pushkey": key,
-            "text": text,
-            "type": text_type,
-            "desp": desp,
-        }
-        response = requests.get(
-            server + self.endpoint, params=params, **kwargs, timeout=10
-        )
-        response.raise_for_status()
-        return response.json()
+        if isinstance(text, str):
+            text = encode_query(text)
+        params = self.encode_params(key, text, text_type, desp)
+
+        def send() -> dict:
+            rate_limiter.acquire("pushdeer", server)
+            response = transport.get(server + self.endpoint, params=params, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+        return resilience.call(server, send)
 
     def send_text(
         self,
@@ -106,7 +214,7 @@ class PushDeer:
         desp: Optional[str] = None,
         server: Optional[str] = None,
         pushkey: Union[str, list, None] = None,
-        **kwargs
+        **kwargs,
     ) -> bool:
         """
         Send a text push message.
@@ -127,22 +235,22 @@ class PushDeer:
             server=server,
             pushkey=pushkey,
             text_type="text",
-            **kwargs
+            **kwargs,
         )
 
     def send_markdown(
         self,
-        text: str,
+        text: Union[str, bytes],
         desp: Optional[str] = None,
         server: Optional[str] = None,
         pushkey: Union[str, list, None] = None,
-        **kwargs
+        **kwargs,
     ) -> bool:
         """
         Send a Markdown push message.
 
         Parameters:
-        - text (str): main content of the message
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
         - desp (str): additional description of the message (optional)
         - server (str): API Server address (optional)
         - pushkey (Union[str, list, None]): pushkey (optional)
@@ -157,16 +265,39 @@ class PushDeer:
             server=server,
             pushkey=pushkey,
             text_type="markdown",
-            **kwargs
+            **kwargs,
         )
 
+    def send_markdown_batch(
+        self,
+        text: Union[str, bytes],
+        pushkeys: list,
+        desp: Optional[str] = None,
+        server: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, bool]:
+        """
+        Send the same Markdown push message to many pushkeys, `batch_size` of them per request.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - pushkeys (list): pushkeys
+        - desp (str): additional description of the message (optional)
+        - server (str): API Server address (optional)
+        - kwargs: other request parameters
+
+        Returns:
+        - dict: pushkey -> True if successful, otherwise False
+        """
+        return self._push_batch(text, desp, server, pushkeys, "markdown", **kwargs)
+
     def send_image(
         self,
         image_src: str,
         desp: Optional[str] = None,
         server: Optional[str] = None,
         pushkey: Union[str, list, None] = None,
-        **kwargs
+        **kwargs,
     ) -> bool:
         """
         Send an image push message.
@@ -187,7 +318,7 @@ class PushDeer:
             server=server,
             pushkey=pushkey,
             text_type="image",
-            **kwargs
+            **kwargs,
         )
 
 
@@ -200,13 +331,12 @@ class PushDeerPlatform:
     - pushkey (str): PushDeer pushkey (optional)
     """
 
-    def __init__(self):
+    def __init__(self, snapshot: Optional[ContentSnapshot] = None):
         """
         Initialize the PushDeerPlatform class.
 
         Parameters:
-        - server (str): API Server address
-        - pushkey (str): PushDeer pushkey (optional)
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients (optional)
         """
 
         self.template_id = Config.TEMPLATE_ID
@@ -217,41 +347,162 @@ class PushDeerPlatform:
         self.love_date = Config.LOVE_DATE
         self.birthday = Config.BIRTHDAY
         self.pushkeys = Config.PUSHDEER_PUSHKEYS
+        self.store = recipient_store()
+        self.snapshot = snapshot
+        self.template = load_template("template.md")
+        self.outbox = outbox.channel("pushdeer")
 
-    def push_template_message(self, pushkey: str, name: str) -> None:
-        """
-        Send a template message to a single user.
-        """
-        weather_data = ParameterResolver.get_weather_data()
-        date_str = ParameterResolver.get_today_and_weekday()
-        love_day, birthday_day = ParameterResolver.calculate_days()
-        daily_quote = ParameterResolver.get_daily_quote()
-        weibo_top20 = formatted_top_list(20, True)
-        dict_data = {
-            "date": date_str,
-            "name": name,
-            "city": self.city,
-            "weather": weather_data[0],
-            "max_temperature": weather_data[1],
-            "min_temperature": weather_data[2],
-            "love_day": love_day,
-            "birthday": birthday_day,
-            "one": daily_quote,
-            "weibo_topn": weibo_top20,
-        }
+    def build_message(self, snapshot: ContentSnapshot) -> PartialTemplate:
+        """
+        Pre-render the markdown message shared by all users, encoded as a URL query value.
 
-        md_str = ParameterResolver.render_template("template.md", dict_data)
-        api = PushDeer(pushkey=pushkey)
-        api.send_markdown("# 早上好，亲爱的\n" + md_str)
-        # api.send_markdown("# 早上好，亲爱的", desp=md_str)
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
 
-    def run(self):
+        Returns:
+        - PartialTemplate: the message, only the per-recipient fields are left to render
         """
-        Trigger function, fetch AccessToken, call weather API, send message to all users.
+        return self.template.partial(
+            snapshot.shared_data(markdown=True),
+            encode_query,
+            head="# 早上好，亲爱的\n",
+        )
+
+    def recipient_chunks(self) -> Iterator[List[Recipient]]:
+        """
+        Stream the pushdeer recipients of the store, Config.RECIPIENT_CHUNK_SIZE at a time.
+
+        Returns:
+        - Iterator[List[Recipient]]: the chunks
         """
+        return self.store.chunks("pushdeer")
 
-        for pushkey, name in zip(self.pushkeys, self.names):
-            self.push_template_message(pushkey, name)
+    def resolve_snapshot(self) -> ContentSnapshot:
+        """
+        Get the content snapshot of the run, resolved for the cities of the recipients if
+        none was given.
+
+        Returns:
+        - ContentSnapshot: run-scoped content shared by all recipients
+        """
+        return self.snapshot or ContentSnapshot.resolve(
+            locations=self.store.locations(["pushdeer"])
+        )
+
+    def plan_batches(
+        self,
+        snapshot: ContentSnapshot,
+        message: PartialTemplate,
+        recipients: List[Recipient],
+    ) -> List[Tuple[bytes, List[str]]]:
+        """
+        Group the recipients of a chunk who get identical messages into batched requests.
+
+        The messages are registered in the outbox, recipients already sent (or dead-lettered)
+        today are left out.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - message (PartialTemplate): the pre-rendered message
+        - recipients (list): a chunk of recipients, see `recipient_chunks`
+
+        Returns:
+        - list: (encoded message, pushkeys) per request, at most PUSHDEER_BATCH_SIZE pushkeys each
+        """
+        texts = self.render_chunk(snapshot, message, recipients)
+        return self.group_batches(texts, self.outbox.begin(texts))
+
+    def render_chunk(
+        self,
+        snapshot: ContentSnapshot,
+        message: PartialTemplate,
+        recipients: List[Recipient],
+    ) -> Dict[str, bytes]:
+        """
+        Render the messages of a chunk of recipients.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - message (PartialTemplate): the pre-rendered message
+        - recipients (list): a chunk of recipients, see `recipient_chunks`
+
+        Returns:
+        - dict: pushkey -> encoded message
+        """
+        with stage("render", channel="pushdeer"):
+            texts = {
+                recipient.address: message.render(snapshot.recipient_data(recipient))
+                for recipient in recipients
+            }
+        RENDERED_MESSAGES.inc(len(texts), channel="pushdeer")
+        return texts
+
+    @staticmethod
+    def group_batches(
+        texts: Dict[str, bytes], pending: Set[str]
+    ) -> List[Tuple[bytes, List[str]]]:
+        """
+        Group the pending pushkeys that get identical messages into batched requests.
+
+        Parameters:
+        - texts (dict): pushkey -> encoded message, see `render_chunk`
+        - pending (set): the pushkeys still to be sent, see `ChannelOutbox.begin`
+
+        Returns:
+        - list: (encoded message, pushkeys) per request, at most PUSHDEER_BATCH_SIZE pushkeys each
+        """
+        groups: Dict[bytes, List[str]] = {}
+        for pushkey, text in texts.items():
+            if pushkey in pending:
+                groups.setdefault(text, []).append(pushkey)
+        return [
+            (text, batch)
+            for text, pushkeys in groups.items()
+            for batch in PushDeer.batches(pushkeys, Config.PUSHDEER_BATCH_SIZE)
+        ]
+
+    def report_results(self, results: Dict[str, bool]) -> None:
+        """
+        Record the results in the outbox and print the pushkeys a message could not be delivered to.
+
+        Parameters:
+        - results (dict): pushkey -> True if successful, otherwise False
+        """
+        self.outbox.record(results)
+        for pushkey, success in results.items():
+            if not success:
+                print(f"Push failed to {pushkey}")
+
+    def report_error(self, pushkeys: List[str], error: Exception) -> None:
+        """
+        Record a failed request in the outbox, to be resumed or dead-lettered.
+
+        Parameters:
+        - pushkeys (list): pushkeys of the request
+        - error (Exception): the error raised by the request
+        """
+        print(f"Request failed: {error}")
+        self.outbox.failed_with(pushkeys, error)
+
+    def run(self):
+        """
+        Trigger function, resolve the content snapshot once, send message to all users.
+        """
+        snapshot = self.resolve_snapshot()
+        message = self.build_message(snapshot)
+
+        api = PushDeer()
+        try:
+            for recipients in self.recipient_chunks():
+                for text, pushkeys in self.plan_batches(snapshot, message, recipients):
+                    try:
+                        results = api.send_markdown_batch(text, pushkeys)
+                    except Exception as e:  # pylint: disable=broad-except
+                        self.report_error(pushkeys, e)
+                    else:
+                        self.report_results(results)
+        finally:
+            self.outbox.flush()
 
 
 def pushdeer_example():
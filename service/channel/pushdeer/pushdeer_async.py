@@ -0,0 +1,221 @@
+import asyncio
+from typing import Dict, Optional, Union
+import aiohttp
+from yarl import URL
+from service.config import Config
+from service.engine import iterate_in_thread, run_bounded
+from service.ratelimit import rate_limiter
+from service.resilience import resilience
+from service.template import encode_query
+from service.transport import transport
+from service.channel.pushdeer.pushdeer import PushDeer, PushDeerPlatform
+
+
+class AsyncPushDeer:
+    """
+    AsyncPushDeer Class is the asyncio counterpart of PushDeer, it sends push messages over a shared aiohttp session.
+
+    Paramters:
+    - session (aiohttp.ClientSession): HTTP session shared by all requests
+    - server (str): API Server address
+    - pushkey (str): PushDeer pushkey (optional)
+    - batch_size (int): maximum number of pushkeys per request (optional)
+    """
+
+    endpoint = PushDeer.endpoint
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        server: Optional[str] = None,
+        pushkey: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
+        """
+        Initialize the AsyncPushDeer class.
+
+        Parameters:
+        - session (aiohttp.ClientSession): HTTP session shared by all requests
+        - server (str): API Server address
+        - pushkey (str): PushDeer pushkey (optional)
+        - batch_size (int): maximum number of pushkeys per request (optional)
+        """
+        self.session = session
+        self.server = server or Config.PUSHDEER_SERVER_URL
+        self.pushkey = pushkey
+        self.batch_size = batch_size or Config.PUSHDEER_BATCH_SIZE
+
+    async def _push(
+        self,
+        text: Union[str, bytes],
+        desp: Optional[str] = None,
+        pushkey: Union[str, list, None] = None,
+        text_type: Optional[str] = None,
+    ) -> bool:
+        """
+        Internal method: send push request.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - desp (str): additional description of the message (optional)
+        - pushkey (Union[str, list, None]): pushkey, or pushkeys sent in batches (optional)
+        - text_type (str): message type (text, markdown, image)
+
+        Returns:
+        - bool: True if successful for every pushkey, otherwise False
+        """
+        pushkey = pushkey or self.pushkey
+        if not pushkey:
+            raise ValueError("Pushkey must be specified")
+
+        pushkeys = pushkey if isinstance(pushkey, list) else [pushkey]
+        results = await self._push_batch(text, desp, pushkeys, text_type)
+        return all(results.values())
+
+    async def _push_batch(
+        self,
+        text: Union[str, bytes],
+        desp: Optional[str],
+        pushkeys: list,
+        text_type: Optional[str],
+    ) -> Dict[str, bool]:
+        """
+        Internal method: send one push request per batch of at most `batch_size` comma-joined pushkeys.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - desp (str): additional description of the message (optional)
+        - pushkeys (list): pushkeys
+        - text_type (str): message type (text, markdown, image)
+
+        Returns:
+        - dict: pushkey -> True if successful, otherwise False
+        """
+        if isinstance(text, str):
+            text = encode_query(text)  # once for every batch
+        results = {}
+        for batch in PushDeer.batches(pushkeys, self.batch_size):
+            response = await self._send_push_request(
+                desp, ",".join(batch), text, text_type
+            )
+            results.update(PushDeer._parse_results(response, batch))
+        return results
+
+    async def _send_push_request(
+        self,
+        desp: Optional[str],
+        key: str,
+        text: Union[str, bytes],
+        text_type: Optional[str],
+    ) -> dict:
+        """
+        Internal method: send HTTP GET request to PushDeer API, paced and with retries.
+
+        Parameters:
+        - desp (str): additional description of the message (optional)
+        - key (str): pushkey
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - text_type (str): message type (text, markdown, image)
+
+        Returns:
+        - dict: API response
+        """
+        if isinstance(text, str):
+            text = encode_query(text)
+        query = PushDeer.encode_params(key, text, text_type, desp)
+        url = URL(self.server + self.endpoint + "?" + query, encoded=True)
+
+        async def send() -> dict:
+            await rate_limiter.acquire_async("pushdeer", self.server)
+            async with self.session.get(url) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        return await resilience.call_async(self.server, send)
+
+    async def send_markdown(
+        self,
+        text: Union[str, bytes],
+        desp: Optional[str] = None,
+        pushkey: Union[str, list, None] = None,
+    ) -> bool:
+        """
+        Send a Markdown push message.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - desp (str): additional description of the message (optional)
+        - pushkey (Union[str, list, None]): pushkey, or pushkeys sent in batches (optional)
+
+        Returns:
+        - bool: True if successful for every pushkey, otherwise False
+        """
+        return await self._push(text, desp, pushkey, "markdown")
+
+    async def send_markdown_batch(
+        self, text: Union[str, bytes], pushkeys: list, desp: Optional[str] = None
+    ) -> Dict[str, bool]:
+        """
+        Send the same Markdown push message to many pushkeys, `batch_size` of them per request.
+
+        Parameters:
+        - text (Union[str, bytes]): main content of the message, bytes if already encoded with encode_query
+        - pushkeys (list): pushkeys
+        - desp (str): additional description of the message (optional)
+
+        Returns:
+        - dict: pushkey -> True if successful, otherwise False
+        """
+        return await self._push_batch(text, desp, pushkeys, "markdown")
+
+
+class AsyncPushDeerPlatform(PushDeerPlatform):
+    """
+    AsyncPushDeerPlatform Class sends the morning message to all PushDeer devices with bounded concurrency.
+    """
+
+    async def run_async(self, concurrency: Optional[int] = None):
+        """
+        Trigger function, resolve the content snapshot once, send message to all users concurrently.
+
+        Resolving the snapshot, reading the recipient chunks and writing the outbox
+        block, they run in worker threads.
+
+        Parameters:
+        - concurrency (int): maximum number of in-flight requests (optional)
+        """
+        concurrency = concurrency or Config.ASYNC_CONCURRENCY
+        snapshot = await asyncio.to_thread(self.resolve_snapshot)
+        message = self.build_message(snapshot)
+        self.outbox.defer()
+
+        async with transport.async_session(concurrency) as session:
+            api = AsyncPushDeer(session)
+
+            def job(batch: tuple):
+                async def send():
+                    text, pushkeys = batch
+                    try:
+                        results = await api.send_markdown_batch(text, pushkeys)
+                    except Exception as e:  # pylint: disable=broad-except
+                        self.report_error(pushkeys, e)
+                    else:
+                        self.report_results(results)
+                    await self.outbox.commit_async()
+
+                return send
+
+            async def batches():
+                # planned one chunk of recipients at a time, as workers pull them
+                async for recipients in iterate_in_thread(self.recipient_chunks()):
+                    texts = self.render_chunk(snapshot, message, recipients)
+                    pending = await self.outbox.begin_async(texts)
+                    for batch in self.group_batches(texts, pending):
+                        yield batch
+
+            try:
+                await run_bounded(
+                    (job(batch) async for batch in batches()), concurrency
+                )
+            finally:
+                await self.outbox.flush_async()
@@ -1,9 +1,15 @@
-import json
-from typing import Optional
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 from service.config import Config
-import requests
-from service.parameters import ParameterResolver
-from service.weibo.topn import formatted_top_list
+from service.metrics import RENDERED_MESSAGES, stage
+from service.outbox import outbox
+from service.ratelimit import rate_limiter
+from service.resilience import resilience
+from service.transport import transport
+from service.template import PartialTemplate, encode_json_string, load_template
+from service.recipient import Recipient
+from service.recipient_store import recipient_store
+from service.snapshot import ContentSnapshot
 
 
 class PushPlus:
@@ -33,8 +39,9 @@ class PushPlus:
         token: str,
         server: str,
         title: str,
-        content: str,
+        content: Union[str, bytes],
         template: str,
+        topic: Optional[str] = None,
     ) -> bool:
         """
         Internal method: send push request.
@@ -43,8 +50,9 @@ class PushPlus:
         - token (str): token
         - server (str): API Server address
         - title (str): message title
-        - content (str): message content
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
         - template (str): message template: html, txt, markdown, json
+        - topic (str): topic (group) code, sends to every subscriber of the topic (optional)
 
         Returns:
         - bool: True if successful, otherwise False
@@ -56,70 +64,138 @@ class PushPlus:
 
         # Send the push request and check the result
         response = self._send_push_request(
-            token, server or self.server, title, content, template
+            token, server or self.server, title, content, template, topic
+        )
+        return self._parse_response(response)
+
+    @staticmethod
+    def _parse_response(response: dict) -> bool:
+        """
+        Internal method: check whether the PushPlus API accepted the push.
+
+        Parameters:
+        - response (dict): API response, {"code": 200, "msg": ..., "data": ...} on success
+
+        Returns:
+        - bool: True if successful, otherwise False
+        """
+        return response.get("code") == 200
+
+    @staticmethod
+    def encode_body(
+        token: str,
+        title: str,
+        content: bytes,
+        template: str,
+        topic: Optional[str] = None,
+    ) -> bytes:
+        """
+        Build the JSON body of a push request.
+
+        Parameters:
+        - token (str): token
+        - title (str): message title
+        - content (bytes): message content, already encoded with encode_json_string
+        - template (str): message template: html, txt, markdown, json
+        - topic (str): topic (group) code (optional)
+
+        Returns:
+        - bytes: the UTF-8 JSON body
+        """
+        return b"".join(
+            (
+                b'{"token": "',
+                encode_json_string(token),
+                b'", "title": "',
+                encode_json_string(title),
+                b'", "content": "',
+                content,
+                b'", "template": "',
+                encode_json_string(template),
+                b'", "topic": "' + encode_json_string(topic) if topic else b"",
+                b'"}',
+            )
         )
-        if "content" in response and response["content"].get("result"):
-            result = json.loads(response["content"]["result"][0])
-            return result.get("success") == "ok"
-        return False
 
     def _send_push_request(
         self,
         token: str,
         server: str,
         title: str,
-        content: str,
+        content: Union[str, bytes],
         template: str,
+        topic: Optional[str] = None,
     ) -> dict:
         """
-        Internal method: send HTTP Post request to PushPlus API, Use Content-Type: application/json.
+        Internal method: send HTTP Post request to PushPlus API, Use Content-Type: application/json, paced and with retries.
 
         Parameters:
         - token (str): token
         - server (str): API Server address
         - title (str): message title
-        - content (str): message content
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
         - template (str): message template: html, txt, markdown, json
+        - topic (str): topic (group) code (optional)
 
         Returns:
         - dict: API response
         """
-        params = {
-            "token": token,
-            "title": title,
-            "content": content,
-            "template": template,
-        }
-        response = requests.post(
-            server + self.endpoint,
-            data=json.dumps(params),
-            headers={"Content-Type": "application/json"},
-            timeout=1000,
-        )
-        response.raise_for_status()
-        return response.json()
+        if isinstance(content, str):
+            content = encode_json_string(content)
+        body = self.encode_body(token, title, content, template, topic)
+
+        def send() -> dict:
+            rate_limiter.acquire("pushplus", server)
+            response = transport.post(
+                server + self.endpoint,
+                data=body,
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return resilience.call(server, send)
 
     def send_markdown(
         self,
         title: str,
-        content: str,
+        content: Union[str, bytes],
         token: Optional[str] = None,
         server: Optional[str] = None,
+        topic: Optional[str] = None,
     ) -> bool:
         """
         Send a Markdown push message.
 
         Parameters:
-        - text (str): main content of the message
-        - desp (str): additional description of the message (optional)
+        - title (str): message title
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
+        - token (str): token, the topic owner's for a topic send (optional)
         - server (str): API Server address (optional)
-        - token (Union[str, list, None]): token (optional)
-        - kwargs: other request parameters
+        - topic (str): topic (group) code, one request reaches every subscriber (optional)
 
         Returns:
         - bool: True if successful, otherwise False
         """
-        return self._push(token, server, title, content, "markdown")
+        return self._push(token, server, title, content, "markdown", topic)
+
+
+@dataclass(frozen=True)
+class Delivery:
+    """
+    A single PushPlus request: a per-token send, or a topic send reaching every subscriber.
+
+    Parameters:
+    - token (str): PushPlus token, the topic owner's for a topic send
+    - content (bytes): message content, encoded with encode_json_string
+    - topic (str): topic code of a topic send, None for a per-token send
+    - recipients (tuple): recipients reached by the request
+    """
+
+    token: str
+    content: bytes
+    topic: Optional[str] = None
+    recipients: Tuple[Recipient, ...] = ()
 
 
 class PushPlusPlatform:
@@ -131,13 +207,12 @@ class PushPlusPlatform:
     - token (str): PushPlus token (optional)
     """
 
-    def __init__(self):
+    def __init__(self, snapshot: Optional[ContentSnapshot] = None):
         """
         Initialize the PushPlusPlatform class.
 
         Parameters:
-        - server (str): API Server address
-        - token (str): PushPlus token (optional)
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients (optional)
         """
 
         self.template_id = Config.TEMPLATE_ID
@@ -148,40 +223,210 @@ class PushPlusPlatform:
         self.love_date = Config.LOVE_DATE
         self.birthday = Config.BIRTHDAY
         self.tokens = Config.PUSHPLUS_TOKENS
+        self.topic_token = Config.PUSHPLUS_TOPIC_TOKEN
+        self.store = recipient_store()
+        self.snapshot = snapshot
+        self.template = load_template("template.md")
+        self.title = "来自亲爱的消息"
+        self.outbox = outbox.channel("pushplus")
+
+    def build_message(self, snapshot: ContentSnapshot) -> PartialTemplate:
+        """
+        Pre-render the markdown message shared by all users, encoded as JSON string content.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+
+        Returns:
+        - PartialTemplate: the message, only the per-recipient fields are left to render
+        """
+        return self.template.partial(
+            snapshot.shared_data(markdown=True),
+            encode_json_string,
+            head="# 早上好，亲爱的\n",
+        )
+
+    def recipient_chunks(self) -> Iterator[List[Recipient]]:
+        """
+        Stream the pushplus recipients of the store, Config.RECIPIENT_CHUNK_SIZE at a time,
+        without splitting the topics stored together.
+
+        Returns:
+        - Iterator[List[Recipient]]: the chunks
+        """
+        return self.store.group_chunks("pushplus")
+
+    def resolve_snapshot(self) -> ContentSnapshot:
+        """
+        Get the content snapshot of the run, resolved for the cities of the recipients if
+        none was given.
+
+        Returns:
+        - ContentSnapshot: run-scoped content shared by all recipients
+        """
+        return self.snapshot or ContentSnapshot.resolve(
+            locations=self.store.locations(["pushplus"])
+        )
+
+    def topic_sizes(self) -> Dict[str, int]:
+        """
+        Count the recipients of each topic, topics are not used without the owner's token.
+
+        Returns:
+        - dict: topic -> number of recipients
+        """
+        return self.store.group_sizes("pushplus") if self.topic_token else {}
+
+    def plan_deliveries(
+        self,
+        snapshot: ContentSnapshot,
+        message: PartialTemplate,
+        recipients: List[Recipient],
+        topic_sizes: Dict[str, int],
+    ) -> List[Delivery]:
+        """
+        Render the messages of a chunk of recipients, register them in the outbox and
+        group the pending ones into requests, see `group_deliveries`.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - message (PartialTemplate): the pre-rendered message
+        - recipients (list): a chunk of recipients, see `recipient_chunks`
+        - topic_sizes (dict): recipients per topic, see `topic_sizes`
+
+        Returns:
+        - list: the requests to send
+        """
+        rendered = self.render_chunk(snapshot, message, recipients)
+        pending = self.outbox.begin(rendered)
+        return self.group_deliveries(recipients, rendered, pending, topic_sizes)
+
+    def render_chunk(
+        self,
+        snapshot: ContentSnapshot,
+        message: PartialTemplate,
+        recipients: List[Recipient],
+    ) -> Dict[str, bytes]:
+        """
+        Render the messages of a chunk of recipients.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - message (PartialTemplate): the pre-rendered message
+        - recipients (list): a chunk of recipients, see `recipient_chunks`
+
+        Returns:
+        - dict: token -> rendered content
+        """
+        with stage("render", channel="pushplus"):
+            rendered = {
+                recipient.address: message.render(snapshot.recipient_data(recipient))
+                for recipient in recipients
+            }
+        RENDERED_MESSAGES.inc(len(rendered), channel="pushplus")
+        return rendered
+
+    def group_deliveries(
+        self,
+        recipients: List[Recipient],
+        rendered: Dict[str, bytes],
+        pending: Set[str],
+        topic_sizes: Dict[str, int],
+    ) -> List[Delivery]:
+        """
+        Group the pending recipients of a chunk into as few requests as possible.
+
+        The recipients of a topic who all get byte-identical content are reached by one
+        topic send, the others (no topic, no topic owner token, or personalized content)
+        get one send per token. Recipients already sent (or dead-lettered) today according
+        to the outbox are left out, a topic with some of them, or with members outside the
+        chunk, is sent per token.
+
+        Parameters:
+        - recipients (list): a chunk of recipients, see `recipient_chunks`
+        - rendered (dict): token -> rendered content, see `render_chunk`
+        - pending (set): the tokens still to be sent, see `ChannelOutbox.begin`
+        - topic_sizes (dict): recipients per topic, see `topic_sizes`
+
+        Returns:
+        - list: the requests to send
+        """
+        topics: Dict[str, List[Recipient]] = {}
+        for recipient in recipients:
+            topic = recipient.group if recipient.group in topic_sizes else ""
+            topics.setdefault(topic, []).append(recipient)
+
+        deliveries = []
+        for topic, members in topics.items():
+            todo = [recipient for recipient in members if recipient.address in pending]
+            if len(todo) < topic_sizes.get(topic, 0):
+                # a topic send would reach members already sent, or in another chunk
+                topic = ""
+            members = todo
+            contents = [rendered[recipient.address] for recipient in members]
+            if topic and len(set(contents)) == 1:
+                deliveries.append(
+                    Delivery(self.topic_token, contents[0], topic, tuple(members))
+                )
+                continue
+            deliveries.extend(
+                Delivery(recipient.address, content, recipients=(recipient,))
+                for recipient, content in zip(members, contents)
+            )
+        return deliveries
 
-    def push_template_message(self, token: str, name: str) -> None:
-        """
-        Send a template message to a single user.
-        """
-        weather_data = ParameterResolver.get_weather_data()
-        date_str = ParameterResolver.get_today_and_weekday()
-        love_day, birthday_day = ParameterResolver.calculate_days()
-        daily_quote = ParameterResolver.get_daily_quote()
-        weibo_top20 = formatted_top_list(20, True)
-        dict_data = {
-            "date": date_str,
-            "name": name,
-            "city": self.city,
-            "weather": weather_data[0],
-            "max_temperature": weather_data[1],
-            "min_temperature": weather_data[2],
-            "love_day": love_day,
-            "birthday": birthday_day,
-            "one": daily_quote,
-            "weibo_topn": weibo_top20,
-        }
-
-        md_str = ParameterResolver.render_template("template.md", dict_data)
-        api = PushPlus(token=token)
-        api.send_markdown("来自亲爱的消息", "# 早上好，亲爱的\n" + md_str)
+    def push_delivery(self, delivery: Delivery) -> bool:
+        """
+        Send a planned request.
+
+        Parameters:
+        - delivery (Delivery): the request
+
+        Returns:
+        - bool: True if successful, otherwise False
+        """
+        api = PushPlus(token=delivery.token)
+        return api.send_markdown(self.title, delivery.content, topic=delivery.topic)
+
+    def report_result(
+        self, delivery: Delivery, success: Optional[bool], error: Optional[Exception]
+    ) -> None:
+        """
+        Record the outcome of a request in the outbox for each of its recipients.
+
+        Parameters:
+        - delivery (Delivery): the request
+        - success (bool): whether the API accepted it, None if it raised
+        - error (Exception): the error raised by the request, None if it did not raise
+        """
+        addresses = [recipient.address for recipient in delivery.recipients]
+        if error is not None:
+            print(f"Request failed: {error}")
+            self.outbox.failed_with(addresses, error)
+        else:
+            self.outbox.record(dict.fromkeys(addresses, success))
 
     def run(self):
         """
-        Trigger function, fetch AccessToken, call weather API, send message to all users.
+        Trigger function, resolve the content snapshot once, send message to all users.
         """
+        snapshot = self.resolve_snapshot()
+        message = self.build_message(snapshot)
+        topic_sizes = self.topic_sizes()
 
-        for token, name in zip(self.tokens, self.names):
-            self.push_template_message(token, name)
+        try:
+            for recipients in self.recipient_chunks():
+                for delivery in self.plan_deliveries(
+                    snapshot, message, recipients, topic_sizes
+                ):
+                    try:
+                        success = self.push_delivery(delivery)
+                    except Exception as e:  # pylint: disable=broad-except
+                        self.report_result(delivery, None, e)
+                    else:
+                        self.report_result(delivery, success, None)
+        finally:
+            self.outbox.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+import asyncio
+from typing import Optional, Union
+import aiohttp
+from service.config import Config
+from service.engine import iterate_in_thread, run_bounded
+from service.ratelimit import rate_limiter
+from service.resilience import resilience
+from service.template import encode_json_string
+from service.transport import transport
+from service.channel.pushplus.pushplus import Delivery, PushPlus, PushPlusPlatform
+
+
+class AsyncPushPlus:
+    """
+    AsyncPushPlus Class is the asyncio counterpart of PushPlus, it sends push messages over a shared aiohttp session.
+
+    Paramters:
+    - session (aiohttp.ClientSession): HTTP session shared by all requests
+    - server (str): API Server address
+    - token (str): PushPlus token (optional)
+    """
+
+    endpoint = PushPlus.endpoint
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        server: Optional[str] = None,
+        token: Optional[str] = None,
+    ):
+        """
+        Initialize the AsyncPushPlus class.
+
+        Parameters:
+        - session (aiohttp.ClientSession): HTTP session shared by all requests
+        - server (str): API Server address
+        - token (str): PushPlus token (optional)
+        """
+        self.session = session
+        self.server = server or Config.PUSHPLUS_SERVER_URL
+        self.token = token
+
+    async def _push(
+        self,
+        token: str,
+        title: str,
+        content: Union[str, bytes],
+        template: str,
+        topic: Optional[str] = None,
+    ) -> bool:
+        """
+        Internal method: send push request.
+
+        Parameters:
+        - token (str): token
+        - title (str): message title
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
+        - template (str): message template: html, txt, markdown, json
+        - topic (str): topic (group) code, sends to every subscriber of the topic (optional)
+
+        Returns:
+        - bool: True if successful, otherwise False
+        """
+        token = token or self.token
+        if not token:
+            raise ValueError("token must be specified")
+
+        response = await self._send_push_request(token, title, content, template, topic)
+        return PushPlus._parse_response(response)
+
+    async def _send_push_request(
+        self,
+        token: str,
+        title: str,
+        content: Union[str, bytes],
+        template: str,
+        topic: Optional[str] = None,
+    ) -> dict:
+        """
+        Internal method: send HTTP Post request to PushPlus API, Use Content-Type: application/json, paced and with retries.
+
+        Parameters:
+        - token (str): token
+        - title (str): message title
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
+        - template (str): message template: html, txt, markdown, json
+        - topic (str): topic (group) code (optional)
+
+        Returns:
+        - dict: API response
+        """
+        if isinstance(content, str):
+            content = encode_json_string(content)
+        body = PushPlus.encode_body(token, title, content, template, topic)
+
+        async def send() -> dict:
+            await rate_limiter.acquire_async("pushplus", self.server)
+            async with self.session.post(
+                self.server + self.endpoint,
+                data=body,
+                headers={"Content-Type": "application/json"},
+            ) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        return await resilience.call_async(self.server, send)
+
+    async def send_markdown(
+        self,
+        title: str,
+        content: Union[str, bytes],
+        token: Optional[str] = None,
+        topic: Optional[str] = None,
+    ) -> bool:
+        """
+        Send a Markdown push message.
+
+        Parameters:
+        - title (str): message title
+        - content (Union[str, bytes]): message content, bytes if already encoded with encode_json_string
+        - token (str): token, the topic owner's for a topic send (optional)
+        - topic (str): topic (group) code, one request reaches every subscriber (optional)
+
+        Returns:
+        - bool: True if successful, otherwise False
+        """
+        return await self._push(token, title, content, "markdown", topic)
+
+
+class AsyncPushPlusPlatform(PushPlusPlatform):
+    """
+    AsyncPushPlusPlatform Class sends the morning message to all PushPlus users with bounded concurrency.
+    """
+
+    async def run_async(self, concurrency: Optional[int] = None):
+        """
+        Trigger function, resolve the content snapshot once, send message to all users concurrently.
+
+        The snapshot, the recipient store and the outbox are read and written in worker
+        threads, the event loop renders and sends.
+
+        Parameters:
+        - concurrency (int): maximum number of in-flight requests (optional)
+        """
+        concurrency = concurrency or Config.ASYNC_CONCURRENCY
+        snapshot = await asyncio.to_thread(self.resolve_snapshot)
+        message = self.build_message(snapshot)
+        topic_sizes = await asyncio.to_thread(self.topic_sizes)
+        self.outbox.defer()
+
+        async with transport.async_session(concurrency) as session:
+            api = AsyncPushPlus(session)
+
+            def job(delivery: Delivery):
+                async def send():
+                    try:
+                        success = await api.send_markdown(
+                            self.title,
+                            delivery.content,
+                            token=delivery.token,
+                            topic=delivery.topic,
+                        )
+                    except Exception as e:  # pylint: disable=broad-except
+                        self.report_result(delivery, None, e)
+                    else:
+                        self.report_result(delivery, success, None)
+                    await self.outbox.commit_async()
+
+                return send
+
+            async def deliveries():
+                # planned one chunk of recipients at a time, as workers pull them
+                async for recipients in iterate_in_thread(self.recipient_chunks()):
+                    rendered = self.render_chunk(snapshot, message, recipients)
+                    pending = await self.outbox.begin_async(rendered)
+                    for delivery in self.group_deliveries(
+                        recipients, rendered, pending, topic_sizes
+                    ):
+                        yield delivery
+
+            try:
+                await run_bounded(
+                    (job(delivery) async for delivery in deliveries()), concurrency
+                )
+            finally:
+                await self.outbox.flush_async()
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an unlocked cache
+    fcntl = None
+
+
+class TokenCache:
+    """
+    TokenCache Class keeps the WeChat access_token on disk, shared by every process of a run.
+
+    The cache file is guarded by an exclusive file lock, so when several processes find the
+    token missing or expired only the first one asks WeChat for a new token, the others read it.
+
+    Parameters:
+    - path (str): path of the cache file
+    - margin (int): seconds before `expires_in` at which a token is considered expired
+    """
+
+    def __init__(self, path: str, margin: int = 300):
+        """
+        Initialize the TokenCache class.
+
+        Parameters:
+        - path (str): path of the cache file
+        - margin (int): seconds before `expires_in` at which a token is considered expired
+        """
+        self.path = path
+        self.margin = margin
+
+    @contextmanager
+    def _locked(self):
+        """
+        Internal method: hold the exclusive lock of the cache file.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        """
+        Internal method: read the cache file.
+
+        Returns:
+        - dict: app_id -> {"access_token": str, "expires_at": float}
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries: dict) -> None:
+        """
+        Internal method: atomically replace the cache file.
+
+        Parameters:
+        - entries (dict): app_id -> {"access_token": str, "expires_at": float}
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+
+    def get(
+        self,
+        app_id: str,
+        fetch: Callable[[], Optional[dict]],
+        invalid_token: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Get the cached access_token of an app, fetching a new one if it is missing, expired or rejected.
+
+        Parameters:
+        - app_id (str): WeChat app id
+        - fetch (Callable): function returning the token response ({"access_token", "expires_in"}) or None
+        - invalid_token (str): token rejected by WeChat, a cached token equal to it is refreshed (optional)
+
+        Returns:
+        - str: the access_token, or None if it could not be fetched
+        """
+        with self._locked():
+            entries = self._read()
+            entry = entries.get(str(app_id))
+            if (
+                entry
+                and entry["access_token"] != invalid_token
+                and entry["expires_at"] - self.margin > time.time()
+            ):
+                return entry["access_token"]
+
+            response = fetch()
+            if not response:
+                return None
+
+            entries[str(app_id)] = {
+                "access_token": response["access_token"],
+                "expires_at": time.time() + int(response.get("expires_in", 7200)),
+            }
+            self._write(entries)
+            return response["access_token"]
@@ -1,8 +1,21 @@
-from datetime import date
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
 import requests
 from service.config import Config
-from service.parameters import ParameterResolver
-from service.weibo.topn import formatted_top_list
+from service.metrics import RENDERED_MESSAGES, stage
+from service.outbox import outbox
+from service.ratelimit import rate_limiter
+from service.resilience import CircuitOpenError, TransientError, resilience
+from service.transport import transport
+from service.recipient import Recipient
+from service.recipient_store import recipient_store
+from service.snapshot import ContentSnapshot
+from service.channel.wechat_public_tester.token_cache import TokenCache
+
+# errcode returned by WeChat for an invalid or expired access_token
+INVALID_TOKEN_ERRCODES = (40001, 42001)
+# errcode returned by WeChat when it is busy, the send is retried
+BUSY_ERRCODE = -1
 
 
 class WechatTesterPlatform:
@@ -10,9 +23,12 @@ class WechatTesterPlatform:
     WechatTesterPlatform Class is used to interact with WeChat public test account, send template message.
     """
 
-    def __init__(self):
+    def __init__(self, snapshot: Optional[ContentSnapshot] = None):
         """
         Init WechatTesterPlatform class, load config.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients (optional)
         """
         self.server_url = Config.WECHAT_TOKEN_URL
         self.app_id = Config.APP_ID
@@ -24,81 +40,252 @@ class WechatTesterPlatform:
         self.names = Config.NAMES
         self.love_date = Config.LOVE_DATE
         self.birthday = Config.BIRTHDAY
+        self.store = recipient_store()
+        self.snapshot = snapshot
+        self.token_cache = TokenCache(Config.WECHAT_TOKEN_CACHE)
+        self.outbox = outbox.channel("wechat")
 
-    def fetch_access_token(self) -> str:
+    def fetch_access_token(self, invalid_token: Optional[str] = None) -> str:
         """
-        Fetch access_token from WeChat public platform.
+        Get access_token from the on-disk token cache, fetching it from WeChat public platform when needed.
+
+        Parameters:
+        - invalid_token (str): token rejected by WeChat, forces a refresh (optional)
 
         Returns:
         - str: resp_access_token string
         """
+        return self.token_cache.get(
+            self.app_id, self.request_access_token, invalid_token=invalid_token
+        )
+
+    def request_access_token(self) -> Optional[dict]:
+        """
+        Request a new access_token from WeChat public platform.
+
+        Returns:
+        - dict: the token response with access_token and expires_in
+        """
         url = f"{self.server_url}?grant_type=client_credential&appid={self.app_id}&secret={self.app_secret}"
         try:
-            response = requests.get(url, timeout=10).json()
-            access_token = response.get("access_token")
-            if access_token:
-                return access_token
+            response = resilience.call(url, lambda: transport.get(url).json())
+            if response.get("access_token"):
+                return response
             raise ValueError("No access_token found in response")
-        except requests.RequestException as e:
+        except (requests.RequestException, CircuitOpenError) as e:
             print(f"Request failed: {e}")
             return None
         except ValueError as e:
             print(f"Response error: {e}")
             return None
 
-    def send_message(self, user_id: str, name: str, access_token: str) -> None:
+    def build_message(self, recipient: Recipient, snapshot: ContentSnapshot) -> dict:
         """
-        Send a template message to a wechat user.
+        Build the template message body of a wechat user.
 
         Parameters:
-        - user_id (str): user wechat id
-        - name (str): user name
-        - access_token (str): wechat api access_token
-        """
-        url = f"https://api.weixin.qq.com/cgi-bin/message/template/send?access_token={access_token}"
-
-        weather, max_temp, min_temp = ParameterResolver.get_weather_data()
-        date_str = ParameterResolver.get_today_and_weekday()
-        love_days, birthday_days = ParameterResolver.calculate_days()
+        - recipient (Recipient): the user, its address is the wechat user id
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
 
-        data = {
-            "touser": user_id,
+        Returns:
+        - dict: the template message body
+        """
+        weather, max_temp, min_temp = snapshot.weather_of(recipient)
+        love_day, birthday = snapshot.days_of(recipient)
+        return {
+            "touser": recipient.address,
             "template_id": self.template_id,
             "url": "http://weixin.qq.com/download",
             "topcolor": "#FF0000",
             "data": {
-                "date": {"value": date_str, "color": "#00FFFF"},
-                "name": {"value": name, "color": "#00FF00"},
-                "city": {"value": self.city, "color": "#808A87"},
+                "date": {"value": snapshot.date, "color": "#00FFFF"},
+                "name": {"value": recipient.name, "color": "#00FF00"},
+                "city": {"value": recipient.city, "color": "#808A87"},
                 "weather": {"value": weather, "color": "#ED9121"},
                 "max_temperature": {"value": max_temp, "color": "#FF6100"},
                 "min_temperature": {"value": min_temp, "color": "#00FF00"},
-                "love_day": {"value": love_days, "color": "#87CEEB"},
-                "birthday": {"value": birthday_days, "color": "#FF8000"},
-                "one": {
-                    "value": ParameterResolver.get_daily_quote(),
-                    "color": "#808A87",
-                },
-                "weibo_topn": {"value": formatted_top_list(20)},
+                "love_day": {"value": love_day, "color": "#87CEEB"},
+                "birthday": {"value": birthday, "color": "#FF8000"},
+                "one": {"value": snapshot.one, "color": "#808A87"},
+                "weibo_topn": {"value": snapshot.weibo_topn_text},
             },
         }
 
+    def resolve_snapshot(self) -> ContentSnapshot:
+        """
+        Get the content snapshot of the run, resolved for the cities of the recipients if
+        none was given.
+
+        Returns:
+        - ContentSnapshot: run-scoped content shared by all recipients
+        """
+        return self.snapshot or ContentSnapshot.resolve(
+            locations=self.store.locations(["wechat"])
+        )
+
+    def plan_recipients(
+        self, snapshot: ContentSnapshot, recipients: List[Recipient]
+    ) -> List[Recipient]:
+        """
+        Register the template messages of a chunk of recipients in the outbox.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - recipients (list): a chunk of recipients
+
+        Returns:
+        - list: the recipients not already sent (or dead-lettered) today
+        """
+        pending = self.outbox.begin(self.render_chunk(snapshot, recipients))
+        return [recipient for recipient in recipients if recipient.address in pending]
+
+    def render_chunk(
+        self, snapshot: ContentSnapshot, recipients: List[Recipient]
+    ) -> Dict[str, bytes]:
+        """
+        Render the template messages of a chunk of recipients.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - recipients (list): a chunk of recipients
+
+        Returns:
+        - dict: openid -> JSON body of the template message
+        """
+        with stage("render", channel="wechat"):
+            messages = {
+                recipient.address: json.dumps(
+                    self.build_message(recipient, snapshot), ensure_ascii=False
+                ).encode("utf-8")
+                for recipient in recipients
+            }
+        RENDERED_MESSAGES.inc(len(messages), channel="wechat")
+        return messages
+
+    def pending_recipients(self, snapshot: ContentSnapshot) -> Iterator[Recipient]:
+        """
+        Stream the wechat recipients of the store still to be sent, planned one chunk of
+        Config.RECIPIENT_CHUNK_SIZE at a time.
+
+        Parameters:
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+
+        Returns:
+        - Iterator[Recipient]: the recipients not already sent (or dead-lettered) today
+        """
+        for recipients in self.store.chunks("wechat"):
+            yield from self.plan_recipients(snapshot, recipients)
+
+    def report_errcode(self, recipient: Recipient, errcode: Optional[int]) -> None:
+        """
+        Record the outcome of a send in the outbox.
+
+        Failed requests and rejected access tokens are resumed by the next run, other
+        errcodes are dead-lettered.
+
+        Parameters:
+        - recipient (Recipient): the user
+        - errcode (int): WeChat errcode (0 if successful), or None if the request failed
+        """
+        if errcode == 0:
+            self.outbox.sent([recipient.address])
+        elif errcode is None or errcode in INVALID_TOKEN_ERRCODES:
+            self.outbox.failed([recipient.address], f"errcode {errcode}", False)
+        else:
+            self.outbox.failed([recipient.address], f"errcode {errcode}", True)
+
+    def send_message(
+        self, recipient: Recipient, access_token: str, snapshot: ContentSnapshot
+    ) -> Optional[int]:
+        """
+        Send a template message to a wechat user, paced and with retries.
+
+        Parameters:
+        - recipient (Recipient): the user, its address is the wechat user id
+        - access_token (str): wechat api access_token
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+
+        Returns:
+        - int: WeChat errcode (0 if successful), or None if the request failed
+        """
+        url = f"{Config.WECHAT_MESSAGE_URL}?access_token={access_token}"
+        data = self.build_message(recipient, snapshot)
+
         headers = {"Content-Type": "application/json"}
-        try:
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+
+        def send() -> dict:
+            rate_limiter.acquire("wechat", url)
+            response = transport.post(url, headers=headers, json=data)
             response.raise_for_status()
-            print(f"Message sent successfully to {user_id}: {response.text}")
-        except requests.exceptions.RequestException as e:
+            result = response.json()
+            if result.get("errcode", 0) == BUSY_ERRCODE:
+                raise TransientError(f"WeChat is busy: {response.text}")
+            return result
+
+        try:
+            result = resilience.call(url, send)
+        except (
+            requests.exceptions.RequestException,
+            CircuitOpenError,
+            TransientError,
+            ValueError,  # not a JSON body
+        ) as e:
             print(f"Request failed: {e}")
+            return None
+
+        errcode = result.get("errcode", 0)
+        if errcode:
+            print(f"Message failed to {recipient.address}: {result}")
+        else:
+            print(f"Message sent successfully to {recipient.address}: {result}")
+        return errcode
 
     def run(self):
         """
-        Trigger function, fetch AccessToken, call weather API, send message to all users.
+        Trigger function, fetch AccessToken, resolve the content snapshot once, send message to all users.
+
+        Sends rejected with an invalid-token errcode are retried once with a refreshed token.
         """
         access_token = self.fetch_access_token()
         if not access_token:
             print("Failed to fetch access token.")
             return
 
-        for user_id, name in zip(self.user_ids, self.names):
-            self.send_message(user_id, name, access_token)
+        snapshot = self.resolve_snapshot()
+        try:
+            self._send_all(self.pending_recipients(snapshot), access_token, snapshot)
+        finally:
+            self.outbox.flush()
+
+    def _send_all(
+        self,
+        recipients: Iterable[Recipient],
+        access_token: str,
+        snapshot: ContentSnapshot,
+    ) -> None:
+        """
+        Internal method: send to every recipient and record the outcomes.
+
+        Parameters:
+        - recipients (Iterable[Recipient]): the users
+        - access_token (str): wechat api access_token
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        """
+        rejected = []
+        for recipient in recipients:
+            errcode = self.send_message(recipient, access_token, snapshot)
+            self.report_errcode(recipient, errcode)
+            if errcode in INVALID_TOKEN_ERRCODES:
+                rejected.append(recipient)
+        if not rejected:
+            return
+
+        access_token = self.fetch_access_token(invalid_token=access_token)
+        if not access_token:
+            print("Failed to refresh access token.")
+            return
+
+        for recipient in rejected:
+            self.report_errcode(
+                recipient, self.send_message(recipient, access_token, snapshot)
+            )
@@ -0,0 +1,165 @@
+import asyncio
+from typing import AsyncIterable, Optional
+import aiohttp
+from service.config import Config
+from service.engine import iterate_in_thread, run_bounded
+from service.ratelimit import rate_limiter
+from service.resilience import TransientError, resilience
+from service.transport import transport
+from service.recipient import Recipient
+from service.snapshot import ContentSnapshot
+from service.channel.wechat_public_tester.wechat_public_tester import (
+    BUSY_ERRCODE,
+    INVALID_TOKEN_ERRCODES,
+    WechatTesterPlatform,
+)
+
+
+class AsyncWechatTester:
+    """
+    AsyncWechatTester Class sends WeChat template messages over a shared aiohttp session.
+
+    Paramters:
+    - session (aiohttp.ClientSession): HTTP session shared by all requests
+    - access_token (str): wechat api access_token
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, access_token: str):
+        """
+        Initialize the AsyncWechatTester class.
+
+        Parameters:
+        - session (aiohttp.ClientSession): HTTP session shared by all requests
+        - access_token (str): wechat api access_token
+        """
+        self.session = session
+        self.access_token = access_token
+
+    async def send_template(self, data: dict) -> dict:
+        """
+        Send a template message, paced and with retries.
+
+        Parameters:
+        - data (dict): the template message body
+
+        Returns:
+        - dict: API response
+        """
+
+        async def send() -> dict:
+            await rate_limiter.acquire_async("wechat", Config.WECHAT_MESSAGE_URL)
+            async with self.session.post(
+                Config.WECHAT_MESSAGE_URL,
+                params={"access_token": self.access_token},
+                json=data,
+            ) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+                if result.get("errcode", 0) == BUSY_ERRCODE:
+                    raise TransientError(f"WeChat is busy: {result}")
+                return result
+
+        result = await resilience.call_async(Config.WECHAT_MESSAGE_URL, send)
+        if result.get("errcode", 0):
+            print(f"Message failed to {data['touser']}: {result}")
+        else:
+            print(f"Message sent successfully to {data['touser']}: {result}")
+        return result
+
+
+class AsyncWechatTesterPlatform(WechatTesterPlatform):
+    """
+    AsyncWechatTesterPlatform Class sends the morning template message to all WeChat users with bounded concurrency.
+    """
+
+    async def run_async(self, concurrency: Optional[int] = None):
+        """
+        Trigger function, fetch AccessToken, resolve the content snapshot once, send message to all users concurrently.
+
+        Sends rejected with an invalid-token errcode are retried once with a refreshed token.
+        The token, the snapshot, the store and the outbox are handled in worker threads.
+
+        Parameters:
+        - concurrency (int): maximum number of in-flight requests (optional)
+        """
+        concurrency = concurrency or Config.ASYNC_CONCURRENCY
+        # the token cache takes a file lock and the token request is blocking, keep
+        # them off the event loop shared with the other channels
+        access_token = await asyncio.to_thread(self.fetch_access_token)
+        if not access_token:
+            print("Failed to fetch access token.")
+            return
+
+        snapshot = await asyncio.to_thread(self.resolve_snapshot)
+        self.outbox.defer()
+
+        async def recipients():
+            # planned one chunk at a time, as workers pull them
+            async for chunk in iterate_in_thread(self.store.chunks("wechat")):
+                pending = await self.outbox.begin_async(
+                    self.render_chunk(snapshot, chunk)
+                )
+                for recipient in chunk:
+                    if recipient.address in pending:
+                        yield recipient
+
+        try:
+            await self._send_all_async(
+                recipients(), access_token, snapshot, concurrency
+            )
+        finally:
+            await self.outbox.flush_async()
+
+    async def _send_all_async(
+        self,
+        recipients: AsyncIterable[Recipient],
+        access_token: str,
+        snapshot: ContentSnapshot,
+        concurrency: int,
+    ) -> None:
+        """
+        Internal method: send to every recipient concurrently and record the outcomes.
+
+        Parameters:
+        - recipients (AsyncIterable[Recipient]): the users, pulled as requests go out
+        - access_token (str): wechat api access_token
+        - snapshot (ContentSnapshot): run-scoped content shared by all recipients
+        - concurrency (int): maximum number of in-flight requests
+        """
+        async with transport.async_session(concurrency) as session:
+            api = AsyncWechatTester(session, access_token)
+            rejected = []
+
+            def job(recipient: Recipient):
+                async def send():
+                    try:
+                        result = await api.send_template(
+                            self.build_message(recipient, snapshot)
+                        )
+                    except Exception as e:  # pylint: disable=broad-except
+                        print(f"Request failed: {e}")
+                        self.outbox.failed_with([recipient.address], e)
+                    else:
+                        errcode = result.get("errcode", 0)
+                        self.report_errcode(recipient, errcode)
+                        if errcode in INVALID_TOKEN_ERRCODES:
+                            rejected.append(recipient)
+                    await self.outbox.commit_async()
+
+                return send
+
+            await run_bounded(
+                (job(recipient) async for recipient in recipients), concurrency
+            )
+            if not rejected:
+                return
+
+            api.access_token = await asyncio.to_thread(
+                self.fetch_access_token, invalid_token=access_token
+            )
+            if not api.access_token:
+                print("Failed to refresh access token.")
+                return
+
+            pending, rejected = rejected, []
+            await run_bounded(map(job, pending), concurrency)
@@ -1,28 +1,158 @@
 import os
+from typing import Any, Callable, Optional, Union
+
+_UNSET = object()
+
+
+def flag(value: str) -> bool:
+    """
+    Parse an on/off environment variable, anything but "0" is on.
+    """
+    return value != "0"
+
+
+def split(value: str) -> list:
+    """
+    Parse a comma-separated environment variable.
+    """
+    return value.split(",")
+
+
+class Env:
+    """
+    Env Class is a Config setting read from its environment variable on first access.
+
+    Nothing is read or parsed when the process starts, so a run only pays for the settings
+    it uses, and a variable of another channel being unset cannot break it. The value is
+    cached, assign the Config attribute to override it.
+
+    Parameters:
+    - default (str or Callable[[], str]): value of an unset variable, a callable is called
+      on first access so that it can refer to other settings (optional)
+    - cast (Callable[[str], Any]): parser of the value, e.g. int (optional)
+    """
+
+    def __init__(
+        self,
+        default: Union[str, Callable[[], str], None] = None,
+        cast: Optional[Callable[[str], Any]] = None,
+    ):
+        """
+        Initialize the Env class.
+
+        Parameters:
+        - default (str or Callable[[], str]): value of an unset variable (optional)
+        - cast (Callable[[str], Any]): parser of the value (optional)
+        """
+        self.default = default
+        self.cast = cast
+        self.name = ""
+        self._value = _UNSET
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if self._value is _UNSET:
+            value = os.getenv(self.name)
+            if value is None:
+                value = self.default() if callable(self.default) else self.default
+            if value is not None and self.cast is not None:
+                value = self.cast(value)
+            self._value = value
+        return self._value
 
 
 class Config:
     """
     Read environment variables, including WeChat public account configuration, pushdeer configuration, and user information.
+
+    Every setting is resolved on first access, see `Env`.
     """
 
 
-    NAMES = os.getenv("NAMES", "").split(",")
-    PROVINCE = os.getenv("PROVINCE")
-    CITY = os.getenv("CITY")
-    BIRTHDAY = os.getenv("BIRTHDAY")
-    LOVE_DATE = os.getenv("LOVE_DATE")
+    NAMES = Env("", split)
+    PROVINCE = Env()
+    CITY = Env()
+    BIRTHDAY = Env()
+    LOVE_DATE = Env()
+    # per-recipient cities, same order as NAMES, fall back to PROVINCE/CITY
+    PROVINCES = Env("", split)
+    CITIES = Env("", split)
+
+    # run config
+    CACHE_DIR = Env(".cache")  # on-disk caches shared between runs
+    OUTBOX_PATH = Env(
+        lambda: os.path.join(Config.CACHE_DIR, "outbox.sqlite3")
+    )  # delivery states of each day, empty to keep them in memory only
+    OUTBOX_BATCH_SIZE = Env("100", int)  # state changes per transaction
+    RECIPIENTS_PATH = Env("")  # .csv or SQLite recipient store, empty for NAMES & co.
+    RECIPIENT_CHUNK_SIZE = Env("1000", int)  # recipients held at a time
+    CHANNEL_WORKERS = Env("3", int)  # channels run at once
+    ASYNC_CONCURRENCY = Env("50", int)  # in-flight requests per channel
+    METRICS_PATH = Env(
+        lambda: os.path.join(Config.CACHE_DIR, "morning.prom")
+    )  # Prometheus textfile written at the end of a run, empty to disable
+    PROFILE_DIR = Env(
+        lambda: os.path.join(Config.CACHE_DIR, "profile")
+    )  # pstats files and report of `morning.py --profile`
+
+    # upstream content sources
+    WEATHER_SERVER_URL = Env("http://d1.weather.com.cn")  # serves /dingzhi/{AREAID}.html
+    QUOTE_URL = Env("http://www.wufazhuce.com/")  # daily quote homepage
+    WEIBO_HOT_SEARCH_URL = Env("https://weibo.com/ajax/side/hotSearch")
+
+    # weather cache config
+    WEATHER_CONCURRENCY = Env("8", int)  # cities fetched at once
+    WEATHER_CACHE_TTL = Env("1800", float)  # seconds
+    WEATHER_CACHE_SIZE = Env("512", int)  # AREAIDs kept
+    WEATHER_CACHE_PATH = Env(
+        lambda: os.path.join(Config.CACHE_DIR, "weather.json")
+    )  # empty to disable the on-disk copy
+
+    # weibo hot search history config
+    WEIBO_HISTORY_SIZE = Env("30", int)  # snapshots kept, one per day
+    WEIBO_HISTORY_PATH = Env(
+        lambda: os.path.join(Config.CACHE_DIR, "weibo_history.json")
+    )  # empty to keep the history in memory only
+    # weibo hot search server
+    WEIBO_SERVER_HOST = Env("127.0.0.1")
+    WEIBO_SERVER_PORT = Env("8000", int)
+    WEIBO_REFRESH_INTERVAL = Env("60", float)  # seconds
+    WEIBO_SERVER_ACCESS_LOG = Env("0", flag)
+
+    # http transport config
+    HTTP_POOL_SIZE = Env("10", int)  # connections kept per host
+    HTTP_KEEP_ALIVE = Env("1", flag)
+    HTTP_CONNECT_TIMEOUT = Env("5", float)
+    HTTP_READ_TIMEOUT = Env("10", float)
+    # retries and circuit breakers of upstream requests, per endpoint host
+    RETRY_ATTEMPTS = Env("3", int)  # attempts per request, 1 disables retries
+    RETRY_BASE_DELAY = Env("0.5", float)  # seconds, doubled per retry
+    RETRY_MAX_DELAY = Env("8", float)  # seconds
+    RETRY_BUDGET_RATIO = Env("0.2", float)  # retries per request
+    RETRY_BUDGET_MIN = Env("10", int)  # retries always allowed
+    BREAKER_FAILURES = Env("5", int)  # consecutive failures to open
+    BREAKER_RESET_TIMEOUT = Env("30", float)  # seconds before a probe
+    # token buckets: "key=rate[/burst],...", key a channel (pushdeer, pushplus, wechat) or a host
+    RATE_LIMITS = Env("")  # requests per second, unset keys are not paced
 
     # wechat public tester
-    WECHAT_TOKEN_URL = "https://api.weixin.qq.com/cgi-bin/token"
-    APP_ID = os.getenv("APP_ID")
-    APP_SECRET = os.getenv("APP_SECRET")
-    TEMPLATE_ID = os.getenv("TEMPLATE_ID")
-    USER_IDS = os.getenv("USER_IDS", "").split(",")  # same order as NAMES
+    WECHAT_TOKEN_URL = Env("https://api.weixin.qq.com/cgi-bin/token")
+    WECHAT_MESSAGE_URL = Env("https://api.weixin.qq.com/cgi-bin/message/template/send")
+    APP_ID = Env()
+    APP_SECRET = Env()
+    TEMPLATE_ID = Env()
+    USER_IDS = Env("", split)  # same order as NAMES
+    WECHAT_TOKEN_CACHE = Env(lambda: os.path.join(Config.CACHE_DIR, "wechat_token.json"))
 
     # pushdeer config
-    PUSHDEER_SERVER_URL = "https://api2.pushdeer.com"
-    PUSHDEER_PUSHKEYS = os.getenv("PUSHDEER_PUSHKEYS").split(",")
+    PUSHDEER_SERVER_URL = Env("https://api2.pushdeer.com")
+    PUSHDEER_PUSHKEYS = Env("", split)
+    PUSHDEER_BATCH_SIZE = Env("10", int)  # pushkeys per request
     # pushplus config
-    PUSHPLUS_SERVER_URL = "https://www.pushplus.plus"
-    PUSHPLUS_TOKENS = os.getenv("PUSHPLUS_TOKENS").split(",")
+    PUSHPLUS_SERVER_URL = Env("https://www.pushplus.plus")
+    PUSHPLUS_TOKENS = Env("", split)
+    # topic (group) code per token, same order; identical messages of a topic are sent once
+    PUSHPLUS_TOPICS = Env("", split)
+    PUSHPLUS_TOPIC_TOKEN = Env()  # token of the topics' owner
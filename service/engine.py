@@ -0,0 +1,100 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+
+
+async def iterate_in_thread(items: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Pull the items of a blocking iterator in a worker thread, one item ahead.
+
+    E.g. the chunks of the recipient store: the next chunk is read while the current
+    one is sent. Every item is pulled in the same thread, as the SQLite connections of
+    the stores belong to the thread that opened them.
+
+    Parameters:
+    - items (Iterator[T]): e.g. a generator of recipient chunks
+
+    Returns:
+    - AsyncIterator[T]: the items
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()  # e.g. the channel of the run summary
+    done = object()
+    with ThreadPoolExecutor(max_workers=1) as thread:
+
+        def pull() -> asyncio.Future:
+            return loop.run_in_executor(thread, context.run, next, items, done)
+
+        pending = pull()
+        while True:
+            item = await pending
+            if item is done:
+                return
+            pending = pull()
+            yield item
+
+
+async def run_bounded(
+    jobs: Union[
+        Iterable[Callable[[], Awaitable]], AsyncIterable[Callable[[], Awaitable]]
+    ],
+    limit: int,
+) -> int:
+    """
+    Run async jobs with at most `limit` of them in flight at the same time.
+
+    Jobs are pulled lazily from the iterable by `limit` workers, so a long
+    recipient list never turns into a long list of pending tasks.
+
+    Parameters:
+    - jobs (Iterable or AsyncIterable of Callable[[], Awaitable]): zero-argument
+      coroutine functions
+    - limit (int): maximum number of jobs in flight
+
+    Returns:
+    - int: the number of jobs that raised an exception
+    """
+    failures = 0
+    if isinstance(jobs, AsyncIterable):
+        iterator = jobs.__aiter__()
+        lock = asyncio.Lock()  # an async generator cannot be resumed twice at once
+
+        async def next_job():
+            async with lock:
+                try:
+                    return await iterator.__anext__()
+                except StopAsyncIteration:
+                    return None
+
+    else:
+        iterator = iter(jobs)
+
+        async def next_job():
+            return next(iterator, None)
+
+    async def worker():
+        nonlocal failures
+        while True:
+            job = await next_job()
+            if job is None:
+                return
+            try:
+                await job()
+            except Exception as e:  # pylint: disable=broad-except
+                failures += 1
+                print(f"Request failed: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, limit))))
+    return failures
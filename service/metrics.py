@@ -0,0 +1,364 @@
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from service.summary import current_channel
+
+# Upper bounds of the latency histograms in seconds, the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content-Type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value: float) -> str:
+    """
+    Format a sample value of the text exposition format.
+    """
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """
+    Format the label set of a sample, e.g. '{stage="weather"}', empty without labels.
+    """
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """
+    Metric Class is a named family of samples, one per combination of label values.
+
+    Parameters:
+    - name (str): metric name
+    - documentation (str): HELP text
+    - labels (Tuple[str, ...]): label names, every update gives a value for each
+    - lock (threading.Lock): lock of the registry, guarding the samples
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...],
+        lock: threading.Lock,
+    ):
+        """
+        Initialize the Metric class.
+
+        Parameters:
+        - name (str): metric name
+        - documentation (str): HELP text
+        - labels (Tuple[str, ...]): label names
+        - lock (threading.Lock): lock of the registry
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = lock
+        self._samples: Dict[Tuple[str, ...], object] = {}
+
+    def key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """
+        Get the sample key of a set of label values, missing labels are empty.
+        """
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def lines(self) -> List[str]:
+        """
+        Format the samples, the caller holds the lock.
+
+        Returns:
+        - list: the sample lines
+        """
+        return [
+            f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+            for key, value in self._samples.items()
+        ]
+
+
+class Counter(Metric):
+    """
+    Counter Class is a metric that only goes up, e.g. requests sent.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increase the sample of a set of label values.
+
+        Parameters:
+        - amount (float): increment. Default is 1
+        - labels: label name -> value
+        """
+        key = self.key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Gauge Class is a metric set to its latest value, e.g. the duration of the last run.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """
+        Set the sample of a set of label values.
+
+        Parameters:
+        - value (float): the value
+        - labels: label name -> value
+        """
+        key = self.key(labels)
+        with self._lock:
+            self._samples[key] = value
+
+
+class Histogram(Metric):
+    """
+    Histogram Class counts observations, e.g. latencies, in cumulative buckets.
+
+    Parameters:
+    - name (str): metric name
+    - documentation (str): HELP text
+    - labels (Tuple[str, ...]): label names
+    - lock (threading.Lock): lock of the registry
+    - buckets (Tuple[float, ...]): upper bounds of the buckets. Default is DEFAULT_BUCKETS
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...],
+        lock: threading.Lock,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        Initialize the Histogram class.
+
+        Parameters:
+        - name (str): metric name
+        - documentation (str): HELP text
+        - labels (Tuple[str, ...]): label names
+        - lock (threading.Lock): lock of the registry
+        - buckets (Tuple[float, ...]): upper bounds of the buckets. Default is DEFAULT_BUCKETS
+        """
+        super().__init__(name, documentation, labels, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Count an observation in its bucket.
+
+        Parameters:
+        - value (float): the observed value, e.g. seconds
+        - labels: label name -> value
+        """
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)  # the bounds are inclusive
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                # [count per bucket..., count above the last bound, sum]
+                sample = self._samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+
+    def lines(self) -> List[str]:
+        names = self.labels + ("le",)
+        lines = []
+        for key, sample in self._samples.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), sample):
+                cumulative += count
+                labels = format_labels(names, key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(sample[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Registry Class holds the metrics of the process and renders them in the Prometheus text
+    exposition format.
+
+    Updates are guarded by one lock, they are shared by the channel workers and the
+    server threads.
+    """
+
+    def __init__(self):
+        """
+        Initialize the Registry class.
+        """
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, cls: type, name: str, *args, **kwargs) -> Metric:
+        """
+        Internal method: get the metric of a name, creating it on first use.
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, lock=self._lock, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labels: Tuple[str, ...] = ()
+    ) -> Counter:
+        """
+        Get (or create) a counter.
+
+        Parameters:
+        - name (str): metric name, e.g. "morning_requests_total"
+        - documentation (str): HELP text
+        - labels (Tuple[str, ...]): label names (optional)
+
+        Returns:
+        - Counter: the counter
+        """
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(
+        self, name: str, documentation: str, labels: Tuple[str, ...] = ()
+    ) -> Gauge:
+        """
+        Get (or create) a gauge, see `counter`.
+        """
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Get (or create) a histogram, see `counter`.
+
+        Parameters:
+        - name (str): metric name, e.g. "morning_stage_duration_seconds"
+        - documentation (str): HELP text
+        - labels (Tuple[str, ...]): label names (optional)
+        - buckets (Tuple[float, ...]): upper bounds of the buckets. Default is DEFAULT_BUCKETS
+
+        Returns:
+        - Histogram: the histogram
+        """
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+        - str: HELP, TYPE and sample lines of every metric with samples
+        """
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                samples = metric.lines()
+                if samples:
+                    lines.append(f"# HELP {metric.name} {metric.documentation}")
+                    lines.append(f"# TYPE {metric.name} {metric.kind}")
+                    lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Write the metrics to a file for the node_exporter textfile collector.
+
+        The file is written next to its destination and renamed over it, so the collector
+        never reads a partial file.
+
+        Parameters:
+        - path (str): path of the .prom file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+
+# Metrics registry shared by every module of the process.
+metrics = Registry()
+
+STAGE_SECONDS = metrics.histogram(
+    "morning_stage_duration_seconds",
+    "Latency of a stage of a run: weather, quote, weibo, render (per chunk) or send.",
+    ("stage", "channel"),
+)
+STAGE_TOTAL = metrics.counter(
+    "morning_stage_total",
+    "Stage executions by outcome: ok, error, or cached for a weather cache hit.",
+    ("stage", "channel", "outcome"),
+)
+RENDERED_MESSAGES = metrics.counter(
+    "morning_rendered_messages_total", "Messages rendered per channel.", ("channel",)
+)
+RUN_SECONDS = metrics.gauge(
+    "morning_run_duration_seconds", "Wall-clock time of the last run."
+)
+LAST_RUN = metrics.gauge(
+    "morning_last_run_timestamp_seconds", "Unix time the last run finished at."
+)
+UPSTREAM_RESPONSES = metrics.counter(
+    "morning_upstream_responses_total",
+    'Upstream HTTP responses by status code, "error" when no response was received.',
+    ("upstream", "code"),
+)
+
+
+@contextmanager
+def stage(name: str, channel: Optional[str] = None):
+    """
+    Time a stage and count its outcome, "error" if the block raises.
+
+    Parameters:
+    - name (str): stage name, e.g. "weather"
+    - channel (str): channel of the stage. Default is the channel running in the current
+      context, see `RunSummary.channel`
+    """
+    if channel is None:
+        channel = current_channel() or ""
+    outcome = "error"
+    started = time.perf_counter()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        STAGE_SECONDS.observe(
+            time.perf_counter() - started, stage=name, channel=channel
+        )
+        STAGE_TOTAL.inc(stage=name, channel=channel, outcome=outcome)
@@ -0,0 +1,484 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+from service.config import Config
+from service.resilience import CircuitOpenError, is_retryable
+
+# Delivery states: pending until sent, or dead after a permanent failure
+PENDING, SENT, DEAD = "pending", "sent", "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    day TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (day, channel, recipient)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dead_letters (
+    day TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL,
+    PRIMARY KEY (day, channel, recipient)
+) WITHOUT ROWID;
+"""
+
+
+def payload_hash(payload: bytes) -> str:
+    """
+    Hash a rendered payload.
+
+    Parameters:
+    - payload (bytes): the payload as sent on the wire
+
+    Returns:
+    - str: 32 hex digits
+    """
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def is_permanent(error: Exception) -> bool:
+    """
+    Whether a failed delivery should go to the dead letters instead of being resumed.
+
+    Parameters:
+    - error (Exception): the error raised by the send
+
+    Returns:
+    - bool: False for errors that may go away (timeouts, 5xx, an open circuit), otherwise True
+    """
+    return not (is_retryable(error) or isinstance(error, CircuitOpenError))
+
+
+class Outbox:
+    """
+    Outbox Class records every (day, channel, recipient) delivery in a local SQLite database.
+
+    A run registers its deliveries as pending and sends only those not already sent or
+    dead, so a rerun on the same day resumes an interrupted run without sending twice.
+    State changes are buffered and written `batch_size` at a time in one transaction, a
+    crash loses at most the last batch, which is then sent again (at least once delivery).
+
+    Parameters:
+    - path (str): path of the database, empty to keep it in memory (optional)
+    - batch_size (int): state changes written per transaction (optional)
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: Optional[int] = None):
+        """
+        Initialize the Outbox class, unset parameters are read from Config.
+
+        Parameters:
+        - path (str): path of the database, empty to keep it in memory (optional)
+        - batch_size (int): state changes written per transaction (optional)
+        """
+        self.path = Config.OUTBOX_PATH if path is None else path
+        self.batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._updates: List[tuple] = []
+        self._dead_letters: List[tuple] = []
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection to the database, opened and migrated on first use.
+        """
+        with self._lock:
+            if self._connection is None:
+                path = self.path or ":memory:"
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(path, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                columns = connection.execute("PRAGMA table_info(dead_letters)")
+                if "payload" in {column[1] for column in columns}:
+                    # dead letters used to keep their payload, which nothing read
+                    connection.executescript(
+                        "BEGIN;"
+                        "ALTER TABLE dead_letters RENAME TO dead_letters_old;"
+                        f"{SCHEMA}"
+                        "INSERT INTO dead_letters SELECT day, channel, recipient,"
+                        " payload_hash, error, failed_at FROM dead_letters_old;"
+                        "DROP TABLE dead_letters_old;"
+                        "COMMIT;"
+                    )
+                connection.executescript(SCHEMA)
+                # recipients of the chunk being registered, see `begin`
+                connection.execute(
+                    "CREATE TEMP TABLE chunk (recipient TEXT PRIMARY KEY) WITHOUT ROWID"
+                )
+                self._connection = connection
+            return self._connection
+
+    def channel(self, name: str, day: Optional[str] = None) -> "ChannelOutbox":
+        """
+        Get the outbox of a channel run.
+
+        Parameters:
+        - name (str): channel name
+        - day (str): ISO date of the deliveries. Default is today
+
+        Returns:
+        - ChannelOutbox: the deliveries of the channel on that day
+        """
+        return ChannelOutbox(self, name, day or date.today().isoformat())
+
+    def begin(self, day: str, channel: str, payloads: Dict[str, bytes]) -> Set[str]:
+        """
+        Register the deliveries of a run, in one transaction.
+
+        Parameters:
+        - day (str): ISO date
+        - channel (str): channel name
+        - payloads (dict): recipient -> rendered payload
+
+        Returns:
+        - set: the recipients still to be sent, i.e. neither sent nor dead
+        """
+        now = time.time()
+        with self._lock, self.connection as connection:
+            connection.executemany(
+                "INSERT INTO deliveries"
+                " (day, channel, recipient, state, payload_hash, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (day, channel, recipient) DO UPDATE"
+                " SET payload_hash = excluded.payload_hash, updated_at = excluded.updated_at"
+                " WHERE state = ?",
+                (
+                    (
+                        day,
+                        channel,
+                        recipient,
+                        PENDING,
+                        payload_hash(payload),
+                        now,
+                        PENDING,
+                    )
+                    for recipient, payload in payloads.items()
+                ),
+            )
+            # only the rows of the chunk are read, not every delivery of the day: CROSS
+            # JOIN makes SQLite look each chunk recipient up in the primary key
+            connection.execute("DELETE FROM temp.chunk")
+            connection.executemany(
+                "INSERT OR IGNORE INTO temp.chunk VALUES (?)",
+                ((recipient,) for recipient in payloads),
+            )
+            done = {
+                recipient
+                for (recipient,) in connection.execute(
+                    "SELECT chunk.recipient FROM temp.chunk CROSS JOIN deliveries"
+                    " WHERE deliveries.day = ? AND deliveries.channel = ?"
+                    " AND deliveries.recipient = chunk.recipient"
+                    " AND deliveries.state != ?",
+                    (day, channel, PENDING),
+                )
+            }
+        return set(payloads) - done
+
+    def update(
+        self,
+        day: str,
+        channel: str,
+        recipient: str,
+        state: str,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Record the outcome of a send attempt, written with the next batch.
+
+        Parameters:
+        - day (str): ISO date
+        - channel (str): channel name
+        - recipient (str): recipient address
+        - state (str): SENT, PENDING to resume it later, or DEAD
+        - error (str): failure reason (optional)
+        """
+        now = time.time()
+        with self._lock:
+            self._updates.append((state, error, now, day, channel, recipient))
+            if state == DEAD:
+                self._dead_letters.append((error, now, day, channel, recipient))
+            if len(self._updates) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered outcomes in one transaction.
+        """
+        with self._lock:
+            if not self._updates:
+                return
+            with self.connection as connection:
+                connection.executemany(
+                    "UPDATE deliveries"
+                    " SET state = ?, error = ?, attempts = attempts + 1, updated_at = ?"
+                    " WHERE day = ? AND channel = ? AND recipient = ?",
+                    self._updates,
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO dead_letters"
+                    " (day, channel, recipient, payload_hash, error, failed_at)"
+                    " SELECT day, channel, recipient, payload_hash, ?, ? FROM deliveries"
+                    " WHERE day = ? AND channel = ? AND recipient = ?",
+                    self._dead_letters,
+                )
+            self._updates, self._dead_letters = [], []
+
+    def dead_letters(
+        self, day: Optional[str] = None, channel: Optional[str] = None
+    ) -> List[tuple]:
+        """
+        List the dead letters.
+
+        Parameters:
+        - day (str): ISO date filter (optional)
+        - channel (str): channel filter (optional)
+
+        Returns:
+        - list: (day, channel, recipient, error, failed_at) per dead letter
+        """
+        self.flush()
+        return self.connection.execute(
+            "SELECT day, channel, recipient, error, failed_at FROM dead_letters"
+            " WHERE (?1 IS NULL OR day = ?1) AND (?2 IS NULL OR channel = ?2)"
+            " ORDER BY day, channel, recipient",
+            (day, channel),
+        ).fetchall()
+
+    def requeue(self, day: Optional[str] = None, channel: Optional[str] = None) -> int:
+        """
+        Replay dead letters: move them back to pending, the next run of their day renders
+        and sends them again.
+
+        Parameters:
+        - day (str): ISO date filter (optional)
+        - channel (str): channel filter (optional)
+
+        Returns:
+        - int: the number of deliveries requeued
+        """
+        self.flush()
+        where = "(?1 IS NULL OR day = ?1) AND (?2 IS NULL OR channel = ?2)"
+        with self._lock, self.connection as connection:
+            connection.execute(
+                "UPDATE deliveries SET state = ?3, error = NULL"
+                " WHERE (day, channel, recipient) IN"
+                f" (SELECT day, channel, recipient FROM dead_letters WHERE {where})",
+                (day, channel, PENDING),
+            )
+            return connection.execute(
+                f"DELETE FROM dead_letters WHERE {where}", (day, channel)
+            ).rowcount
+
+
+class ChannelOutbox:
+    """
+    ChannelOutbox Class is the view of the outbox used by one channel run.
+
+    Parameters:
+    - outbox (Outbox): the outbox
+    - channel (str): channel name
+    - day (str): ISO date of the deliveries
+    """
+
+    def __init__(self, outbox: Outbox, channel: str, day: str):
+        """
+        Initialize the ChannelOutbox class.
+
+        Parameters:
+        - outbox (Outbox): the outbox
+        - channel (str): channel name
+        - day (str): ISO date of the deliveries
+        """
+        self.outbox = outbox
+        self.channel = channel
+        self.day = day
+        self.skipped = 0
+        # outcomes kept by the async engine until `commit_async` writes them
+        self.deferred: Optional[List[tuple]] = None
+        self._committing = False
+
+    def begin(self, payloads: Dict[str, bytes]) -> Set[str]:
+        """
+        Register a chunk of the deliveries of the run.
+
+        Parameters:
+        - payloads (dict): recipient address -> rendered payload
+
+        Returns:
+        - set: the recipients still to be sent
+        """
+        return self._skip(payloads, self.outbox.begin(self.day, self.channel, payloads))
+
+    async def begin_async(self, payloads: Dict[str, bytes]) -> Set[str]:
+        """
+        Register a chunk of the deliveries of the run in a worker thread, see `begin`.
+        """
+        pending = await asyncio.to_thread(
+            self.outbox.begin, self.day, self.channel, payloads
+        )
+        return self._skip(payloads, pending)
+
+    def _skip(self, payloads: Dict[str, bytes], pending: Set[str]) -> Set[str]:
+        """
+        Internal method: count the recipients of a chunk that are not pending.
+        """
+        self.skipped += len(payloads) - len(pending)
+        return pending
+
+    def _update(self, *update) -> None:
+        """
+        Internal method: record an outcome, see `Outbox.update`.
+        """
+        if self.deferred is None:
+            self.outbox.update(self.day, self.channel, *update)
+        else:
+            self.deferred.append(update)
+
+    def sent(self, recipients: Iterable[str]) -> None:
+        """
+        Record successful sends.
+
+        Parameters:
+        - recipients (Iterable[str]): recipient addresses
+        """
+        for recipient in recipients:
+            self._update(recipient, SENT)
+
+    def failed(self, recipients: Iterable[str], error: str, permanent: bool) -> None:
+        """
+        Record failed sends.
+
+        Parameters:
+        - recipients (Iterable[str]): recipient addresses
+        - error (str): failure reason
+        - permanent (bool): True to dead-letter them, False to resume them on the next run
+        """
+        state = DEAD if permanent else PENDING
+        for recipient in recipients:
+            self._update(recipient, state, error)
+
+    def failed_with(self, recipients: Iterable[str], error: Exception) -> None:
+        """
+        Record sends that raised, dead-lettered unless the error may go away.
+
+        Parameters:
+        - recipients (Iterable[str]): recipient addresses
+        - error (Exception): the error raised by the send
+        """
+        self.failed(recipients, f"{type(error).__name__}: {error}", is_permanent(error))
+
+    def record(self, results: Dict[str, bool]) -> None:
+        """
+        Record the per-recipient results of an upstream API, rejected sends are dead-lettered.
+
+        Parameters:
+        - results (dict): recipient address -> True if successful, otherwise False
+        """
+        self.sent(recipient for recipient, success in results.items() if success)
+        self.failed(
+            (recipient for recipient, success in results.items() if not success),
+            "rejected by upstream",
+            True,
+        )
+
+    def defer(self) -> None:
+        """
+        Keep the outcomes in memory until `commit_async` writes them (async engine), so
+        that recording them never waits for the outbox lock on the event loop.
+        """
+        self.deferred = []
+
+    async def commit_async(self) -> None:
+        """
+        Write the deferred outcomes in a worker thread, once they fill a batch.
+
+        One write at a time is in flight, outcomes recorded meanwhile go with the next.
+        """
+        if self._committing or len(self.deferred) < self.outbox.batch_size:
+            return
+        batch, self.deferred = self.deferred, []
+        self._committing = True
+        try:
+            await asyncio.to_thread(self._write, batch)
+        finally:
+            self._committing = False
+
+    async def flush_async(self) -> None:
+        """
+        Write the deferred outcomes in a worker thread, at the end of the run.
+        """
+        batch, self.deferred = self.deferred, None
+        await asyncio.to_thread(self._write, batch, True)
+
+    def _write(self, batch: List[tuple], final: bool = False) -> None:
+        """
+        Internal method: record deferred outcomes and write them.
+        """
+        for update in batch:
+            self.outbox.update(self.day, self.channel, *update)
+        if final:
+            self.flush()
+        else:
+            self.outbox.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered outcomes, at the end of the run, and report the skipped deliveries.
+        """
+        self.outbox.flush()
+        if self.skipped:
+            print(
+                f"Outbox: {self.skipped} {self.channel} deliveries "
+                f"already done on {self.day}, skipped"
+            )
+            self.skipped = 0
+
+
+# Outbox shared by every module of the process.
+outbox = Outbox()
+
+
+def main():
+    """
+    List or replay the dead letters.
+    """
+    parser = argparse.ArgumentParser(description="Inspect the delivery outbox.")
+    parser.add_argument("command", choices=["dead-letters", "replay"])
+    parser.add_argument("--day", help="ISO date filter, e.g. 2026-10-17")
+    parser.add_argument("--channel", choices=["pushdeer", "wechat", "pushplus"])
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        count = outbox.requeue(args.day, args.channel)
+        print(
+            f"{count} dead letters requeued, the next run of their day renders and sends"
+            " them again"
+        )
+        return
+    for day, channel, recipient, error, failed_at in outbox.dead_letters(
+        args.day, args.channel
+    ):
+        failed = time.strftime("%H:%M:%S", time.localtime(failed_at))
+        print(f"{day} {channel:<10} {recipient} {failed} {error}")
+
+
+if __name__ == "__main__":
+    main()
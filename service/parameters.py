@@ -1,9 +1,12 @@
 from datetime import date
-import re
-import requests
+from typing import Iterable, Optional, Tuple
 from service.config import Config
-import service.weather.cityinfo as cityinfo
-from service.weather.weather_api import WeatherAPI
+from service.metrics import stage
+from service.quote import QuoteParser
+from service.template import load_template
+
+# Bytes read from the daily quote page at a time
+QUOTE_CHUNK_SIZE = 4096
 
 
 class ParameterResolver:
@@ -12,22 +15,26 @@ class ParameterResolver:
     """
 
     @staticmethod
-    def calculate_days() -> tuple:
+    def calculate_days(
+        love_date: Optional[str] = None, birthday: Optional[str] = None
+    ) -> tuple:
         """
         Calculate the number of days since the date of the first love and the number of days until the next birthday.
 
         Parameters:
-        - love_date (str): love date, format is 'YYYY-MM-DD'
-        - birthday (str): birthday date, format is 'YYYY-MM-DD'
+        - love_date (str): love date, format is 'YYYY-MM-DD'. Default is Config.LOVE_DATE
+        - birthday (str): birthday date, format is 'YYYY-MM-DD'. Default is Config.BIRTHDAY
 
         Returns:
         - tuple: (number of days since the date of the first love, number of days until the next birthday)
         """
         today = date.today()
+        love_date = love_date or Config.LOVE_DATE
+        birthday = birthday or Config.BIRTHDAY
 
         try:
-            love_days = (today - date.fromisoformat(Config.LOVE_DATE)).days
-        except ValueError as exc:
+            love_days = (today - date.fromisoformat(love_date)).days
+        except (TypeError, ValueError) as exc:
             raise ValueError(
                 "Invalid love_date format. Expected 'YYYY-MM-DD'."
             ) from exc
@@ -35,10 +42,10 @@ class ParameterResolver:
         try:
             birthday_next = date(
                 today.year,
-                int(Config.BIRTHDAY.split("-")[1]),
-                int(Config.BIRTHDAY.split("-")[2]),
+                int(birthday.split("-")[1]),
+                int(birthday.split("-")[2]),
             )
-        except ValueError as exc:
+        except (AttributeError, IndexError, ValueError) as exc:
             raise ValueError("Invalid birthday format. Expected 'YYYY-MM-DD'.") from exc
 
         if today > birthday_next:
@@ -49,30 +56,36 @@ class ParameterResolver:
         return love_days, birthday_days
 
     @staticmethod
-    def get_daily_quote() -> str:
+    def get_daily_quote(url: Optional[str] = None) -> str:
         """
         Get a random quote from the Daily Qiushi website.
 
+        Parameters:
+        - url (str): URL of the homepage. Default is Config.QUOTE_URL
+
         Returns:
         - str: a random quote
         """
-        url = "http://www.wufazhuce.com/"
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from service.transport import transport
+
         try:
-            response = requests.get(url, timeout=10)
-            response.encoding = "utf-8"
-            text = response.text
-            if "fp-one-cita-wrapper" in text and "fp-one-cita" in text:
-                return (
-                    text.split("fp-one-cita-wrapper")[1]
-                    .split("fp-one-cita")[1]
-                    .split(">")[2]
-                    .split("<")[0]
+            # Stream the page and stop reading at the first quote, the rest is never downloaded
+            with stage("quote", channel=""), transport.stream(
+                "GET", url or Config.QUOTE_URL
+            ) as response:
+                response.encoding = "utf-8"
+                quote = QuoteParser.parse(
+                    response.iter_content(
+                        chunk_size=QUOTE_CHUNK_SIZE, decode_unicode=True
+                    )
                 )
-            else:
+            if quote is None:
                 print(
                     "Structure of daily quote page has changed, please update the code。"
                 )
-                return None
+            return quote
         except requests.RequestException as e:
             print(f"Request failed: {e}")
             return None
@@ -85,8 +98,45 @@ class ParameterResolver:
         Returns:
         - tuple: A tuple containing the weather description, high temperature, and low temperature.
         """
+        # pylint: disable=import-outside-toplevel
+        from service.weather import cityinfo
+        from service.weather.weather_api import WeatherAPI
+
         return WeatherAPI.get_weather(Config.PROVINCE, Config.CITY, cityinfo.cityInfo)
 
+    @staticmethod
+    def get_weather_of_locations(locations: Iterable[Tuple[str, str]]) -> dict:
+        """
+        Get weather data of several locations, each distinct AREAID is fetched exactly once.
+
+        All locations are validated and normalized up front by the city search index,
+        unknown ones are reported with suggestions and get no weather.
+
+        Parameters:
+        - locations (Iterable[Tuple[str, str]]): (province, city) pairs, duplicates are allowed
+
+        Returns:
+        - dict: (province, city) -> (weather, high temperature, low temperature), or None if unavailable
+        """
+        # pylint: disable=import-outside-toplevel
+        from service.weather.city_search import city_index
+        from service.weather.weather_api import WeatherAPI
+
+        resolved, errors = city_index().validate(locations)
+        for error in errors.values():
+            print(error.args[0])
+
+        area_ids = {location: area_id for location, (_, _, area_id) in resolved.items()}
+        area_ids.update(dict.fromkeys(errors))
+
+        weather = WeatherAPI.get_weather_batch(
+            filter(None, area_ids.values()), Config.WEATHER_CONCURRENCY
+        )
+        return {
+            location: weather.get(area_id) if area_id else None
+            for location, area_id in area_ids.items()
+        }
+
     @staticmethod
     def get_today_and_weekday() -> str:
         """
@@ -110,7 +160,7 @@ class ParameterResolver:
     @staticmethod
     def render_template(template_path, data) -> str:
         """
-        Read a template file and replaces placeholders with the values passed in the data dictionary.
+        Render a template file, replacing placeholders with the values passed in the data dictionary.
 
         Parameters:
         - template_path (str): path of the template file
@@ -119,16 +169,5 @@ class ParameterResolver:
         Returns:
         - str: the processed template string
         """
-        # Read the template file
-        with open(template_path, "r", encoding="utf-8") as file:
-            template_content = file.read()
-
-        # Regex pattern to match '{{variable_name.DATA}}'
-        pattern = re.compile(r"{{(.*?)\.DATA}}")
-
-        # Substitute the placeholders with the values passed in the data dictionary.
-        result = pattern.sub(
-            lambda match: str(data.get(match.group(1), "")), template_content
-        )
-
-        return result
+        # Compiled once per file version, rendering is a join over its segments
+        return load_template(template_path).render(data)
@@ -0,0 +1,211 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class StageProfile:
+    """
+    CPU profile and memory use of a stage of a run.
+    """
+
+    name: str
+    wall: float
+    cpu: float
+    peak: int
+    stats: pstats.Stats
+    allocations: List[tracemalloc.StatisticDiff]
+
+
+def short_path(path: str) -> str:
+    """
+    Shorten a source path to its last two components, e.g. "weather/weather_api.py".
+    """
+    return os.path.join(*path.replace("\\", "/").split("/")[-2:]) if path else path
+
+
+def format_size(size: int) -> str:
+    """
+    Format a number of bytes in KiB or MiB.
+    """
+    if abs(size) >= 1 << 20:
+        return f"{size / (1 << 20):.1f} MiB"
+    return f"{size / 1024:.1f} KiB"
+
+
+class StageProfiler:
+    """
+    StageProfiler Class records a cProfile profile, the tracemalloc peak and the top
+    allocations of each stage of a run.
+
+    The profile of a stage covers the thread that runs it and the threads it starts (e.g.
+    the weather fetches), so the stages must not overlap. Memory is traced for the whole
+    process from the creation of the profiler, which slows allocations down; create one
+    only when profiling.
+
+    Parameters:
+    - directory (str): where the pstats files and the report are written
+    - top (int): hot spots and allocations listed per stage. Default is 10
+    """
+
+    def __init__(self, directory: str, top: int = 10):
+        """
+        Initialize the StageProfiler class and start tracing memory allocations.
+
+        Parameters:
+        - directory (str): where the pstats files and the report are written
+        - top (int): hot spots and allocations listed per stage. Default is 10
+        """
+        self.directory = directory
+        self.top = top
+        self.stages: List[StageProfile] = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        """
+        Internal method: take a snapshot of the traced allocations, without the profiler's own.
+        """
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile a stage of the run.
+
+        Parameters:
+        - name (str): stage name, e.g. "snapshot"
+        """
+        profiles = [cProfile.Profile()]
+        lock = threading.Lock()
+        done = False
+
+        def profile_thread(*_):
+            # first event of a thread started during the stage: profile it from here on
+            with lock:
+                if done:
+                    # the thread started running after the stage ended
+                    sys.setprofile(None)
+                    return
+                profile = cProfile.Profile()
+                profiles.append(profile)
+            profile.enable()
+
+        before = self._snapshot()
+        tracemalloc.reset_peak()
+        threading.setprofile(profile_thread)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        profiles[0].enable()
+        try:
+            yield
+        finally:
+            # first, so that threads started from here on are not profiled
+            threading.setprofile(None)
+            profiles[0].disable()
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            peak = tracemalloc.get_traced_memory()[1]
+            after = self._snapshot()
+
+            with lock:
+                done = True
+                stats = pstats.Stats(*profiles)
+            allocations = sorted(
+                (
+                    diff
+                    for diff in after.compare_to(before, "lineno")
+                    if diff.size_diff > 0
+                ),
+                key=lambda diff: -diff.size_diff,
+            )
+            self.stages.append(
+                StageProfile(name, wall, cpu, peak, stats, allocations[: self.top])
+            )
+
+    def hot_spots(self, stats: pstats.Stats) -> List[str]:
+        """
+        Format the functions with the highest self time of a profile.
+
+        Time spent waiting on the network shows up in socket, ssl and select functions.
+
+        Parameters:
+        - stats (pstats.Stats): the profile
+
+        Returns:
+        - list: one line per function
+        """
+        # (file, line, function) -> (primitive calls, calls, self time, cumulative time, callers)
+        entries = sorted(stats.stats.items(), key=lambda item: -item[1][2])
+        lines = []
+        for (path, line, function), (_, calls, own, cumulative, _) in entries[
+            : self.top
+        ]:
+            where = f" ({short_path(path)}:{line})" if line else ""
+            lines.append(
+                f"    {own * 1000:9.1f} ms self {cumulative * 1000:9.1f} ms cumulative"
+                f" {calls:>8} calls  {function}{where}"
+            )
+        return lines
+
+    def report(self) -> str:
+        """
+        Format the wall and CPU time, memory peak, hot spots and top allocations of each stage.
+
+        Returns:
+        - str: the report
+        """
+        lines = ["Profile:"]
+        for stage in self.stages:
+            lines.append(
+                f"  {stage.name}: {stage.wall:.3f}s wall, {stage.cpu:.3f}s CPU,"
+                f" peak {format_size(stage.peak)} traced"
+            )
+            lines.append("  hot spots:")
+            lines.extend(self.hot_spots(stage.stats))
+            lines.append("  top allocations:")
+            if not stage.allocations:
+                lines.append("    none retained")
+            for diff in stage.allocations:
+                frame = diff.traceback[0]
+                lines.append(
+                    f"    {format_size(diff.size_diff):>10} {diff.count_diff:>8} blocks"
+                    f"  {short_path(frame.filename)}:{frame.lineno}"
+                )
+        return "\n".join(lines)
+
+    def write(self) -> Optional[str]:
+        """
+        Write a pstats file per stage, one of the whole run (morning.pstats) and the report.
+
+        The pstats files can be explored with `python -m pstats` or snakeviz.
+
+        Returns:
+        - str: path of the report, None if no stage was profiled
+        """
+        if not self.stages:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        for stage in self.stages:
+            stage.stats.dump_stats(os.path.join(self.directory, f"{stage.name}.pstats"))
+        total = pstats.Stats()
+        total.add(*(stage.stats for stage in self.stages))
+        total.dump_stats(os.path.join(self.directory, "morning.pstats"))
+
+        path = os.path.join(self.directory, "report.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.report() + "\n")
+        return path
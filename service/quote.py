@@ -0,0 +1,74 @@
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+
+# Class of the element holding the daily quote on the wufazhuce.com homepage
+QUOTE_CLASS = "fp-one-cita"
+
+
+class QuoteParser(HTMLParser):
+    """
+    QuoteParser Class is an incremental HTML parser that extracts the first daily quote.
+
+    It tracks the nesting depth inside the first `fp-one-cita` element and keeps its first
+    non-blank text node, so the page can be fed chunk by chunk and reading can stop as soon
+    as `quote` is set.
+    """
+
+    def __init__(self):
+        """
+        Initialize the QuoteParser class.
+        """
+        super().__init__()
+        self.depth = 0
+        self.text = []
+        self.quote: Optional[str] = None
+
+    def flush_text(self):
+        """
+        Keep the text collected so far as the quote if it is not blank.
+
+        A text node can be reported in pieces when it spans two chunks, so it is only
+        complete at the next tag.
+        """
+        text = "".join(self.text).strip()
+        self.text = []
+        if text:
+            self.quote = text
+
+    def handle_starttag(self, tag, attrs):
+        if self.quote is not None:
+            return
+        if self.depth:
+            self.flush_text()
+            self.depth += 1
+        elif QUOTE_CLASS in (dict(attrs).get("class") or "").split():
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth:
+            if self.quote is None:
+                self.flush_text()
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if self.depth and self.quote is None:
+            self.text.append(data)
+
+    @classmethod
+    def parse(cls, chunks: Iterable[str]) -> Optional[str]:
+        """
+        Feed decoded chunks of a page until the quote is found.
+
+        Parameters:
+        - chunks (Iterable[str]): decoded page chunks, not consumed past the quote
+
+        Returns:
+        - str: the quote, or None if the page has no quote
+        """
+        parser = cls()
+        for chunk in chunks:
+            parser.feed(chunk)
+            if parser.quote is not None:
+                return parser.quote
+        parser.close()
+        return parser.quote
@@ -0,0 +1,225 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from service.config import Config
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse a rate limit specification.
+
+    Parameters:
+    - spec (str): comma-separated "key=rate[/burst]" entries, the key is a channel name
+      (e.g. "pushplus") or a host[:port] (e.g. "www.pushplus.plus"), the rate is in
+      requests per second
+
+    Returns:
+    - dict: key -> (rate, burst), the burst defaults to max(1, rate)
+    """
+    limits = {}
+    for entry in spec.split(","):
+        key, _, value = entry.strip().rpartition("=")
+        if not key:
+            continue
+        rate, _, burst = value.partition("/")
+        try:
+            limits[key.strip()] = (
+                float(rate),
+                float(burst) if burst else max(1.0, float(rate)),
+            )
+        except ValueError:
+            print(f"Ignoring invalid rate limit: {entry}")
+    return limits
+
+
+class TokenBucket:
+    """
+    TokenBucket Class paces requests to `rate` per second, with bursts of up to `burst`.
+
+    A request waits until a token is due and then takes it, so a request that also
+    waits for another bucket is charged when it is sent rather than when it starts to
+    wait. The same bucket paces threads and asyncio tasks.
+
+    Parameters:
+    - rate (float): tokens per second, 0 for no limit
+    - burst (float): bucket size, tokens available at once (optional)
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the TokenBucket class, the bucket starts full.
+
+        Parameters:
+        - rate (float): tokens per second, 0 for no limit
+        - burst (float): bucket size, tokens available at once (optional)
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _available(self, now: float) -> float:
+        """
+        Tokens in the bucket at a point in time, negative while paused.
+        """
+        return min(self.burst, self._tokens + (now - self._updated) * self.rate)
+
+    def due(self) -> float:
+        """
+        Check when a token is available, without taking it.
+
+        Returns:
+        - float: seconds to wait for a token, 0 if one is available now
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate > 0:
+                tokens = self._available(now)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / self.rate)
+            return wait
+
+    def take(self) -> None:
+        """
+        Take a token, once `due` returned 0.
+        """
+        with self._lock:
+            if self.rate > 0:
+                now = time.monotonic()
+                self._tokens = self._available(now) - 1
+                self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every request for a while, e.g. after the upstream throttled one, and restart
+        from an empty bucket so that the backlog does not go out as a burst.
+
+        Parameters:
+        - seconds (float): seconds to hold requests for
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            if self.rate > 0:
+                self._tokens = min(0.0, self._available(now))
+                self._updated = self._paused_until
+
+
+class RateLimiter:
+    """
+    RateLimiter Class keeps a token bucket per channel and per upstream host.
+
+    A request is sent once both the bucket of its channel and the bucket of its host
+    have a token, and only then takes one from each, so the bucket that is not the
+    bottleneck is not charged while the request waits for the other. Channels and
+    hosts without a configured limit are not paced, but their host is still held back
+    after a throttled response.
+
+    Parameters:
+    - limits (dict): key -> (rate, burst), see `parse_rate_limits` (optional)
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize the RateLimiter class.
+
+        Parameters:
+        - limits (dict): key -> (rate, burst), read from Config.RATE_LIMITS on first use (optional)
+        """
+        self._limits = limits
+        self._lock = threading.Lock()
+        self._take_lock = threading.Lock()  # checks and takes both tokens at once
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @property
+    def limits(self) -> Dict[str, Tuple[float, float]]:
+        """
+        Configured limits, key -> (rate, burst).
+        """
+        if self._limits is None:
+            self._limits = parse_rate_limits(Config.RATE_LIMITS)
+        return self._limits
+
+    def bucket(self, key: str) -> TokenBucket:
+        """
+        Get (or create) the bucket of a channel or host.
+
+        Parameters:
+        - key (str): channel name or host[:port]
+
+        Returns:
+        - TokenBucket: the bucket, unlimited if no limit is configured for the key
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*self.limits.get(key, (0, 1)))
+                self._buckets[key] = bucket
+            return bucket
+
+    def reserve(self, channel: str, url: str) -> float:
+        """
+        Take a token from the buckets of a channel and of the host of a URL, if both
+        have one.
+
+        Parameters:
+        - channel (str): channel name, e.g. "pushplus"
+        - url (str): request URL
+
+        Returns:
+        - float: 0 if the tokens were taken and the request may be sent, else seconds
+          to wait before trying again
+        """
+        buckets = (self.bucket(channel), self.bucket(urlsplit(url).netloc))
+        with self._take_lock:
+            wait = max(bucket.due() for bucket in buckets)
+            if not wait:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def acquire(self, channel: str, url: str) -> None:
+        """
+        Wait until a request of a channel to a URL may be sent.
+
+        Parameters:
+        - channel (str): channel name, e.g. "pushplus"
+        - url (str): request URL
+        """
+        wait = self.reserve(channel, url)
+        while wait:
+            time.sleep(wait)
+            wait = self.reserve(channel, url)
+
+    async def acquire_async(self, channel: str, url: str) -> None:
+        """
+        Wait until a request of a channel to a URL may be sent, without blocking the event loop.
+
+        Parameters:
+        - channel (str): channel name, e.g. "pushplus"
+        - url (str): request URL
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        wait = self.reserve(channel, url)
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self.reserve(channel, url)
+
+    def pause(self, url: str, seconds: float) -> None:
+        """
+        Hold every request to the host of a URL, after it throttled one.
+
+        Parameters:
+        - url (str): URL of the throttled request
+        - seconds (float): seconds to hold requests for
+        """
+        self.bucket(urlsplit(url).netloc).pause(seconds)
+
+
+# Rate limiter shared by every module of the process.
+rate_limiter = RateLimiter()
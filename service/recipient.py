@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from typing import List
+from service.config import Config
+
+
+@dataclass(frozen=True)
+class Recipient:
+    """
+    A single recipient of a channel.
+
+    Parameters:
+    - name (str): recipient name
+    - address (str): channel credential: wechat user id, PushDeer pushkey or PushPlus token
+    - province (str): province of the recipient's city
+    - city (str): city the weather is reported for
+    - group (str): channel-side group the recipient subscribes to, e.g. a PushPlus topic code (optional)
+    - love_date (str): the recipient's love date, 'YYYY-MM-DD', empty for Config.LOVE_DATE (optional)
+    - birthday (str): the recipient's birthday, 'YYYY-MM-DD', empty for Config.BIRTHDAY (optional)
+    """
+
+    name: str
+    address: str
+    province: str
+    city: str
+    group: str = ""
+    love_date: str = ""
+    birthday: str = ""
+
+
+def channel_addresses(channel: str) -> List[str]:
+    """
+    Get the configured addresses of a channel.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+
+    Returns:
+    - list: addresses in the same order as Config.NAMES
+    """
+    return {
+        "wechat": Config.USER_IDS,
+        "pushdeer": Config.PUSHDEER_PUSHKEYS,
+        "pushplus": Config.PUSHPLUS_TOKENS,
+    }[channel]
+
+
+def channel_groups(channel: str) -> List[str]:
+    """
+    Get the configured groups of a channel's recipients.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+
+    Returns:
+    - list: group per address, same order as Config.NAMES, empty if the channel has none
+    """
+    return {"pushplus": Config.PUSHPLUS_TOPICS}.get(channel, [])
+
+
+def load_recipients(channel: str) -> List[Recipient]:
+    """
+    Build the recipients of a channel from the configuration.
+
+    Each recipient gets the city at the same position in Config.PROVINCES/Config.CITIES,
+    recipients without one fall back to Config.PROVINCE/Config.CITY.
+
+    Parameters:
+    - channel (str): "pushdeer", "wechat" or "pushplus"
+
+    Returns:
+    - list: the recipients of the channel, without empty addresses
+    """
+    groups = channel_groups(channel)
+    recipients = []
+    for index, (address, name) in enumerate(
+        zip(channel_addresses(channel), Config.NAMES)
+    ):
+        if not address:
+            continue  # the channel is not configured for this name
+        province = Config.PROVINCES[index] if index < len(Config.PROVINCES) else ""
+        city = Config.CITIES[index] if index < len(Config.CITIES) else ""
+        recipients.append(
+            Recipient(
+                name=name,
+                address=address,
+                province=province or Config.PROVINCE,
+                city=city or Config.CITY,
+                group=groups[index] if index < len(groups) else "",
+            )
+        )
+    return recipients
@@ -0,0 +1,344 @@
+import argparse
+import csv
+import sqlite3
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from service.config import Config
+from service.recipient import Recipient, load_recipients
+
+# Columns of a recipient file, in order; only channel and address are required
+FIELDS = (
+    "channel",
+    "address",
+    "name",
+    "province",
+    "city",
+    "group",
+    "love_date",
+    "birthday",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipients (
+    channel TEXT NOT NULL,
+    address TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    province TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    "group" TEXT NOT NULL DEFAULT '',
+    love_date TEXT NOT NULL DEFAULT '',
+    birthday TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (channel, address)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS recipients_by_group ON recipients (channel, "group", address);
+CREATE INDEX IF NOT EXISTS recipients_by_city ON recipients (channel, province, city);
+"""
+
+
+def make_recipient(row: dict) -> Recipient:
+    """
+    Build a recipient from a stored row, empty cities fall back to Config.PROVINCE/Config.CITY.
+
+    Parameters:
+    - row (dict): FIELDS -> value, missing fields are empty
+
+    Returns:
+    - Recipient: the recipient
+    """
+    return Recipient(
+        name=row.get("name") or "",
+        address=row["address"],
+        province=row.get("province") or Config.PROVINCE,
+        city=row.get("city") or Config.CITY,
+        group=row.get("group") or "",
+        love_date=row.get("love_date") or "",
+        birthday=row.get("birthday") or "",
+    )
+
+
+class RecipientStore:
+    """
+    RecipientStore Class is the source of the recipients of every channel.
+
+    Recipients are read as a stream, so a run holds one chunk of them at a time. Subclasses
+    implement `recipients`, the other queries are derived from it.
+    """
+
+    def recipients(self, channel: str) -> Iterator[Recipient]:
+        """
+        Stream the recipients of a channel.
+
+        Parameters:
+        - channel (str): "pushdeer", "wechat" or "pushplus"
+
+        Returns:
+        - Iterator[Recipient]: the recipients
+        """
+        raise NotImplementedError
+
+    def chunks(
+        self, channel: str, size: Optional[int] = None
+    ) -> Iterator[List[Recipient]]:
+        """
+        Stream the recipients of a channel in fixed-size chunks.
+
+        Parameters:
+        - channel (str): "pushdeer", "wechat" or "pushplus"
+        - size (int): recipients per chunk. Default is Config.RECIPIENT_CHUNK_SIZE
+
+        Returns:
+        - Iterator[List[Recipient]]: the chunks
+        """
+        size = size or Config.RECIPIENT_CHUNK_SIZE
+        recipients = self.recipients(channel)
+        while True:
+            chunk = list(islice(recipients, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def group_chunks(
+        self, channel: str, size: Optional[int] = None
+    ) -> Iterator[List[Recipient]]:
+        """
+        Stream the recipients of a channel in chunks that do not split a run of recipients
+        of the same group, a chunk goes past `size` until the end of its last group.
+
+        Parameters:
+        - channel (str): "pushdeer", "wechat" or "pushplus"
+        - size (int): recipients per chunk. Default is Config.RECIPIENT_CHUNK_SIZE
+
+        Returns:
+        - Iterator[List[Recipient]]: the chunks
+        """
+        size = size or Config.RECIPIENT_CHUNK_SIZE
+        chunk: List[Recipient] = []
+        for recipient in self.recipients(channel):
+            if len(chunk) >= size and (
+                not recipient.group or recipient.group != chunk[-1].group
+            ):
+                yield chunk
+                chunk = []
+            chunk.append(recipient)
+        if chunk:
+            yield chunk
+
+    def locations(self, channels: Iterable[str]) -> Set[Tuple[str, str]]:
+        """
+        Get the distinct cities of the recipients of several channels.
+
+        Parameters:
+        - channels (Iterable[str]): channel names
+
+        Returns:
+        - set: (province, city) pairs
+        """
+        return {
+            (recipient.province, recipient.city)
+            for channel in channels
+            for recipient in self.recipients(channel)
+        }
+
+    def group_sizes(self, channel: str) -> Dict[str, int]:
+        """
+        Count the recipients of each group of a channel.
+
+        Parameters:
+        - channel (str): "pushdeer", "wechat" or "pushplus"
+
+        Returns:
+        - dict: group -> number of recipients, without the recipients in no group
+        """
+        sizes = Counter(recipient.group for recipient in self.recipients(channel))
+        sizes.pop("", None)
+        return dict(sizes)
+
+
+class EnvRecipientStore(RecipientStore):
+    """
+    Recipients configured by the comma-separated environment variables, see `load_recipients`.
+    """
+
+    def recipients(self, channel: str) -> Iterator[Recipient]:
+        return iter(load_recipients(channel))
+
+
+class CsvRecipientStore(RecipientStore):
+    """
+    Recipients read from a CSV file with a FIELDS header, streamed row by row.
+
+    The file has no index, every query scans it; import it into SQLite for large lists.
+
+    Parameters:
+    - path (str): path of the CSV file
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the CsvRecipientStore class.
+
+        Parameters:
+        - path (str): path of the CSV file
+        """
+        self.path = path
+
+    def rows(self) -> Iterator[dict]:
+        """
+        Stream the rows of the file.
+
+        Returns:
+        - Iterator[dict]: FIELDS -> value per row
+        """
+        with open(self.path, "r", encoding="utf-8", newline="") as file:
+            yield from csv.DictReader(file)
+
+    def recipients(self, channel: str) -> Iterator[Recipient]:
+        for row in self.rows():
+            if row.get("channel") == channel and row.get("address"):
+                yield make_recipient(row)
+
+
+class SqliteRecipientStore(RecipientStore):
+    """
+    Recipients kept in a SQLite database indexed by channel and group.
+
+    Parameters:
+    - path (str): path of the database
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the SqliteRecipientStore class.
+
+        Parameters:
+        - path (str): path of the database
+        """
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread, the schema is created on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.row_factory = sqlite3.Row
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def chunks(
+        self, channel: str, size: Optional[int] = None
+    ) -> Iterator[List[Recipient]]:
+        size = size or Config.RECIPIENT_CHUNK_SIZE
+        cursor = self.connection.execute(
+            'SELECT * FROM recipients WHERE channel = ? ORDER BY "group", address',
+            (channel,),
+        )
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield [make_recipient(dict(row)) for row in rows]
+
+    def recipients(self, channel: str) -> Iterator[Recipient]:
+        for chunk in self.chunks(channel):
+            yield from chunk
+
+    def locations(self, channels: Iterable[str]) -> Set[Tuple[str, str]]:
+        channels = list(channels)
+        locations = self.connection.execute(
+            "SELECT DISTINCT province, city FROM recipients"
+            f" WHERE channel IN ({', '.join('?' * len(channels))})",
+            channels,
+        )
+        return {
+            (province or Config.PROVINCE, city or Config.CITY)
+            for province, city in locations
+        }
+
+    def group_sizes(self, channel: str) -> Dict[str, int]:
+        return dict(
+            self.connection.execute(
+                'SELECT "group", COUNT(*) FROM recipients'
+                ' WHERE channel = ? AND "group" != \'\' GROUP BY "group"',
+                (channel,),
+            ).fetchall()
+        )
+
+    def add(self, rows: Iterable[dict], batch_size: int = 10000) -> int:
+        """
+        Insert or replace recipients, `batch_size` rows per transaction.
+
+        Parameters:
+        - rows (Iterable[dict]): FIELDS -> value per recipient
+        - batch_size (int): rows per transaction. Default is 10000
+
+        Returns:
+        - int: the number of rows written
+        """
+        placeholders = ", ".join("?" * len(FIELDS))
+        columns = ", ".join(f'"{field}"' for field in FIELDS)
+        rows = iter(rows)
+        count = 0
+        while True:
+            batch = [
+                tuple(row.get(field) or "" for field in FIELDS)
+                for row in islice(rows, batch_size)
+            ]
+            if not batch:
+                return count
+            with self.connection as connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO recipients ({columns})"
+                    f" VALUES ({placeholders})",
+                    batch,
+                )
+            count += len(batch)
+
+
+_store: Optional[RecipientStore] = None
+
+
+def recipient_store() -> RecipientStore:
+    """
+    Get the recipient store of Config.RECIPIENTS_PATH, opened on first use.
+
+    Returns:
+    - RecipientStore: a CSV store for a .csv path, a SQLite store for any other path,
+      the environment variables if the path is empty
+    """
+    global _store  # pylint: disable=global-statement
+    if _store is None:
+        path = Config.RECIPIENTS_PATH
+        if not path:
+            _store = EnvRecipientStore()
+        elif path.lower().endswith(".csv"):
+            _store = CsvRecipientStore(path)
+        else:
+            _store = SqliteRecipientStore(path)
+    return _store
+
+
+def main():
+    """
+    Import a CSV recipient file into a SQLite store.
+    """
+    parser = argparse.ArgumentParser(description="Manage the recipient store.")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("csv_path", help=f"CSV file with a {','.join(FIELDS)} header")
+    parser.add_argument("db_path", help="SQLite database, created if missing")
+    args = parser.parse_args()
+
+    count = SqliteRecipientStore(args.db_path).add(
+        CsvRecipientStore(args.csv_path).rows()
+    )
+    print(f"{count} recipients imported into {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
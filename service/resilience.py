@@ -0,0 +1,469 @@
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import requests
+from service.config import Config
+from service.metrics import stage
+from service.ratelimit import rate_limiter
+from service.summary import count_event
+from service.transport import transport
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timed out, throttled or failed on the server side
+RETRYABLE_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+
+
+class TransientError(Exception):
+    """
+    An upstream failure reported in a successful HTTP response that is expected to go away,
+    e.g. a "system busy" API error code.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to an endpoint whose circuit breaker is open.
+    """
+
+
+def status_of(error: Exception) -> Optional[int]:
+    """
+    Get the HTTP status of a failed request.
+
+    Parameters:
+    - error (Exception): a requests or aiohttp error
+
+    Returns:
+    - int: the HTTP status, or None if no response was received
+    """
+    response = getattr(error, "response", None)  # requests.HTTPError
+    if response is not None:
+        return response.status_code
+    return getattr(error, "status", None)  # aiohttp.ClientResponseError
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed request may succeed if sent again.
+
+    Parameters:
+    - error (Exception): the error raised by the request
+
+    Returns:
+    - bool: True for connection errors, timeouts, transient errors and RETRYABLE_STATUSES
+    """
+    if isinstance(
+        error,
+        (
+            TransientError,
+            requests.ConnectionError,
+            requests.Timeout,
+            ConnectionError,
+        ),
+    ):
+        return True
+    # asyncio and aiohttp are only loaded by the async engine
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None and isinstance(error, asyncio.TimeoutError):
+        return True
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError):
+        return True
+    return status_of(error) in RETRYABLE_STATUSES
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Get the delay asked for by the Retry-After header of a failed request.
+
+    Parameters:
+    - error (Exception): a requests or aiohttp error
+
+    Returns:
+    - float: seconds to wait, or None if the header is absent or an HTTP date
+    """
+    response = getattr(error, "response", None)
+    headers = (
+        response.headers if response is not None else getattr(error, "headers", None)
+    )
+    try:
+        return max(0.0, float((headers or {}).get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Number of attempts of a request and exponential backoff between them.
+
+    - attempts: attempts per request, including the first one
+    - base_delay: backoff cap of the first retry in seconds, doubled for each further retry
+    - max_delay: maximum backoff in seconds
+    """
+
+    attempts: int = field(default_factory=lambda: Config.RETRY_ATTEMPTS)
+    base_delay: float = field(default_factory=lambda: Config.RETRY_BASE_DELAY)
+    max_delay: float = field(default_factory=lambda: Config.RETRY_MAX_DELAY)
+
+    def backoff(self, retry: int) -> float:
+        """
+        Get the delay before a retry, with full jitter so that clients failing together
+        do not retry together.
+
+        Parameters:
+        - retry (int): 0 for the first retry
+
+        Returns:
+        - float: seconds to wait, uniform between 0 and the exponential cap
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class RetryBudget:
+    """
+    RetryBudget Class caps the retries sent to an endpoint to a fraction of its requests.
+
+    When an upstream is down every request fails, and unbounded retries would multiply the
+    load on it, so only `minimum` + `ratio` * requests retries are allowed.
+
+    Parameters:
+    - ratio (float): retries allowed per request (optional)
+    - minimum (int): retries always allowed (optional)
+    """
+
+    def __init__(self, ratio: Optional[float] = None, minimum: Optional[int] = None):
+        """
+        Initialize the RetryBudget class, unset parameters are read from Config.
+
+        Parameters:
+        - ratio (float): retries allowed per request (optional)
+        - minimum (int): retries always allowed (optional)
+        """
+        self.ratio = Config.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.minimum = Config.RETRY_BUDGET_MIN if minimum is None else minimum
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def record_request(self) -> None:
+        """
+        Count a first attempt, it earns `ratio` retries.
+        """
+        with self._lock:
+            self.requests += 1
+
+    def withdraw(self) -> bool:
+        """
+        Take a retry from the budget.
+
+        Returns:
+        - bool: True if the retry is allowed, otherwise False
+        """
+        with self._lock:
+            if self.retries >= self.minimum + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker Class stops sending requests to an endpoint that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests are
+    rejected at once. After `reset_timeout` seconds a single probe request is let through
+    (half-open): its success closes the circuit, its failure opens it again.
+
+    Parameters:
+    - name (str): endpoint name
+    - failure_threshold (int): consecutive failures that open the circuit (optional)
+    - reset_timeout (float): seconds the circuit stays open before a probe (optional)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the CircuitBreaker class, unset parameters are read from Config.
+
+        Parameters:
+        - name (str): endpoint name
+        - failure_threshold (int): consecutive failures that open the circuit (optional)
+        - reset_timeout (float): seconds the circuit stays open before a probe (optional)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.BREAKER_FAILURES
+        self.reset_timeout = (
+            Config.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        )
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """
+        "closed", "open" or "half-open".
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or (
+                time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now, a half-open circuit lets a single probe through.
+
+        Returns:
+        - bool: True if the request may be sent, otherwise False
+        """
+        return self.admit() is not None
+
+    def admit(self) -> Optional[bool]:
+        """
+        Let a request through, see `allow`.
+
+        Returns:
+        - bool: True for the probe of a half-open circuit, which the caller ends with
+          `end_probe`, False for a request of a closed circuit, None if it is rejected
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return None
+            self._probing = True
+            return True
+
+    def end_probe(self) -> None:
+        """
+        Let the next probe through if the current one ended without a recorded outcome,
+        e.g. it was cancelled. The circuit stays open.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        """
+        Record that the endpoint answered, this closes the circuit.
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, this opens the circuit at the threshold or after a failed probe.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"Circuit opened for {self.name}")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+@dataclass
+class Endpoint:
+    """
+    Resilience state of an endpoint host: its circuit breaker and retry budget.
+    """
+
+    breaker: CircuitBreaker
+    budget: RetryBudget
+
+
+class Resilience:
+    """
+    Resilience Class sends requests with retries, exponential backoff with jitter, a retry
+    budget and a circuit breaker per endpoint host.
+
+    Retries are counted as "retries" and requests rejected by an open circuit as "shed" in
+    the run summary of the current channel. Every call, retries included, is timed as the
+    "send" stage of the channel in the metrics.
+
+    Parameters:
+    - policy (RetryPolicy): attempts and backoff of every request (optional)
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None):
+        """
+        Initialize the Resilience class.
+
+        Parameters:
+        - policy (RetryPolicy): attempts and backoff of every request (optional)
+        """
+        self._policy = policy
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Endpoint] = {}
+
+    @property
+    def policy(self) -> RetryPolicy:
+        """
+        Attempts and backoff of every request, read from Config on first use.
+        """
+        if self._policy is None:
+            self._policy = RetryPolicy()
+        return self._policy
+
+    def endpoint(self, url: str) -> Endpoint:
+        """
+        Get (or create) the resilience state of the host of a URL.
+
+        Parameters:
+        - url (str): request URL
+
+        Returns:
+        - Endpoint: state shared by every request to the host
+        """
+        host = transport.host_of(url)
+        with self._lock:
+            endpoint = self._endpoints.get(host)
+            if endpoint is None:
+                endpoint = Endpoint(CircuitBreaker(host), RetryBudget())
+                self._endpoints[host] = endpoint
+            return endpoint
+
+    @staticmethod
+    def _admit(endpoint: Endpoint) -> bool:
+        """
+        Internal method: let a request through the circuit breaker or shed it.
+
+        Parameters:
+        - endpoint (Endpoint): endpoint of the request
+
+        Returns:
+        - bool: whether the request is the probe of a half-open circuit
+        """
+        probe = endpoint.breaker.admit()
+        if probe is None:
+            count_event("shed")
+            raise CircuitOpenError(f"Circuit open for {endpoint.breaker.name}")
+        return probe
+
+    def _retry_delay(
+        self, url: str, endpoint: Endpoint, error: Exception, retry: int
+    ) -> Optional[float]:
+        """
+        Internal method: record a failed attempt and decide whether to retry it.
+
+        A throttled (429) attempt does not count against the circuit breaker, the endpoint
+        is up, but holds back every request to the host in the rate limiter.
+
+        Parameters:
+        - url (str): request URL
+        - endpoint (Endpoint): endpoint of the request
+        - error (Exception): the error raised by the attempt
+        - retry (int): number of retries already sent
+
+        Returns:
+        - float: seconds to wait before the retry, or None to give up
+        """
+        if status_of(error) == 429:
+            rate_limiter.pause(url, retry_after(error) or self.policy.base_delay)
+        elif not is_retryable(error):
+            endpoint.breaker.record_success()  # e.g. a 4xx: the endpoint is up
+            return None
+        else:
+            endpoint.breaker.record_failure()
+        if (
+            retry + 1 >= self.policy.attempts
+            or endpoint.breaker.state == "open"
+            or not endpoint.budget.withdraw()
+        ):
+            return None
+        count_event("retries")
+        delay = self.policy.backoff(retry)
+        asked = retry_after(error)
+        if asked is not None:
+            delay = max(delay, min(asked, self.policy.max_delay))
+        return delay
+
+    def call(self, url: str, send: Callable[[], T]) -> T:
+        """
+        Send a request with retries.
+
+        Parameters:
+        - url (str): request URL, selects the endpoint
+        - send (Callable[[], T]): sends the request once, raising on failure
+
+        Returns:
+        - T: the result of the first successful attempt
+
+        Raises:
+        - CircuitOpenError: the circuit of the endpoint is open
+        - Exception: the error of the last attempt
+        """
+        with stage("send"):
+            endpoint = self.endpoint(url)
+            endpoint.budget.record_request()
+            retry = 0
+            while True:
+                probe = self._admit(endpoint)
+                try:
+                    result = send()
+                except Exception as e:  # pylint: disable=broad-except
+                    delay = self._retry_delay(url, endpoint, e, retry)
+                    if delay is None:
+                        raise
+                else:
+                    endpoint.breaker.record_success()
+                    return result
+                finally:
+                    if probe:  # e.g. interrupted, or a 429 that records no outcome
+                        endpoint.breaker.end_probe()
+                time.sleep(delay)
+                retry += 1
+
+    async def call_async(self, url: str, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send a request with retries on the asyncio engine, see `call`.
+
+        Parameters:
+        - url (str): request URL, selects the endpoint
+        - send (Callable[[], Awaitable[T]]): coroutine function sending the request once
+
+        Returns:
+        - T: the result of the first successful attempt
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        with stage("send"):
+            endpoint = self.endpoint(url)
+            endpoint.budget.record_request()
+            retry = 0
+            while True:
+                probe = self._admit(endpoint)
+                try:
+                    result = await send()
+                except Exception as e:  # pylint: disable=broad-except
+                    delay = self._retry_delay(url, endpoint, e, retry)
+                    if delay is None:
+                        raise
+                else:
+                    endpoint.breaker.record_success()
+                    return result
+                finally:
+                    if probe:  # e.g. cancelled, or a 429 that records no outcome
+                        endpoint.breaker.end_probe()
+                await asyncio.sleep(delay)
+                retry += 1
+
+
+# Retries and circuit breakers shared by every module of the process.
+resilience = Resilience()
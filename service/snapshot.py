@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+from service.parameters import ParameterResolver
+from service.recipient import Recipient
+from service.weibo.history import diff_top_lists, formatted_delta, weibo_history
+from service.weibo.topn import MAX_TOPN, formatted_hot_search_list, get_top_list
+
+
+@lru_cache(maxsize=4096)
+def days_of_dates(love_date: str, birthday: str) -> tuple:
+    """
+    Day counters of a pair of dates, computed once per distinct pair of a run.
+
+    Parameters:
+    - love_date (str): love date, 'YYYY-MM-DD', empty for Config.LOVE_DATE
+    - birthday (str): birthday, 'YYYY-MM-DD', empty for Config.BIRTHDAY
+
+    Returns:
+    - tuple: (love days, days until the birthday), empty strings if a date is invalid
+    """
+    try:
+        return ParameterResolver.calculate_days(love_date, birthday)
+    except ValueError as e:
+        print(f"{e} ({love_date or '-'}, {birthday or '-'})")
+        return "", ""
+
+
+@dataclass(frozen=True)
+class ContentSnapshot:
+    """
+    Immutable snapshot of the recipient-independent content of a morning message.
+
+    The snapshot is resolved once per run and shared by every platform and recipient,
+    so the number of upstream requests depends on the data sources, not on the recipients.
+    Weather is resolved once per distinct city and joined back to each recipient, as are the
+    day counters of recipients with their own dates.
+    """
+
+    date: str
+    weather: Mapping[Tuple[str, str], Optional[tuple]]
+    love_day: int
+    birthday: int
+    one: Optional[str]
+    weibo_top_list: Tuple[dict, ...]
+    weibo_topn_markdown: str
+    weibo_topn_text: str
+    weibo_delta_markdown: str
+    weibo_delta_text: str
+
+    @classmethod
+    def resolve(
+        cls,
+        recipients: Iterable[Recipient] = (),
+        topn: int = 20,
+        locations: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> "ContentSnapshot":
+        """
+        Fetch every data source exactly once and freeze the result.
+
+        Parameters:
+        - recipients (Iterable[Recipient]): recipients whose cities need weather data
+        - topn (int): The number of Weibo hot search items to show. Default is 20
+        - locations (Iterable[Tuple[str, str]]): (province, city) pairs needing weather data,
+          used instead of the recipients' cities, e.g. from `RecipientStore.locations` (optional)
+
+        Returns:
+        - ContentSnapshot: the resolved snapshot
+        """
+        if locations is None:
+            locations = (
+                (recipient.province, recipient.city) for recipient in recipients
+            )
+        weather = ParameterResolver.get_weather_of_locations(locations)
+        days_of_dates.cache_clear()  # counters of the previous run are a day old
+        love_day, birthday = days_of_dates("", "")
+        # the history keeps the full list, so that a topic moving just below the top n
+        # is told apart from one that left the list
+        full_list = get_top_list(MAX_TOPN)
+        weibo_delta = diff_top_lists(weibo_history.record(full_list), full_list, topn)
+        top_list = tuple(full_list[:topn])
+
+        return cls(
+            date=ParameterResolver.get_today_and_weekday(),
+            weather=MappingProxyType(weather),
+            love_day=love_day,
+            birthday=birthday,
+            one=ParameterResolver.get_daily_quote(),
+            weibo_top_list=top_list,
+            weibo_topn_markdown=formatted_hot_search_list(top_list, True),
+            weibo_topn_text=formatted_hot_search_list(top_list),
+            weibo_delta_markdown=formatted_delta(weibo_delta, True),
+            weibo_delta_text=formatted_delta(weibo_delta),
+        )
+
+    def weather_of(self, recipient: Recipient) -> tuple:
+        """
+        Get the weather of a recipient's city.
+
+        Parameters:
+        - recipient (Recipient): the recipient
+
+        Returns:
+        - tuple: (weather, high temperature, low temperature), empty strings if unavailable
+        """
+        return self.weather.get((recipient.province, recipient.city)) or ("", "", "")
+
+    def days_of(self, recipient: Recipient) -> tuple:
+        """
+        Get the day counters of a recipient.
+
+        Parameters:
+        - recipient (Recipient): the recipient
+
+        Returns:
+        - tuple: (love days, days until the birthday), from the recipient's own dates if set
+        """
+        if not (recipient.love_date or recipient.birthday):
+            return self.love_day, self.birthday
+        return days_of_dates(recipient.love_date, recipient.birthday)
+
+    def shared_data(self, markdown: bool = True) -> dict:
+        """
+        Build the recipient-independent part of the template data.
+
+        The day counters are per recipient, recipients can have their own dates.
+
+        Parameters:
+        - markdown (bool): Whether the Weibo list is formatted as Markdown. Default is True
+
+        Returns:
+        - dict: the variables shared by every recipient
+        """
+        return {
+            "date": self.date,
+            "one": self.one,
+            "weibo_topn": (
+                self.weibo_topn_markdown if markdown else self.weibo_topn_text
+            ),
+            "weibo_delta": (
+                self.weibo_delta_markdown if markdown else self.weibo_delta_text
+            ),
+        }
+
+    def recipient_data(self, recipient: Recipient) -> dict:
+        """
+        Build the per-recipient part of the template data.
+
+        Parameters:
+        - recipient (Recipient): the recipient
+
+        Returns:
+        - dict: the variables that differ between recipients
+        """
+        weather, max_temperature, min_temperature = self.weather_of(recipient)
+        love_day, birthday = self.days_of(recipient)
+        return {
+            "name": recipient.name,
+            "city": recipient.city,
+            "weather": weather,
+            "max_temperature": max_temperature,
+            "min_temperature": min_temperature,
+            "love_day": love_day,
+            "birthday": birthday,
+        }
+
+    def template_data(self, recipient: Recipient, markdown: bool = True) -> dict:
+        """
+        Build the template data dictionary for a single recipient.
+
+        Parameters:
+        - recipient (Recipient): the recipient
+        - markdown (bool): Whether the Weibo list is formatted as Markdown. Default is True
+
+        Returns:
+        - dict: the variables used by the message template
+        """
+        return {**self.shared_data(markdown), **self.recipient_data(recipient)}
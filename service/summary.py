@@ -0,0 +1,135 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# (summary, channel name) of the channel running in the current thread or task
+_current_channel: ContextVar[Optional[tuple]] = ContextVar(
+    "current_channel", default=None
+)
+
+
+def count_event(event: str, amount: int = 1) -> None:
+    """
+    Count an event (e.g. a retry) against the channel running in the current context.
+
+    Events outside a channel run, such as resolving the content snapshot, are not counted.
+
+    Parameters:
+    - event (str): event name, e.g. "retries"
+    - amount (int): increment. Default is 1
+    """
+    current = _current_channel.get()
+    if current is not None:
+        summary, name = current
+        summary.count(name, event, amount)
+
+
+def current_channel() -> Optional[str]:
+    """
+    Get the name of the channel running in the current context.
+
+    Returns:
+    - str: the channel name, or None outside a channel run
+    """
+    current = _current_channel.get()
+    return None if current is None else current[1]
+
+
+class RunSummary:
+    """
+    RunSummary Class records the wall-clock time and outcome of every channel in a morning run.
+
+    It is shared by the channel workers, so every update is guarded by a lock.
+    """
+
+    def __init__(self):
+        """
+        Initialize the RunSummary class and start the run clock.
+        """
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._events = {}
+        self._started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+
+    @contextmanager
+    def channel(self, name: str):
+        """
+        Time a channel run, recording its elapsed time and error (if any).
+
+        Events counted with `count_event` inside the block are recorded for the channel.
+
+        Parameters:
+        - name (str): channel name
+        """
+        started = time.perf_counter()
+        error = None
+        token = _current_channel.set((self, name))
+        try:
+            yield
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+        finally:
+            _current_channel.reset(token)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._channels[name] = {"elapsed": elapsed, "error": error}
+
+    def count(self, name: str, event: str, amount: int = 1) -> None:
+        """
+        Count an event of a channel.
+
+        Parameters:
+        - name (str): channel name
+        - event (str): event name, e.g. "retries"
+        - amount (int): increment. Default is 1
+        """
+        with self._lock:
+            events = self._events.setdefault(name, {})
+            events[event] = events.get(event, 0) + amount
+
+    @property
+    def failed(self) -> bool:
+        """
+        Whether a channel of the run failed.
+        """
+        with self._lock:
+            return any(
+                result["error"] is not None for result in self._channels.values()
+            )
+
+    def finish(self) -> None:
+        """
+        Stop the run clock.
+        """
+        self.elapsed = time.perf_counter() - self._started
+
+    def report(self) -> str:
+        """
+        Format the run summary.
+
+        Returns:
+        - str: one line per channel, with its event counts, followed by the total run time
+        """
+        lines = ["Run summary:"]
+        with self._lock:
+            for name, result in self._channels.items():
+                status = (
+                    "ok" if result["error"] is None else f"failed ({result['error']})"
+                )
+                events = ", ".join(
+                    f"{count} {event}"
+                    for event, count in self._events.get(name, {}).items()
+                )
+                if events:
+                    status += f" ({events})"
+                lines.append(f"  {name:<10} {result['elapsed']:8.3f}s  {status}")
+        total = (
+            self.elapsed
+            if self.elapsed is not None
+            else time.perf_counter() - self._started
+        )
+        lines.append(f"  {'total':<10} {total:8.3f}s")
+        return "\n".join(lines)
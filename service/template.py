@@ -0,0 +1,190 @@
+import json
+import os
+import re
+from typing import Callable, Dict, Tuple
+from urllib.parse import quote_plus
+
+# Regex pattern to match '{{variable_name.DATA}}'
+PLACEHOLDER_PATTERN = re.compile(r"{{(.*?)\.DATA}}")
+
+# Characters that must be escaped in a JSON string
+JSON_ESCAPE_PATTERN = re.compile(r'[\x00-\x1f"\\]')
+
+
+class CompiledTemplate:
+    """
+    CompiledTemplate Class is a template parsed once into literal and placeholder segments.
+
+    Rendering is a join over the segments, it touches neither the filesystem nor the regex engine.
+
+    Parameters:
+    - source (str): template source
+    """
+
+    def __init__(self, source: str):
+        """
+        Parse the template source.
+
+        Parameters:
+        - source (str): template source
+        """
+        # re.split with one group alternates literal, placeholder, literal, ..., literal
+        parts = PLACEHOLDER_PATTERN.split(source)
+        self.literals: Tuple[str, ...] = tuple(parts[0::2])
+        self.names: Tuple[str, ...] = tuple(parts[1::2])
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        """
+        Distinct placeholder names referenced by the template, in order of first use.
+        """
+        return tuple(dict.fromkeys(self.names))
+
+    def render(self, data: dict) -> str:
+        """
+        Replace the placeholders with the values passed in the data dictionary.
+
+        Parameters:
+        - data (dict): a dictionary containing the variables to be replaced
+
+        Returns:
+        - str: the processed template string
+        """
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(str(data.get(name, "")))
+            parts.append(literal)
+        return "".join(parts)
+
+    def partial(
+        self,
+        shared: dict,
+        encode: Callable[[str], bytes] = None,
+        head: str = "",
+    ) -> "PartialTemplate":
+        """
+        Pre-render the fields shared by every recipient, see PartialTemplate.
+
+        Parameters:
+        - shared (dict): recipient-independent variables
+        - encode (Callable[[str], bytes]): wire encoding of the output. Default is encode_utf8
+        - head (str): text prepended to the template, e.g. a greeting (optional)
+
+        Returns:
+        - PartialTemplate: the partially evaluated template
+        """
+        return PartialTemplate(self, shared, encode or encode_utf8, head)
+
+
+def encode_utf8(value: str) -> bytes:
+    """
+    Encode text as UTF-8.
+    """
+    return value.encode("utf-8")
+
+
+def encode_json_string(value: str) -> bytes:
+    """
+    Encode text as the UTF-8 content of a JSON string, without the surrounding quotes.
+    """
+    # Short per-recipient values rarely need escaping, skip the json.dumps overhead
+    if not JSON_ESCAPE_PATTERN.search(value):
+        return value.encode("utf-8")
+    return json.dumps(value, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+def encode_query(value: str) -> bytes:
+    """
+    Encode text as a URL query value, as `requests` encodes `params`.
+    """
+    return quote_plus(value).encode("ascii")
+
+
+class PartialTemplate:
+    """
+    PartialTemplate Class is a template with every recipient-independent field already rendered and encoded.
+
+    The literals and shared values between two per-recipient placeholders are merged into a
+    single pre-encoded chunk, so rendering a message only encodes the per-recipient values
+    and joins a handful of byte strings. The encoding must be applicable piecewise
+    (encode(a + b) == encode(a) + encode(b)), which holds for the encoders of this module.
+
+    Parameters:
+    - template (CompiledTemplate): the compiled template
+    - shared (dict): recipient-independent variables
+    - encode (Callable[[str], bytes]): wire encoding of the output
+    - head (str): text prepended to the template (optional)
+    """
+
+    def __init__(
+        self,
+        template: CompiledTemplate,
+        shared: dict,
+        encode: Callable[[str], bytes],
+        head: str = "",
+    ):
+        """
+        Pre-render the shared fields and encode the resulting chunks.
+
+        Parameters:
+        - template (CompiledTemplate): the compiled template
+        - shared (dict): recipient-independent variables
+        - encode (Callable[[str], bytes]): wire encoding of the output
+        - head (str): text prepended to the template (optional)
+        """
+        chunks, names = [], []
+        pending = [head, template.literals[0]]
+        for name, literal in zip(template.names, template.literals[1:]):
+            if name in shared:
+                pending.append(str(shared[name]))
+            else:
+                chunks.append(encode("".join(pending)))
+                names.append(name)
+                pending = []
+            pending.append(literal)
+        chunks.append(encode("".join(pending)))
+
+        self.encode = encode
+        self.chunks: Tuple[bytes, ...] = tuple(chunks)
+        self.names: Tuple[str, ...] = tuple(names)
+
+    def render(self, data: dict) -> bytes:
+        """
+        Splice the per-recipient values into the pre-rendered chunks.
+
+        Parameters:
+        - data (dict): per-recipient variables, missing ones render as empty strings
+
+        Returns:
+        - bytes: the encoded message
+        """
+        encode = self.encode
+        parts = [self.chunks[0]]
+        for name, chunk in zip(self.names, self.chunks[1:]):
+            parts.append(encode(str(data.get(name, ""))))
+            parts.append(chunk)
+        return b"".join(parts)
+
+
+_cache: Dict[str, Tuple[int, CompiledTemplate]] = {}
+
+
+def load_template(template_path: str) -> CompiledTemplate:
+    """
+    Get the compiled template of a file, cached by path and modification time.
+
+    Parameters:
+    - template_path (str): path of the template file
+
+    Returns:
+    - CompiledTemplate: the compiled template, recompiled only when the file changes
+    """
+    mtime = os.stat(template_path).st_mtime_ns
+    cached = _cache.get(template_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(template_path, "r", encoding="utf-8") as file:
+        template = CompiledTemplate(file.read())
+    _cache[template_path] = (mtime, template)
+    return template
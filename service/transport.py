@@ -0,0 +1,351 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from service.config import Config
+from service.metrics import UPSTREAM_RESPONSES
+
+
+@dataclass
+class HostStats:
+    """
+    Request, connection and byte counters of a single upstream host.
+    """
+
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    CountingAdapter Class is an HTTPAdapter that tells new connections from reused keep-alive connections.
+
+    Responses are counted per status code in the `morning_upstream_responses_total` metric.
+
+    Parameters:
+    - host (str): "scheme://host[:port]" key of the host the adapter is mounted for
+    - stats (HostStats): counters of the host
+    - lock (threading.Lock): lock guarding the counters
+    """
+
+    def __init__(self, host: str, stats: HostStats, lock: threading.Lock, **kwargs):
+        """
+        Initialize the CountingAdapter class.
+
+        Parameters:
+        - host (str): "scheme://host[:port]" key of the host the adapter is mounted for
+        - stats (HostStats): counters of the host
+        - lock (threading.Lock): lock guarding the counters
+        - kwargs: HTTPAdapter parameters
+        """
+        self.host = host
+        self.stats = stats
+        self.lock = lock
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        """
+        Send the request and count it as a new or a reused connection.
+        """
+        pool = self.get_connection(request.url, kwargs.get("proxies"))
+        opened = pool.num_connections
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            UPSTREAM_RESPONSES.inc(upstream=self.host, code="error")
+            raise
+        UPSTREAM_RESPONSES.inc(upstream=self.host, code=response.status_code)
+        body = request.body or b""
+        with self.lock:
+            self.stats.requests += 1
+            self.stats.bytes_sent += len(
+                body.encode("utf-8") if isinstance(body, str) else body
+            )
+            if pool.num_connections > opened:
+                self.stats.new_connections += 1
+            else:
+                self.stats.reused_connections += 1
+        return response
+
+
+class Transport:
+    """
+    Transport Class is the HTTP layer shared by every module, it keeps one pooled keep-alive session per host.
+
+    Parameters:
+    - pool_size (int): maximum number of connections kept per host (optional)
+    - keep_alive (bool): whether connections are reused between requests (optional)
+    - connect_timeout (float): connect timeout in seconds (optional)
+    - read_timeout (float): read timeout in seconds (optional)
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        keep_alive: Optional[bool] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the Transport class, unset parameters are read from Config on first use.
+
+        Parameters:
+        - pool_size (int): maximum number of connections kept per host (optional)
+        - keep_alive (bool): whether connections are reused between requests (optional)
+        - connect_timeout (float): connect timeout in seconds (optional)
+        - read_timeout (float): read timeout in seconds (optional)
+        """
+        self._pool_size = pool_size
+        self._keep_alive = keep_alive
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, HostStats] = {}
+
+    @property
+    def pool_size(self) -> int:
+        """
+        Maximum number of connections kept per host.
+        """
+        return self._pool_size or Config.HTTP_POOL_SIZE
+
+    @property
+    def keep_alive(self) -> bool:
+        """
+        Whether connections are reused between requests.
+        """
+        return Config.HTTP_KEEP_ALIVE if self._keep_alive is None else self._keep_alive
+
+    def timeout(self, read_timeout: Optional[float] = None) -> tuple:
+        """
+        Build the (connect, read) timeout of a request.
+
+        Parameters:
+        - read_timeout (float): read timeout overriding the configured one (optional)
+
+        Returns:
+        - tuple: (connect timeout, read timeout)
+        """
+        return (
+            self._connect_timeout or Config.HTTP_CONNECT_TIMEOUT,
+            read_timeout or self._read_timeout or Config.HTTP_READ_TIMEOUT,
+        )
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """
+        Get the "scheme://host[:port]" key of a URL.
+        """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def host_stats(self, host: str) -> HostStats:
+        """
+        Get (or create) the counters of a host.
+
+        Parameters:
+        - host (str): "scheme://host[:port]" key
+
+        Returns:
+        - HostStats: the counters of the host
+        """
+        with self._lock:
+            if host not in self._stats:
+                self._stats[host] = HostStats()
+            return self._stats[host]
+
+    def session(self, url: str) -> requests.Session:
+        """
+        Get the pooled session of the host of a URL, creating it on first use.
+
+        Parameters:
+        - url (str): request URL
+
+        Returns:
+        - requests.Session: session shared by every request to the host
+        """
+        host = self.host_of(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                stats = self._stats.setdefault(host, HostStats())
+                session = requests.Session()
+                adapter = CountingAdapter(
+                    host,
+                    stats,
+                    self._lock,
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                )
+                session.mount(host, adapter)
+                if not self.keep_alive:
+                    session.headers["Connection"] = "close"
+                self._sessions[host] = session
+            return session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        read_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send an HTTP request over the pooled session of its host.
+
+        Parameters:
+        - method (str): HTTP method
+        - url (str): request URL
+        - read_timeout (float): read timeout overriding the configured one (optional)
+        - kwargs: other requests parameters
+
+        Returns:
+        - requests.Response: the response, with its body already read unless stream=True
+        """
+        kwargs.setdefault("timeout", self.timeout(read_timeout))
+        response = self.session(url).request(method, url, **kwargs)
+        if not kwargs.get("stream"):
+            stats = self.host_stats(self.host_of(url))
+            with self._lock:
+                stats.bytes_received += len(response.content)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send an HTTP GET request, see `request`.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send an HTTP POST request, see `request`.
+        """
+        return self.request("POST", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs):
+        """
+        Send a streamed HTTP request, the connection is released and the bytes read are counted on exit.
+
+        Parameters:
+        - method (str): HTTP method
+        - url (str): request URL
+        - kwargs: other `request` parameters
+        """
+        response = self.request(method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            stats = self.host_stats(self.host_of(url))
+            with self._lock:
+                stats.bytes_received += response.raw.tell()
+            response.close()
+
+    def async_session(
+        self, limit: Optional[int] = None, read_timeout: Optional[float] = None
+    ):
+        """
+        Create a pooled aiohttp session that reports into the same per-host counters.
+
+        Parameters:
+        - limit (int): maximum number of connections of the session (optional)
+        - read_timeout (float): read timeout overriding the configured one (optional)
+
+        Returns:
+        - aiohttp.ClientSession: the session, to be used as an async context manager
+        """
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        def stats_of(params) -> HostStats:
+            return self.host_stats(self.host_of(str(params.url)))
+
+        async def on_request_end(_session, _context, params):
+            stats = stats_of(params)
+            with self._lock:
+                stats.requests += 1
+                stats.bytes_received += params.response.content_length or 0
+            UPSTREAM_RESPONSES.inc(
+                upstream=self.host_of(str(params.url)), code=params.response.status
+            )
+
+        async def on_request_exception(_session, _context, params):
+            UPSTREAM_RESPONSES.inc(upstream=self.host_of(str(params.url)), code="error")
+
+        async def on_request_chunk_sent(_session, _context, params):
+            stats = stats_of(params)
+            with self._lock:
+                stats.bytes_sent += len(params.chunk)
+
+        async def on_connection_create_end(_session, context, _params):
+            context.new_connection = True
+
+        async def on_request_start(_session, context, _params):
+            context.new_connection = False
+
+        async def on_request_headers_sent(_session, context, params):
+            stats = stats_of(params)
+            with self._lock:
+                if getattr(context, "new_connection", False):
+                    stats.new_connections += 1
+                else:
+                    stats.reused_connections += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_request_headers_sent.append(on_request_headers_sent)
+        trace.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+
+        connect_timeout, read_timeout = self.timeout(read_timeout)
+        connector = aiohttp.TCPConnector(
+            limit=limit or self.pool_size,
+            force_close=not self.keep_alive,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+            trace_configs=[trace],
+        )
+
+    def stats(self) -> Dict[str, HostStats]:
+        """
+        Get a copy of the per-host counters.
+
+        Returns:
+        - dict: "scheme://host[:port]" -> HostStats
+        """
+        with self._lock:
+            return {
+                host: HostStats(**vars(stats)) for host, stats in self._stats.items()
+            }
+
+    def report(self) -> str:
+        """
+        Format the per-host counters.
+
+        Returns:
+        - str: one line per host
+        """
+        lines = ["HTTP transport:"]
+        for host, stats in self.stats().items():
+            lines.append(
+                f"  {host}: {stats.requests} requests, "
+                f"{stats.new_connections} new / {stats.reused_connections} reused connections, "
+                f"{stats.bytes_sent} bytes sent, {stats.bytes_received} bytes received"
+            )
+        return "\n".join(lines)
+
+
+# Transport shared by every module of the process.
+transport = Transport()
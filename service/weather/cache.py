@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from service.config import Config
+
+
+class WeatherCache:
+    """
+    WeatherCache Class is an in-process and on-disk TTL + LRU cache of weather data keyed by AREAID.
+
+    Every entry records the time it was fetched, entries older than the TTL are ignored and the
+    least recently used entries are evicted once the cache holds more than `max_size` of them.
+
+    Parameters:
+    - ttl (float): seconds an entry stays fresh (optional)
+    - max_size (int): maximum number of entries (optional)
+    - path (str): path of the on-disk copy, empty to keep the cache in memory only (optional)
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+        path: Optional[str] = None,
+    ):
+        """
+        Initialize the WeatherCache class, unset parameters are read from Config.
+
+        Parameters:
+        - ttl (float): seconds an entry stays fresh (optional)
+        - max_size (int): maximum number of entries (optional)
+        - path (str): path of the on-disk copy, empty to keep the cache in memory only (optional)
+        """
+        self.ttl = Config.WEATHER_CACHE_TTL if ttl is None else ttl
+        self.max_size = Config.WEATHER_CACHE_SIZE if max_size is None else max_size
+        self.path = Config.WEATHER_CACHE_PATH if path is None else path
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict] = None
+        self._dirty = False  # entries put since the last save
+
+    def _load(self) -> OrderedDict:
+        """
+        Internal method: load the on-disk copy on first use.
+
+        Returns:
+        - OrderedDict: AREAID -> {"weather": [weather, temp, tempn], "fetched_at": float}, oldest first
+        """
+        if self._entries is None:
+            entries = {}
+            if self.path:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as file:
+                        entries = json.load(file)
+                except (OSError, ValueError):
+                    entries = {}
+            self._entries = OrderedDict(
+                sorted(entries.items(), key=lambda item: item[1]["fetched_at"])
+            )
+        return self._entries
+
+    def _save(self) -> None:
+        """
+        Internal method: atomically replace the on-disk copy.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, area_id: str) -> Optional[tuple]:
+        """
+        Get the fresh weather data of an AREAID.
+
+        Parameters:
+        - area_id (str): AREAID of the city
+
+        Returns:
+        - tuple: (weather, temp, tempn), or None if missing or expired
+        """
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(area_id)
+            if entry is None:
+                return None
+            if time.time() - entry["fetched_at"] > self.ttl:
+                del entries[area_id]
+                return None
+            entries.move_to_end(area_id)
+            return tuple(entry["weather"])
+
+    def put(self, area_id: str, weather: tuple) -> None:
+        """
+        Store the weather data of an AREAID fetched just now, written to disk by `save`.
+
+        Parameters:
+        - area_id (str): AREAID of the city
+        - weather (tuple): (weather, temp, tempn)
+        """
+        with self._lock:
+            entries = self._load()
+            entries[area_id] = {"weather": list(weather), "fetched_at": time.time()}
+            entries.move_to_end(area_id)
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self) -> None:
+        """
+        Write the entries put since the last save to disk, once per batch of fetches.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+                self._dirty = False
+
+
+# Weather cache shared by every module of the process.
+weather_cache = WeatherCache()
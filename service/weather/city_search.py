@@ -0,0 +1,261 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from service.weather import cityinfo
+
+# Administrative suffixes users commonly add to (or drop from) names, longest first
+NAME_SUFFIXES = ("特别行政区", "自治区", "自治州", "地区", "省", "市", "盟")
+
+
+class CityNotFoundError(KeyError):
+    """
+    Raised when a (province, city) pair cannot be resolved, carries the closest known names.
+
+    Parameters:
+    - province (str): Province name as given
+    - city (str): City name as given
+    - suggestions (list): closest (province, city) pairs, best first
+    """
+
+    def __init__(self, province: str, city: str, suggestions: List[Tuple[str, str]]):
+        self.province = province
+        self.city = city
+        self.suggestions = suggestions
+        hint = ", ".join(f"{p} {c}" for p, c in suggestions)
+        super().__init__(
+            f"Unknown city: {province} {city}"
+            + (f" (did you mean: {hint}?)" if hint else "")
+        )
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance of two strings, stopping early once it exceeds `limit`.
+
+    Parameters:
+    - a (str): first string
+    - b (str): second string
+    - limit (int): largest distance of interest
+
+    Returns:
+    - int: the distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def strip_suffix(name: str) -> str:
+    """
+    Remove a trailing administrative suffix such as "省" or "市" from a name.
+    """
+    for suffix in NAME_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+class CityIndex:
+    """
+    CityIndex Class is a search index built once over `cityinfo.cityInfo`.
+
+    It holds a prefix trie over city and province names, an O(1) AREAID -> (province, city)
+    map and edit-distance suggestions, so a recipient list can be validated and normalized
+    in bulk before sending.
+
+    Parameters:
+    - table (Mapping): province -> city -> {"AREAID": str}
+    """
+
+    def __init__(self, table):
+        """
+        Build the index.
+
+        Parameters:
+        - table (Mapping): province -> city -> {"AREAID": str}
+        """
+        self.locations: List[Tuple[str, str]] = []
+        self.area_ids: List[str] = []
+        self.by_area_id: Dict[str, Tuple[str, str]] = {}
+        self.by_city: Dict[str, List[int]] = {}
+        self.trie: dict = {}
+
+        for province, cities in table.items():
+            for city in cities:
+                index = len(self.locations)
+                area_id = cities[city]["AREAID"]
+                self.locations.append((province, city))
+                self.area_ids.append(area_id)
+                self.by_area_id[area_id] = (province, city)
+                self.by_city.setdefault(city, []).append(index)
+                self._insert(city, index)
+                self._insert(province, index)
+
+    def _insert(self, name: str, index: int) -> None:
+        """
+        Internal method: add a name of a location to the trie.
+        """
+        node = self.trie
+        for char in name:
+            node = node.setdefault(char, {})
+        # "" never collides with a character key and holds the locations ending here
+        node.setdefault("", set()).add(index)
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[Tuple[str, str]]:
+        """
+        Find locations whose city or province name starts with a prefix.
+
+        Parameters:
+        - prefix (str): name prefix
+        - limit (int): maximum number of results. Default is 20
+
+        Returns:
+        - list: (province, city) pairs in table order
+        """
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key == "":
+                    found.update(child)
+                else:
+                    stack.append(child)
+        return [self.locations[index] for index in sorted(found)[:limit]]
+
+    def suggest(
+        self, province: str, city: str, limit: int = 3, max_distance: int = 2
+    ) -> List[Tuple[str, str]]:
+        """
+        Suggest the closest known locations for a misspelled one.
+
+        Parameters:
+        - province (str): Province name as given
+        - city (str): City name as given
+        - limit (int): maximum number of suggestions. Default is 3
+        - max_distance (int): largest edit distance on the city name, short names allow less. Default is 2
+
+        Returns:
+        - list: (province, city) pairs, closest first
+        """
+        city = strip_suffix(city or "")
+        province = strip_suffix(province or "")
+        max_distance = max(1, min(max_distance, len(city) // 2))
+        scored = []
+        for index, (known_province, known_city) in enumerate(self.locations):
+            distance = edit_distance(city, known_city, max_distance)
+            if distance > max_distance:
+                continue
+            province_distance = edit_distance(province, known_province, max_distance)
+            scored.append((distance, province_distance, index))
+        scored.sort()
+        return [self.locations[index] for _, _, index in scored[:limit]]
+
+    def location_of(self, area_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Get the (province, city) of an AREAID.
+
+        Parameters:
+        - area_id (str): AREAID
+
+        Returns:
+        - tuple: (province, city), or None if unknown
+        """
+        return self.by_area_id.get(str(area_id))
+
+    def resolve(self, province: str, city: str) -> Tuple[str, str, str]:
+        """
+        Normalize a (province, city) pair and resolve its AREAID.
+
+        Exact names win; otherwise administrative suffixes ("省", "市", ...) are ignored and a
+        city name that is unique across provinces is accepted even with a wrong province.
+
+        Parameters:
+        - province (str): Province name
+        - city (str): City name
+
+        Returns:
+        - tuple: (province, city, AREAID) with the names as known to weather.com.cn
+
+        Raises:
+        - CityNotFoundError: if the pair cannot be resolved
+        """
+        province = (province or "").strip()
+        city = (city or "").strip()
+        candidates = [(province, city), (strip_suffix(province), strip_suffix(city))]
+        for known_province, known_city in candidates:
+            for index in self.by_city.get(known_city, ()):
+                if self.locations[index][0] == known_province:
+                    return (known_province, known_city, self.area_ids[index])
+
+        indexes = self.by_city.get(city) or self.by_city.get(strip_suffix(city), [])
+        if len(indexes) == 1:
+            known_province, known_city = self.locations[indexes[0]]
+            return (known_province, known_city, self.area_ids[indexes[0]])
+
+        raise CityNotFoundError(province, city, self.suggest(province, city))
+
+    def validate(self, locations: Iterable[Tuple[str, str]]) -> Tuple[
+        Dict[Tuple[str, str], Tuple[str, str, str]],
+        Dict[Tuple[str, str], CityNotFoundError],
+    ]:
+        """
+        Resolve many (province, city) pairs at once, each distinct pair is resolved once.
+
+        Parameters:
+        - locations (Iterable[Tuple[str, str]]): (province, city) pairs, duplicates are allowed
+
+        Returns:
+        - tuple: ({pair: (province, city, AREAID)}, {pair: CityNotFoundError})
+        """
+        resolved, errors = {}, {}
+        for location in set(locations):
+            try:
+                resolved[location] = self.resolve(*location)
+            except CityNotFoundError as e:
+                errors[location] = e
+        return resolved, errors
+
+
+_index = None
+
+
+def city_index() -> CityIndex:
+    """
+    Get the city search index, building it on first use.
+
+    Returns:
+    - CityIndex: the shared index
+    """
+    global _index  # pylint: disable=global-statement
+    if _index is None:
+        _index = CityIndex(cityinfo.cityInfo)
+    return _index
+
+
+if __name__ == "__main__":
+    import sys
+
+    for query in sys.argv[1:]:
+        if query.isdigit():
+            print(query, city_index().location_of(query))
+        else:
+            print(query, city_index().prefix(query) or city_index().suggest("", query))
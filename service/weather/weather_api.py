@@ -1,6 +1,10 @@
-import time
 import json
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from service.config import Config
+from service.metrics import STAGE_TOTAL, stage
+from service.transport import transport
+from service.weather.cache import weather_cache
 
 
 class WeatherAPI:
@@ -11,7 +15,7 @@ class WeatherAPI:
     @staticmethod
     def get_weather(province, city, city_info):
         """
-        Get specific weather information of a city from weather.com.cn.
+        Get specific weather information of a city from weather.com.cn, served from the weather cache while it is fresh.
 
         Parameters:
         - province (str): Province name
@@ -21,9 +25,27 @@ class WeatherAPI:
         Returns:
         - tuple: A tuple containing the weather description, high temperature, and low temperature.
         """
-        city_id = city_info[province][city]["AREAID"]
-        t = int(round(time.time() * 1000))  # milliseconds since epoch
-        url = f"http://d1.weather.com.cn/dingzhi/{city_id}.html?_={t}"
+        return WeatherAPI.get_weather_by_area_id(city_info[province][city]["AREAID"])
+
+    @staticmethod
+    def get_weather_by_area_id(city_id: str, save: bool = True) -> tuple:
+        """
+        Get the weather information of an AREAID from weather.com.cn, served from the weather cache while it is fresh.
+
+        Parameters:
+        - city_id (str): AREAID of the city
+        - save (bool): whether a fetched entry is written to the on-disk cache at once,
+          False leaves it to the caller (see `WeatherCache.save`). Default is True
+
+        Returns:
+        - tuple: A tuple containing the weather description, high temperature, and low temperature.
+        """
+        cached = weather_cache.get(city_id)
+        if cached is not None:
+            STAGE_TOTAL.inc(stage="weather", outcome="cached")
+            return cached
+
+        url = f"{Config.WEATHER_SERVER_URL}/dingzhi/{city_id}.html"
 
         headers = {
             "Referer": f"http://www.weather.com.cn/weather1d/{city_id}.shtml",
@@ -31,14 +53,46 @@ class WeatherAPI:
             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36",
         }
 
-        response = requests.get(url, headers=headers, timeout=10)
-        response.encoding = "utf-8"
-        response_data = response.text.split(";")[0].split("=")[-1]
-        weather_json = json.loads(response_data)
+        with stage("weather", channel=""):
+            response = transport.get(url, headers=headers)
+            response.encoding = "utf-8"
+            response_data = response.text.split(";")[0].split("=")[-1]
+            weather_json = json.loads(response_data)
 
         weather_info = weather_json["weatherinfo"]
         weather = weather_info["weather"]  # Weather description
         temp = weather_info["temp"]  # High temperature
         tempn = weather_info["tempn"]  # Low temperature
 
+        weather_cache.put(city_id, (weather, temp, tempn))
+        if save:
+            weather_cache.save()
         return weather, temp, tempn
+
+    @staticmethod
+    def get_weather_batch(
+        area_ids: Iterable[str], concurrency: int
+    ) -> Dict[str, Optional[tuple]]:
+        """
+        Get the weather information of several cities, fetching each distinct AREAID exactly once.
+
+        Parameters:
+        - area_ids (Iterable[str]): AREAIDs of the cities, duplicates are fetched once
+        - concurrency (int): maximum number of requests in flight
+
+        Returns:
+        - dict: AREAID -> (weather, temp, tempn), or None if the city could not be fetched
+        """
+
+        def fetch(city_id: str) -> Optional[tuple]:
+            try:
+                return WeatherAPI.get_weather_by_area_id(city_id, save=False)
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Weather of {city_id} failed: {e}")
+                return None
+
+        distinct_ids = list(dict.fromkeys(area_ids))
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            weather = dict(zip(distinct_ids, pool.map(fetch, distinct_ids)))
+        weather_cache.save()  # one write for the whole batch
+        return weather
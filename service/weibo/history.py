@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+from service.config import Config
+
+
+def topic_key(item: dict) -> str:
+    """
+    Stable short key of a hot search topic, hashed from its `word` (or `title` if it has none).
+
+    Parameters:
+    - item (dict): a hot search item of `parse_hot_search_data`
+
+    Returns:
+    - str: 12 hex digits
+    """
+    name = item.get("word") or item.get("title", "")
+    return hashlib.blake2b(name.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def compact(top_list: list) -> List[list]:
+    """
+    Compact a hot search list for storage.
+
+    Parameters:
+    - top_list (list): hot search items of `parse_hot_search_data`
+
+    Returns:
+    - list: [key, rank, title] per item
+    """
+    return [
+        [topic_key(item), item.get("rank"), item.get("title", "")] for item in top_list
+    ]
+
+
+@dataclass(frozen=True)
+class WeiboDelta:
+    """
+    Changes of the hot search list since the previous snapshot.
+
+    - new: current items that were not in the previous list
+    - risers / fallers: (current item, places moved) of items that moved up / down
+    - dropped: (rank, title) of previous items that left the list
+    - baseline: False when there was no previous snapshot to compare with
+    """
+
+    new: Tuple[dict, ...] = ()
+    risers: Tuple[Tuple[dict, int], ...] = ()
+    fallers: Tuple[Tuple[dict, int], ...] = ()
+    dropped: Tuple[Tuple[int, str], ...] = ()
+    baseline: bool = True
+
+
+def diff_top_lists(
+    previous: Optional[List[list]], top_list: list, topn: Optional[int] = None
+) -> WeiboDelta:
+    """
+    Diff a hot search list against a stored snapshot in O(n), through a key -> rank index.
+
+    Both lists are compared in full, but only changes of topics shown in either top `topn`
+    are reported, so a topic that slips just below the shown list is a faller, not dropped.
+
+    Parameters:
+    - previous (list): compact snapshot of `compact`, None if there is none
+    - top_list (list): current hot search items of `parse_hot_search_data`
+    - topn (int): The number of items shown, None for all of them (optional)
+
+    Returns:
+    - WeiboDelta: the changes, risers and fallers sorted by places moved
+    """
+    if previous is None:
+        return WeiboDelta(baseline=False)
+
+    previous_ranks = {key: rank for key, rank, _ in previous}
+    previously_shown = {key for key, _, _ in previous[:topn]}
+    current_keys = set()
+    new, risers, fallers = [], [], []
+    for position, item in enumerate(top_list):
+        key = topic_key(item)
+        current_keys.add(key)
+        if not (topn is None or position < topn or key in previously_shown):
+            continue
+        rank = previous_ranks.get(key)
+        if rank is None:
+            new.append(item)
+        elif rank > item["rank"]:
+            risers.append((item, rank - item["rank"]))
+        elif rank < item["rank"]:
+            fallers.append((item, item["rank"] - rank))
+
+    dropped = [
+        (rank, title) for key, rank, title in previous[:topn] if key not in current_keys
+    ]
+    return WeiboDelta(
+        new=tuple(new),
+        risers=tuple(sorted(risers, key=lambda moved: -moved[1])),
+        fallers=tuple(sorted(fallers, key=lambda moved: -moved[1])),
+        dropped=tuple(dropped),
+    )
+
+
+def formatted_delta(delta: WeiboDelta, markdown: bool = False) -> str:
+    """
+    Convert a hot search delta into a formatted string.
+
+    Parameters:
+    - delta (WeiboDelta): the changes
+    - markdown (bool): Whether to format the output as Markdown. Default is False
+
+    Returns:
+    - str: one section per kind of change, empty if there is no previous snapshot
+    """
+    if not delta.baseline:
+        return ""
+
+    def line(item: dict, suffix: str = "") -> str:
+        rank, title, url = item.get("rank"), item.get("title", ""), item.get("url", "")
+        if markdown:
+            return f"[\\[{rank + 1}\\] {title}]({url}){suffix}"
+        return f"[{rank + 1}] {title} ({url}){suffix}"
+
+    sections = [
+        ("新上榜", [line(item) for item in delta.new]),
+        ("上升", [line(item, f" ↑{moved}") for item, moved in delta.risers]),
+        ("下降", [line(item, f" ↓{moved}") for item, moved in delta.fallers]),
+        ("落榜", [f"[{rank + 1}] {title}" for rank, title in delta.dropped]),
+    ]
+    formatted = [
+        "\n\n".join([f"{label}：", *lines]) for label, lines in sections if lines
+    ]
+    return "\n\n".join(formatted) or "热搜无变化"
+
+
+class WeiboHistory:
+    """
+    WeiboHistory Class is an on-disk store of the last hot search lists, in compact form.
+
+    Only the newest `max_size` snapshots, one per day, are kept, so the store does not
+    grow between runs.
+
+    Parameters:
+    - path (str): path of the store, empty to keep the snapshots in memory only (optional)
+    - max_size (int): maximum number of snapshots (optional)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: Optional[int] = None):
+        """
+        Initialize the WeiboHistory class, unset parameters are read from Config.
+
+        Parameters:
+        - path (str): path of the store, empty to keep the snapshots in memory only (optional)
+        - max_size (int): maximum number of snapshots (optional)
+        """
+        self.path = Config.WEIBO_HISTORY_PATH if path is None else path
+        self.max_size = Config.WEIBO_HISTORY_SIZE if max_size is None else max_size
+        self._lock = threading.Lock()
+        self._snapshots: Optional[list] = None
+
+    def _load(self) -> list:
+        """
+        Internal method: load the store on first use.
+
+        Returns:
+        - list: {"fetched_at": float, "items": [[key, rank, title], ...]} per snapshot, oldest first
+        """
+        if self._snapshots is None:
+            snapshots = []
+            if self.path:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as file:
+                        snapshots = json.load(file)
+                except (OSError, ValueError):
+                    snapshots = []
+            self._snapshots = snapshots
+        return self._snapshots
+
+    def _save(self) -> None:
+        """
+        Internal method: atomically replace the store.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._snapshots, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def record(self, top_list: list) -> Optional[List[list]]:
+        """
+        Store a hot search list fetched just now, as the snapshot of today.
+
+        One snapshot is kept per day: a rerun on the same day (e.g. `--replay`) replaces
+        today's, so that its delta is still against the previous day.
+
+        Parameters:
+        - top_list (list): hot search items of `parse_hot_search_data`
+
+        Returns:
+        - list: compact items of the newest snapshot of an earlier day, None if there is
+          none or the list is empty
+        """
+        if not top_list:
+            # a failed fetch is not a snapshot, everything would look dropped
+            return None
+        with self._lock:
+            snapshots = self._load()
+            if (
+                snapshots
+                and date.fromtimestamp(snapshots[-1]["fetched_at"]) == date.today()
+            ):
+                snapshots.pop()
+            previous = snapshots[-1]["items"] if snapshots else None
+            snapshots.append({"fetched_at": time.time(), "items": compact(top_list)})
+            del snapshots[: max(len(snapshots) - self.max_size, 0)]
+            self._save()
+            return previous
+
+
+# Hot search history shared by every module of the process.
+weibo_history = WeiboHistory()
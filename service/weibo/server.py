@@ -0,0 +1,399 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+import requests
+from service.config import Config
+from service.metrics import CONTENT_TYPE, metrics
+from service.weibo.topn import MAX_TOPN, formatted_hot_search_list, get_top_list
+
+SERVER_RESPONSES = metrics.counter(
+    "weibo_server_responses_total", "Responses of the hot search server.", ("code",)
+)
+
+# Response formats: format -> (Content-Type, serializer of a hot search list)
+FORMATS = {
+    "json": ("application/json", lambda data: json.dumps(data)),
+    "markdown": (
+        "text/markdown; charset=utf-8",
+        lambda data: formatted_hot_search_list(data, True),
+    ),
+    "text": ("text/plain; charset=utf-8", formatted_hot_search_list),
+}
+
+
+@dataclass(frozen=True)
+class Variant:
+    """
+    Pre-serialized response body of one (topn, format) view of a snapshot.
+
+    - body / gzip_body: identity and gzip-encoded body
+    - etag: strong validator of the identity body, the gzip body has a "-gzip" suffix
+    - content_type: Content-Type header value
+    """
+
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    content_type: str
+
+
+class HotSearchSnapshot:
+    """
+    Hot search list served to every client until the next refresh.
+
+    Each (topn, format) variant is serialized and gzipped once, on first request, and
+    then served as is.
+
+    Parameters:
+    - data (tuple): hot search items, at most MAX_TOPN
+    - digest (str): hash of the items
+    - last_modified (float): time the items last changed, in seconds since the epoch
+    """
+
+    def __init__(self, data: tuple, digest: str, last_modified: float):
+        """
+        Initialize the HotSearchSnapshot class.
+
+        Parameters:
+        - data (tuple): hot search items, at most MAX_TOPN
+        - digest (str): hash of the items
+        - last_modified (float): time the items last changed, in seconds since the epoch
+        """
+        self.data = data
+        self.digest = digest
+        self.last_modified = last_modified
+        self.last_modified_header = formatdate(last_modified, usegmt=True)
+        self._variants = {}
+
+    def variant(self, topn: int, response_format: str) -> Variant:
+        """
+        Get a view of the snapshot, serializing it on first use.
+
+        Parameters:
+        - topn (int): number of hot search items
+        - response_format (str): a key of FORMATS
+
+        Returns:
+        - Variant: the pre-serialized bodies
+        """
+        key = (topn, response_format)
+        variant = self._variants.get(key)
+        if variant is None:
+            # Concurrent first requests may build it twice, the results are identical
+            content_type, serialize = FORMATS[response_format]
+            body = serialize(list(self.data[:topn])).encode("utf-8")
+            variant = Variant(
+                body=body,
+                gzip_body=gzip.compress(body, mtime=0),
+                etag=f'"{self.digest}-{topn}-{response_format}"',
+                content_type=content_type,
+            )
+            self._variants[key] = variant
+        return variant
+
+
+class HotSearchCache:
+    """
+    HotSearchCache Class keeps the Weibo hot search list in memory and refreshes it in the background.
+
+    Clients are served from the latest snapshot, so the traffic to weibo.com is one request
+    per refresh interval no matter how many clients poll.
+
+    Parameters:
+    - interval (float): seconds between two refreshes (optional)
+    - fetch (Callable[[int], list]): hot search source. Default is get_top_list
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        fetch: Callable[[int], list] = get_top_list,
+    ):
+        """
+        Initialize the HotSearchCache class, unset parameters are read from Config.
+
+        Parameters:
+        - interval (float): seconds between two refreshes (optional)
+        - fetch (Callable[[int], list]): hot search source. Default is get_top_list
+        """
+        self.interval = Config.WEIBO_REFRESH_INTERVAL if interval is None else interval
+        self.fetch = fetch
+        self.snapshot: Optional[HotSearchSnapshot] = None
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> None:
+        """
+        Fetch the hot search list and replace the snapshot, the previous one is kept on failure.
+        """
+        try:
+            data = self.fetch(MAX_TOPN)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Weibo hot search refresh failed: {e}")
+            return
+        if not data and self.snapshot is not None:
+            return  # an empty list is a failed fetch, keep serving the last good one
+
+        digest = hashlib.blake2b(
+            json.dumps(data).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        if self.snapshot is None or self.snapshot.digest != digest:
+            self.snapshot = HotSearchSnapshot(tuple(data), digest, time.time())
+        self._ready.set()
+
+    def _run(self) -> None:
+        """
+        Internal method: refresh loop of the background thread.
+        """
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:  # pylint: disable=broad-except
+                # e.g. a changed upstream payload, the thread must outlive it
+                print(f"Weibo hot search refresh failed: {type(e).__name__}: {e}")
+            self._stopped.wait(self.interval)
+
+    def start(self) -> "HotSearchCache":
+        """
+        Start the background refresh thread.
+
+        Returns:
+        - HotSearchCache: self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="weibo-refresh", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the background refresh thread.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[HotSearchSnapshot]:
+        """
+        Get the latest snapshot, waiting for the first refresh if needed.
+
+        Parameters:
+        - timeout (float): seconds to wait for the first refresh (optional)
+
+        Returns:
+        - HotSearchSnapshot: the snapshot, or None if none could be fetched yet
+        """
+        self._ready.wait(timeout)
+        return self.snapshot
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Whether an Accept-Encoding header allows a gzip-encoded response.
+
+    Parameters:
+    - accept_encoding (str): header value, None if absent
+
+    Returns:
+    - bool: True if gzip (or *) is listed with a non-zero quality
+    """
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class WeiboHotSearchHandler(BaseHTTPRequestHandler):
+    """
+    HTTP request handler class for serving Weibo hot search data.
+
+    Query parameters: `topn` (1-50, default 20) and `format` (json, markdown or text,
+    default json). Responses come from the shared background-refreshed `cache`, are
+    gzipped when the client accepts it and carry ETag and Last-Modified, conditional
+    requests that still match get an empty 304 response. GET /metrics serves the metrics
+    of the process (weibo fetches, upstream status codes, responses) in the Prometheus
+    text format.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive for polling clients
+    # headers and body are two writes, Nagle + delayed ACK would hold the body ~40ms
+    disable_nagle_algorithm = True
+    cache: HotSearchCache = None
+
+    def do_GET(self):
+        """
+        Handle GET requests by sending the requested view of the Weibo hot search data.
+        """
+        parts = urlsplit(self.path)
+        if parts.path == "/metrics":
+            self._send_metrics()
+            return
+        query = parse_qs(parts.query)
+        try:
+            topn = int(query.get("topn", ["20"])[-1])
+        except ValueError:
+            topn = 0
+        response_format = query.get("format", ["json"])[-1]
+        if not 1 <= topn <= MAX_TOPN or response_format not in FORMATS:
+            self.send_error(
+                400, f"topn must be 1-{MAX_TOPN}, format one of {', '.join(FORMATS)}"
+            )
+            return
+
+        snapshot = self.cache.get(timeout=Config.HTTP_READ_TIMEOUT)
+        if snapshot is None:
+            self.send_error(503, "Weibo hot search is not available yet")
+            return
+        variant = snapshot.variant(topn, response_format)
+        gzipped = accepts_gzip(self.headers.get("Accept-Encoding"))
+        etag = variant.etag[:-1] + '-gzip"' if gzipped else variant.etag
+
+        if self._not_modified(snapshot, variant):
+            self.send_response(304)
+            self._send_validators(snapshot, etag)
+            self.end_headers()
+            return
+        self._send_response(snapshot, variant, etag, gzipped)
+
+    def _not_modified(self, snapshot: HotSearchSnapshot, variant: Variant) -> bool:
+        """
+        Helper method to evaluate If-None-Match, or If-Modified-Since without it.
+
+        Parameters:
+        - snapshot (HotSearchSnapshot): the snapshot about to be served
+        - variant (Variant): the view about to be served
+
+        Returns:
+        - bool: True if the client copy is still current
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # Both encodings of a variant share its content, either tag validates it
+            tags = [
+                tag.strip().removeprefix("W/").replace('-gzip"', '"')
+                for tag in if_none_match.split(",")
+            ]
+            return "*" in tags or variant.etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(snapshot.last_modified) <= since
+
+    def _send_validators(self, snapshot: HotSearchSnapshot, etag: str):
+        """
+        Helper method to send the headers shared by 200 and 304 responses.
+
+        Parameters:
+        - snapshot (HotSearchSnapshot): the snapshot served
+        - etag (str): ETag of the representation served
+        """
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", snapshot.last_modified_header)
+
+    def _send_response(
+        self, snapshot: HotSearchSnapshot, variant: Variant, etag: str, gzipped: bool
+    ):
+        """
+        Helper method to send the pre-serialized response.
+
+        Parameters:
+        - snapshot (HotSearchSnapshot): the snapshot served
+        - variant (Variant): the view to be sent in the response
+        - etag (str): ETag of the representation served
+        - gzipped (bool): whether to send the gzip-encoded body
+        """
+        body = variant.gzip_body if gzipped else variant.body
+        self.send_response(200)
+        self._send_validators(snapshot, etag)
+        self.send_header("Content-type", variant.content_type)
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self):
+        """
+        Helper method to send the metrics of the process.
+        """
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_response(self, code, message=None):
+        """
+        Send the status line, counting the response by status code.
+        """
+        SERVER_RESPONSES.inc(code=code)
+        super().send_response(code, message)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Log requests only in debug mode, access logs would dominate under load.
+        """
+        if Config.WEIBO_SERVER_ACCESS_LOG:
+            super().log_message(format, *args)
+
+
+class HotSearchServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of the hot search list, one daemon thread per connection.
+    """
+
+    request_queue_size = 128  # listen backlog, the default 5 drops bursts of clients
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    """
+    Serve the Weibo hot search list until interrupted.
+
+    Parameters:
+    - host (str): address to listen on (optional)
+    - port (int): port to listen on (optional)
+    """
+    WeiboHotSearchHandler.cache = HotSearchCache().start()
+    server = HotSearchServer(
+        (host or Config.WEIBO_SERVER_HOST, port or Config.WEIBO_SERVER_PORT),
+        WeiboHotSearchHandler,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        WeiboHotSearchHandler.cache.stop()
+
+
+if __name__ == "__main__":
+    serve()
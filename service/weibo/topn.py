@@ -1,6 +1,9 @@
-import json
-from http.server import BaseHTTPRequestHandler
-import requests
+from service.config import Config
+from service.metrics import stage
+from service.transport import transport
+
+# Maximum number of hot search items, see `get_top_list`
+MAX_TOPN = 50
 
 
 def fetch_weibo_hot_search() -> list:
@@ -10,10 +13,10 @@ def fetch_weibo_hot_search() -> list:
     Returns:
     - list: A list of dictionaries containing hot search data, including title, url, num, and hot level.
     """
-    url = "https://weibo.com/ajax/side/hotSearch"
-    response = requests.get(url, timeout=10)
-    if response.status_code == 200:
-        return response.json().get("data", {}).get("realtime", [])
+    with stage("weibo", channel=""):
+        response = transport.get(Config.WEIBO_HOT_SEARCH_URL)
+        if response.status_code == 200:
+            return response.json().get("data", {}).get("realtime", [])
     return []
 
 
@@ -35,6 +38,7 @@ def parse_hot_search_data(data_json: list) -> list:
         rank = get_rank(item)
 
         search_data = {
+            "word": item.get("word", ""),
             "title": item.get("note", ""),
             "url": f"https://s.weibo.com/weibo?q=%23{item.get('word', '')}%23",
             "num": item.get("num", ""),
@@ -71,7 +75,7 @@ def get_top_list(topn: int = 50) -> list:
     - list: A list of dictionaries containing formatted hot search data.
     """
     raw_data = fetch_weibo_hot_search()
-    top50_data = parse_hot_search_data(raw_data[:50])
+    top50_data = parse_hot_search_data(raw_data[:MAX_TOPN])
     return top50_data[:topn]
 
 
@@ -115,31 +119,18 @@ def formatted_top_list(topn: int = 50, markdown: bool = False) -> str:
     return formatted_hot_search_list(get_top_list(topn), markdown)
 
 
-class WeiboHotSearchHandler(BaseHTTPRequestHandler):
+def __getattr__(name: str):
     """
-    HTTP request handler class for serving Weibo hot search data in JSON format.
+    Keep `from service.weibo.topn import WeiboHotSearchHandler` working, the handler moved
+    to service.weibo.server (imported on access, that module imports this one).
     """
+    if name == "WeiboHotSearchHandler":
+        from service.weibo.server import (  # pylint: disable=import-outside-toplevel
+            WeiboHotSearchHandler,
+        )
 
-    def do_GET(self, topn: int = 20):
-        """
-        Handle GET requests by sending the Weibo hot search data as a JSON response.
-        """
-        data = get_top_list(topn)
-        self._send_response(data)
-
-    def _send_response(self, data: list):
-        """
-        Helper method to send the JSON response.
-
-        Parameters:
-        - data (list): The hot search data to be sent in the response.
-        """
-        self.send_response(200)
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Cache-Control", "no-cache")
-        self.send_header("Content-type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode("utf-8"))
+        return WeiboHotSearchHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":